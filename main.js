@@ -40,17 +40,31 @@ function createWindow() {
           : path.join(process.resourcesPath, 'softphone');
         console.log("Script path:", scriptPath);
 
-        // Spawn the Python process and store it globally
-        pythonProcess = spawn('python', [scriptPath, ...args]);
+        // Spawn the Python process and store it globally. Events come back
+        // as newline-delimited JSON on fd 3; stdout/stderr carry logs only.
+        pythonProcess = spawn('python', [scriptPath, ...args], {
+          stdio: ['pipe', 'pipe', 'pipe', 'pipe'],
+          env: { ...process.env, SOFTPHONE_EVENT_FD: '3', SOFTPHONE_DATA_DIR: app.getPath('userData') }
+        });
 
         let output = '';
+        let pendingEvents = '';
+
+        pythonProcess.stdio[3].on('data', (data) => {
+          pendingEvents += data.toString();
+          const records = pendingEvents.split('\n');
+          // The last element is an incomplete record (or empty)
+          pendingEvents = records.pop();
+          for (const record of records) {
+            if (record && mainWindow) {
+              mainWindow.webContents.send('from-python', record);
+            }
+          }
+        });
 
         pythonProcess.stdout.on('data', (data) => {
           const message = data.toString();
           console.log('Python stdout:', message);
-          if (mainWindow) {
-            mainWindow.webContents.send('from-python', message);
-          }
           output += message;
         });
 
@@ -92,8 +106,13 @@ function createWindow() {
 function stopPythonProcess() {
   if (pythonProcess) {
     console.log('Stopping Python process');
-    pythonProcess.kill();
+    const proc = pythonProcess;
     pythonProcess = null;
+    // Closing stdin lets the backend hang up and unregister before it exits;
+    // kill it if that takes longer than its shutdown deadline
+    proc.stdin.end();
+    const killTimer = setTimeout(() => proc.kill(), 5000);
+    proc.once('close', () => clearTimeout(killTimer));
   }
 }
 
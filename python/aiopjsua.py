@@ -0,0 +1,440 @@
+"""Awaitable asyncio layer over the pjsua Account and Call objects.
+
+The pjsua wrapper only reports progress through callback objects. The
+classes here install callbacks that forward every event to the
+application's own callback and, in addition, resolve asyncio futures, so
+a coroutine can wait for an operation to actually take effect:
+
+    call = await account.make_call("sip:alice@example.com")
+    await call.hold()
+    await call.unhold()
+
+Events are captured on the thread that runs the pjsua callback and handed
+to the event loop with call_soon_threadsafe(); once that loop is closed
+they are still forwarded to the application's callback but no longer
+posted. Every wait has a timeout
+and raises asyncio.TimeoutError when it expires. A call that disconnects
+while something waits on it raises pjsua.Error.
+"""
+import asyncio
+import pjsua as pj
+
+
+class _Waiter:
+    __slots__ = ('predicate', 'future', 'fail_on_disconnect')
+
+    def __init__(self, predicate, future, fail_on_disconnect):
+        self.predicate = predicate
+        self.future = future
+        self.fail_on_disconnect = fail_on_disconnect
+
+
+class _AioCallCallback(pj.CallCallback):
+    """Call callback that feeds an AioCall and forwards to the
+    application's CallCallback."""
+    def __init__(self, aio_call, inner=None):
+        self._aio = aio_call
+        self.inner = inner
+        pj.CallCallback.__init__(self)
+
+    def _set_call(self, call):
+        pj.CallCallback._set_call(self, call)
+        if self.inner:
+            self.inner._set_call(call)
+
+    # The application's callback runs first: it must see every event,
+    # including the DISCONNECTED that arrives after the loop has closed
+
+    def on_state(self):
+        try:
+            if self.inner:
+                self.inner.on_state()
+        finally:
+            self._aio._post(self.call.cached_info())
+
+    def on_media_state(self):
+        try:
+            if self.inner:
+                self.inner.on_media_state()
+        finally:
+            self._aio._post(self.call.cached_info())
+
+    def on_dtmf_digit(self, digits):
+        if self.inner:
+            self.inner.on_dtmf_digit(digits)
+
+    def on_transfer_request(self, dst, code):
+        if self.inner:
+            return self.inner.on_transfer_request(dst, code)
+        return code
+
+    def on_transfer_status(self, code, reason, final, cont):
+        if self.inner:
+            return self.inner.on_transfer_status(code, reason, final, cont)
+        return cont
+
+    def on_replace_request(self, code, reason):
+        if self.inner:
+            return self.inner.on_replace_request(code, reason)
+        return code, reason
+
+    def on_replaced(self, new_call):
+        if self.inner:
+            self.inner.on_replaced(new_call)
+
+    def on_pager(self, mime_type, body):
+        if self.inner:
+            self.inner.on_pager(mime_type, body)
+
+    def on_pager_status(self, body, im_id, code, reason):
+        if self.inner:
+            self.inner.on_pager_status(body, im_id, code, reason)
+
+    def on_typing(self, is_typing):
+        if self.inner:
+            self.inner.on_typing(is_typing)
+
+
+class AioCall:
+    """Awaitable wrapper around a pjsua Call.
+
+    Member documentation:
+
+    call    -- the wrapped Call object.
+    """
+    def __init__(self, call=None, cb=None, loop=None):
+        """
+        Wrap a call. The wrapper installs its own callback on the call and
+        forwards every event to cb.
+
+        Keyword arguments:
+        call -- the Call to wrap. May be None when the wrapper is created
+                before the call, as AioAccount.start_call() does.
+        cb   -- the application's CallCallback, if any.
+        loop -- the event loop to resolve waits on. Defaults to the loop
+                running the first wait.
+        """
+        self.call = None
+        self.callback = _AioCallCallback(self, cb)
+        self._loop = loop
+        self._waiters = []
+        if call:
+            self.attach(call)
+
+    def attach(self, call):
+        """Attach the wrapper to a call and install its callback."""
+        self.call = call
+        call.set_callback(self.callback)
+
+    def detach(self):
+        """
+        Uninstall the wrapper's callback from the call once the call is
+        over. This breaks the reference cycle between the Call, the
+        callback and the wrapper, so they are freed as soon as the
+        application lets go of the wrapper instead of waiting for the
+        cycle collector. Pending waits are not affected.
+        """
+        if self.call is not None:
+            self.call.set_callback(None)
+        self.callback = None
+
+    def info(self):
+        """Get the last CallInfo snapshot of the call."""
+        return self.call.cached_info()
+
+    async def wait_for(self, predicate, timeout=10.0, fail_on_disconnect=True):
+        """
+        Wait until the call's state satisfies a condition.
+
+        Keyword arguments:
+        predicate          -- function taking a CallInfo and returning True
+                              once the wait is over. It is tried on the
+                              current state first, then on every state or
+                              media change.
+        timeout            -- in seconds.
+        fail_on_disconnect -- raise pjsua.Error if the call disconnects
+                              before the predicate holds.
+
+        Return:
+            the CallInfo that satisfied the predicate.
+        """
+        waiter = self._add_waiter(predicate, fail_on_disconnect)
+        self._check(waiter, self.call.cached_info())
+        return await self._wait(waiter, timeout)
+
+    async def media_active(self, timeout=10.0):
+        """Wait until the call's media is active and connected to the
+        conference bridge."""
+        return await self.wait_for(_media_active, timeout)
+
+    async def confirmed(self, timeout=60.0):
+        """Wait until the call is confirmed."""
+        return await self.wait_for(_confirmed, timeout)
+
+    async def answer(self, code=200, reason="", hdr_list=None, timeout=10.0):
+        """Answer the call and, for a 2xx answer, wait until it is
+        confirmed."""
+        if code < 200 or code >= 300:
+            self.call.answer(code, reason, hdr_list)
+            return self.call.cached_info()
+        waiter = self._start(_confirmed, True, self.call.answer,
+                             code, reason, hdr_list)
+        return await self._wait(waiter, timeout)
+
+    async def hold(self, hdr_list=None, timeout=10.0):
+        """Put the call on hold and wait until the media is held."""
+        waiter = self._start(_held, True, self.call.hold, hdr_list)
+        return await self._wait(waiter, timeout)
+
+    async def unhold(self, hdr_list=None, timeout=10.0):
+        """Release the call from hold and wait until the media is active."""
+        waiter = self._start(_media_active, True, self.call.unhold, hdr_list)
+        return await self._wait(waiter, timeout)
+
+    async def reinvite(self, hdr_list=None, timeout=10.0):
+        """Send re-INVITE and wait until the media is active."""
+        waiter = self._start(_media_active, True, self.call.reinvite, hdr_list)
+        return await self._wait(waiter, timeout)
+
+    async def hangup(self, code=603, reason="", hdr_list=None, timeout=10.0):
+        """Hang up the call and wait until it is disconnected."""
+        waiter = self._start(_disconnected, False, self.call.hangup,
+                             code, reason, hdr_list)
+        return await self._wait(waiter, timeout)
+
+    # Internal
+
+    def _add_waiter(self, predicate, fail_on_disconnect):
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        waiter = _Waiter(predicate, self._loop.create_future(),
+                         fail_on_disconnect)
+        self._waiters.append(waiter)
+        return waiter
+
+    def _start(self, predicate, fail_on_disconnect, method, *args):
+        # The waiter goes in first so the event can't be missed, and comes
+        # out again if the request fails, since nobody will await it
+        waiter = self._add_waiter(predicate, fail_on_disconnect)
+        try:
+            method(*args)
+        except BaseException:
+            self._waiters.remove(waiter)
+            waiter.future.cancel()
+            raise
+        return waiter
+
+    async def _wait(self, waiter, timeout):
+        try:
+            return await asyncio.wait_for(waiter.future, timeout)
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def _post(self, call_info):
+        # Called on the pjsua callback thread
+        if call_info is not None:
+            _call_soon(self._loop, self._on_event, call_info)
+
+    def _on_event(self, call_info):
+        for waiter in list(self._waiters):
+            self._check(waiter, call_info)
+
+    def _check(self, waiter, call_info):
+        if waiter.future.done():
+            return
+        if waiter.predicate(call_info):
+            waiter.future.set_result(call_info)
+        elif (waiter.fail_on_disconnect and
+              call_info.state == pj.CallState.DISCONNECTED):
+            waiter.future.set_exception(
+                pj.Error("wait_for()", self.call, call_info.last_code,
+                         call_info.last_reason or "Call disconnected"))
+
+
+class _AioAccountCallback(pj.AccountCallback):
+    """Account callback that feeds an AioAccount and forwards to the
+    application's AccountCallback."""
+    def __init__(self, aio_account, inner=None):
+        self._aio = aio_account
+        self.inner = inner
+        pj.AccountCallback.__init__(self)
+
+    def _set_account(self, account):
+        pj.AccountCallback._set_account(self, account)
+        if self.inner:
+            self.inner._set_account(account)
+
+    def on_reg_state(self):
+        try:
+            if self.inner:
+                self.inner.on_reg_state()
+        finally:
+            self._aio._post()
+
+    def on_incoming_call(self, call):
+        if self.inner:
+            self.inner.on_incoming_call(call)
+        else:
+            call.hangup()
+
+    def on_incoming_subscribe(self, buddy, from_uri, contact_uri, pres_obj):
+        if self.inner:
+            return self.inner.on_incoming_subscribe(buddy, from_uri,
+                                                    contact_uri, pres_obj)
+        return (200, None)
+
+    def on_pager(self, from_uri, contact, mime_type, body):
+        if self.inner:
+            self.inner.on_pager(from_uri, contact, mime_type, body)
+
+    def on_pager_status(self, to_uri, body, im_id, code, reason):
+        if self.inner:
+            self.inner.on_pager_status(to_uri, body, im_id, code, reason)
+
+    def on_typing(self, from_uri, contact, is_typing):
+        if self.inner:
+            self.inner.on_typing(from_uri, contact, is_typing)
+
+    def on_mwi_info(self, body):
+        if self.inner:
+            self.inner.on_mwi_info(body)
+
+
+class AioAccount:
+    """Awaitable wrapper around a pjsua Account.
+
+    Member documentation:
+
+    account -- the wrapped Account object.
+    """
+    def __init__(self, account, cb=None, loop=None):
+        """
+        Wrap an account. The wrapper installs its own callback on the
+        account and forwards every event to cb.
+
+        Keyword arguments:
+        account -- the Account to wrap.
+        cb      -- the application's AccountCallback, if any.
+        loop    -- the event loop to resolve waits on. Defaults to the loop
+                   running the first wait.
+        """
+        self.account = account
+        self.callback = _AioAccountCallback(self, cb)
+        self._loop = loop
+        self._waiters = []
+        account.set_callback(self.callback)
+
+    async def registered(self, timeout=30.0):
+        """
+        Wait until the account is registered.
+
+        Raises pjsua.Error if the registrar answers with a failure.
+
+        Return:
+            the AccountInfo of the registered account.
+        """
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        info = self.account.info()
+        if _registered(info):
+            return info
+        future = self._loop.create_future()
+        self._waiters.append(future)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            if future in self._waiters:
+                self._waiters.remove(future)
+
+    def start_call(self, dst_uri, cb=None, hdr_list=None):
+        """
+        Make an outgoing call without waiting for it to connect.
+
+        The wrapper's callback is installed before the INVITE is sent, so
+        no event is missed.
+
+        Return:
+            AioCall for the new call.
+        """
+        aio_call = AioCall(cb=cb, loop=self._loop)
+        call = self.account.make_call(dst_uri, aio_call.callback, hdr_list)
+        aio_call.call = call
+        return aio_call
+
+    async def make_call(self, dst_uri, cb=None, hdr_list=None, timeout=60.0):
+        """
+        Make an outgoing call and wait until it is confirmed.
+
+        Raises pjsua.Error if the call is disconnected first, and hangs the
+        call up if the wait times out or is cancelled.
+
+        Return:
+            AioCall for the confirmed call.
+        """
+        aio_call = self.start_call(dst_uri, cb, hdr_list)
+        try:
+            await aio_call.confirmed(timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            try:
+                aio_call.call.hangup()
+            except pj.Error:
+                pass
+            raise
+        return aio_call
+
+    # Internal
+
+    def _post(self):
+        # Called on the pjsua callback thread
+        try:
+            account_info = self.account.info()
+        except pj.Error:
+            # Deleted, e.g. by Lib.shutdown(), before its last registration
+            # event was delivered
+            return
+        _call_soon(self._loop, self._on_reg_state, account_info)
+
+    def _on_reg_state(self, info):
+        if _registered(info):
+            result = info
+        elif info.reg_status >= 300:
+            result = pj.Error("registered()", self.account, info.reg_status,
+                              info.reg_reason)
+        else:
+            return
+        for future in self._waiters:
+            if future.done():
+                continue
+            if isinstance(result, pj.Error):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+def _call_soon(loop, fn, arg):
+    # Events keep coming after the loop is gone, e.g. the hangups sent by
+    # Lib.shutdown() once asyncio.run() has returned. Nobody is waiting
+    # on them any more, so they are dropped.
+    if loop is None or loop.is_closed():
+        return
+    try:
+        loop.call_soon_threadsafe(fn, arg)
+    except RuntimeError:
+        # Closed between the check and the call
+        pass
+
+def _confirmed(info):
+    return info.state == pj.CallState.CONFIRMED
+
+def _disconnected(info):
+    return info.state == pj.CallState.DISCONNECTED
+
+def _media_active(info):
+    return info.media_state == pj.MediaState.ACTIVE and info.conf_slot != -1
+
+def _held(info):
+    return info.media_state == pj.MediaState.LOCAL_HOLD
+
+def _registered(info):
+    return 200 <= info.reg_status < 300 and info.reg_expires > 0
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+import gc
+import sys
+import threading
+import weakref
+
+class CallLifecycle:
+    """
+    Owns the AioCall wrappers of the live calls and lets go of each one
+    when its call ends. release() runs on CallState.DISCONNECTED: it drops
+    the wrapper and the call's tag and detaches the wrapper's callback, so
+    the Call, its callback and the wrapper stop referencing each other and
+    are freed by reference counting alone. sweep() releases calls whose
+    DISCONNECTED event was missed, e.g. an outgoing call that failed before
+    its wrapper was stored. Released calls are watched through weak
+    references. A sweep counts those that only the cycle collector frees,
+    and those still alive after it once the callbacks queued for them on
+    the dispatcher have run, which are leaked.
+    """
+    def __init__(self, lib, on_release=None):
+        self.lib = lib
+        self.on_release = on_release
+        self.aio_calls = {}
+        self.released = 0
+        self.swept = 0
+        self.cycles = 0
+        self.leaked = 0
+        # (weakref to a released call, dispatcher mark at its release)
+        self._released_calls = []
+        self._lock = threading.Lock()
+
+    def track(self, call_id, aio_call):
+        with self._lock:
+            self.aio_calls[call_id] = aio_call
+
+    def get(self, call_id):
+        return self.aio_calls.get(call_id)
+
+    def release(self, call_id):
+        """Forget a call that has ended. Returns True if it was still tracked."""
+        with self._lock:
+            aio_call = self.aio_calls.pop(call_id, None)
+        call = self.lib.calls.untag(call_id)
+        if aio_call:
+            call = call or aio_call.call
+            aio_call.detach()
+        if call is None:
+            return False
+        mark = self.lib.dispatcher_mark()
+        with self._lock:
+            self._released_calls.append((weakref.ref(call), mark))
+            self.released += 1
+        if self.on_release:
+            try:
+                self.on_release(call_id, call)
+            except Exception as e:
+                print(f"Error releasing call {call_id}: {e}", file=sys.stderr)
+        return aio_call is not None
+
+    def sweep(self, collect=True):
+        """
+        Release tracked calls that pjsua no longer knows about and untag
+        dead calls left in the registry. With collect set, also run the
+        cycle collector, counting the released calls only it could free,
+        and recount the calls still alive after it as leaked. A call a
+        queued or running callback may still hold is not counted yet.
+        Returns the number of calls released.
+        """
+        stale = [call_id for call_id, aio_call in list(self.aio_calls.items())
+                 if aio_call.call is None or aio_call.call not in self.lib.calls]
+        stale += [call_id for call_id, call in self.lib.calls.tagged().items()
+                  if call not in self.lib.calls and call_id not in stale]
+        for call_id in stale:
+            self.release(call_id)
+        with self._lock:
+            self.swept += len(stale)
+            released = [entry for entry in self._released_calls if entry[0]() is not None]
+            self._released_calls = released
+        if collect:
+            gc.collect()
+            alive = [entry for entry in released if entry[0]() is not None]
+            leaked = sum(1 for ref, mark in alive if self.lib.dispatcher_passed(mark))
+            with self._lock:
+                self.cycles += len(released) - len(alive)
+                self.leaked = leaked
+                # Calls released while the collector ran are kept too
+                self._released_calls = alive + self._released_calls[len(released):]
+        return len(stale)
+
+    def get_stats(self):
+        return {
+            'live': len(self.aio_calls),
+            'registry': len(self.lib.calls),
+            'released': self.released,
+            'swept': self.swept,
+            'cycles': self.cycles,
+            'leaked': self.leaked
+        }
+
+    def clear(self):
+        with self._lock:
+            aio_calls = list(self.aio_calls.values())
+            self.aio_calls.clear()
+        for aio_call in aio_calls:
+            aio_call.detach()
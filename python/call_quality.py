@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+import array
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+import pjsua as pj
+
+_STREAM_RE = re.compile(r'#(\d+) audio (\S+) @(\d+)kHz')
+_TOTAL_RE = re.compile(r'total ([\d.]+)([KM]?)pkt .*@avg=([\d.]+)([KM]?)bps')
+_LOSS_RE = re.compile(r'pkt loss=(\d+) \(\s*([\d.]+)%\)')
+_ROW_RE = re.compile(r':\s*([\d.]+)\s+([\d.]+)\s+([\d.]+)\s+([\d.]+)')
+
+_SCALE = {'': 1.0, 'K': 1000.0, 'M': 1000000.0}
+
+def parse_dump(text):
+    """
+    Pull the numbers of the first audio stream out of Call.dump_status().
+
+    Returns a dict with codec, clock_khz, rtt_ms and an 'rx' and 'tx' dict
+    holding packets, packets_step, lost, loss_pct, jitter_ms (last value)
+    and kbps. Fields missing from the dump stay None. Packet totals are as
+    precise as pjsua prints them, i.e. rounded to 0.1K above a thousand;
+    packets_step is that rounding step (1, 100, 100000).
+    """
+    stats = {'codec': None, 'clock_khz': None, 'rtt_ms': None, 'rx': None, 'tx': None}
+    direction = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line[0] == '#':
+            if stats['codec'] is not None:
+                break  # Only the first audio stream
+            m = _STREAM_RE.match(line)
+            if m:
+                stats['codec'] = m.group(2)
+                stats['clock_khz'] = int(m.group(3))
+        elif line.startswith('RX ') or line.startswith('TX '):
+            direction = {'packets': None, 'packets_step': None, 'lost': None, 'loss_pct': None,
+                         'jitter_ms': None, 'kbps': None}
+            stats['rx' if line[0] == 'R' else 'tx'] = direction
+        elif direction is None:
+            continue
+        elif line.startswith('total '):
+            m = _TOTAL_RE.match(line)
+            if m:
+                scale = _SCALE[m.group(2)]
+                direction['packets'] = float(m.group(1)) * scale
+                decimals = len(m.group(1).partition('.')[2])
+                direction['packets_step'] = max(1.0, scale / 10 ** decimals)
+                direction['kbps'] = float(m.group(3)) * _SCALE[m.group(4)] / 1000.0
+        elif line.startswith('pkt loss='):
+            m = _LOSS_RE.match(line)
+            if m:
+                direction['lost'] = int(m.group(1))
+                direction['loss_pct'] = float(m.group(2))
+        elif line.startswith('jitter'):
+            m = _ROW_RE.search(line)
+            if m:
+                direction['jitter_ms'] = float(m.group(4))
+        elif line.startswith('RTT'):
+            m = _ROW_RE.search(line)
+            if m:
+                stats['rtt_ms'] = float(m.group(4))
+    return stats
+
+def estimate_mos(rtt_ms, jitter_ms, loss_pct):
+    """MOS from a simplified ITU-T G.107 E-model"""
+    latency = (rtt_ms or 0.0) / 2.0 + 2.0 * (jitter_ms or 0.0) + 10.0
+    if latency < 160.0:
+        r = 93.2 - latency / 40.0
+    else:
+        r = 93.2 - (latency - 120.0) / 10.0
+    r -= 2.5 * (loss_pct or 0.0)
+    if r <= 0.0:
+        return 1.0
+    if r >= 100.0:
+        return 4.5
+    return 1.0 + 0.035 * r + 0.000007 * r * (r - 60.0) * (100.0 - r)
+
+class QualitySeries:
+    """
+    Fixed-size ring of quality samples for one call. Every metric is a
+    preallocated float array, so a sample costs a handful of stores.
+    """
+    FIELDS = ('time', 'jitter_ms', 'loss_pct', 'rtt_ms', 'rx_kbps', 'tx_kbps', 'mos')
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.columns = {name: array.array('f', bytes(4 * capacity)) for name in self.FIELDS}
+        # Wall-clock seconds need double precision
+        self.columns['time'] = array.array('d', bytes(8 * capacity))
+        self.pos = 0
+        self.count = 0
+        self.codec = None
+        self.started = time.time()
+        self.last = None
+
+    def record(self, sample):
+        for name in self.FIELDS:
+            self.columns[name][self.pos] = sample[name]
+        self.pos = (self.pos + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def latest(self):
+        if not self.count:
+            return None
+        i = self.pos - 1
+        return {name: round(self.columns[name][i], 3) for name in self.FIELDS}
+
+    def series(self, samples=None):
+        """The last n samples as one list per metric, oldest first"""
+        n = self.count if samples is None else min(samples, self.count)
+        start = (self.pos - n) % self.capacity
+        return {name: [round(self.columns[name][(start + i) % self.capacity], 3) for i in range(n)]
+                for name in self.FIELDS}
+
+    def summary(self):
+        """Averages and extremes over the buffered samples"""
+        n = self.count
+        if not n:
+            return {'codec': self.codec, 'samples': 0}
+        mos = self.columns['mos'][:n]
+        return {
+            'codec': self.codec,
+            'samples': n,
+            'duration': round(time.time() - self.started, 1),
+            'mos_avg': round(sum(mos) / n, 2),
+            'mos_min': round(min(mos), 2),
+            'jitter_max_ms': round(max(self.columns['jitter_ms'][:n]), 3),
+            'loss_max_pct': round(max(self.columns['loss_pct'][:n]), 3),
+            'rtt_max_ms': round(max(self.columns['rtt_ms'][:n]), 3)
+        }
+
+class CallQualityCollector:
+    """
+    Samples the media quality of every tagged call with active media on a
+    fixed cadence. Each call's Call.dump_status() text is parsed into jitter,
+    loss, RTT, codec and bitrate, scored with an estimated MOS and recorded
+    into a per-call QualitySeries. Loss is computed over the interval since
+    an earlier sample, so it reflects recent audio rather than the whole
+    call. Packet totals are rounded in the dump, so the interval is only
+    closed once it spans MIN_INTERVAL_STEPS rounding steps; until then the
+    sample reports the loss of the whole call.
+    Summaries of calls that have ended are kept for the last `keep_ended`
+    calls. Subscribers get {call_id: latest sample} after every tick, on the
+    collector thread.
+    """
+    # Keeps the rounding error of the interval's packet count below 10%
+    MIN_INTERVAL_STEPS = 10
+
+    def __init__(self, lib, interval=5.0, capacity=120, keep_ended=50):
+        self.lib = lib
+        self.interval = interval
+        self.capacity = capacity
+        self.keep_ended = keep_ended
+        self.ticks = 0
+        self.errors = 0
+        self.sample_total = 0.0
+        self.sample_max = 0.0
+        self._series = {}
+        self._ended = OrderedDict()
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the collector thread"""
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="call-quality")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """Stop the collector thread"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def call_stats(self, call_id, samples=None):
+        """
+        Summary and time series of a live call, or the summary of a recently
+        ended one. None if the call is unknown.
+        """
+        with self._lock:
+            series = self._series.get(call_id)
+            if series is None:
+                summary = self._ended.get(call_id)
+                return {'active': False, 'summary': summary} if summary else None
+            return {
+                'active': True,
+                'summary': series.summary(),
+                'latest': series.latest(),
+                'series': series.series(samples)
+            }
+
+    def get_stats(self):
+        """Collector health: calls sampled and time spent per tick"""
+        ticks = self.ticks
+        return {
+            'calls': len(self._series),
+            'ticks': ticks,
+            'errors': self.errors,
+            'sample_avg_ms': round(self.sample_total / ticks * 1000.0, 3) if ticks else 0.0,
+            'sample_max_ms': round(self.sample_max * 1000.0, 3)
+        }
+
+    def _run(self):
+        try:
+            self.lib.thread_register("call quality")
+        except Exception as e:
+            print(f"Call quality collector could not register with pjsua: {e}", file=sys.stderr)
+            return
+
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        start = time.perf_counter()
+        now = time.time()
+        latest = {}
+        seen = set()
+        for call_id, call in self.lib.calls.tagged().items():
+            info = call.cached_info()
+            if info is None or info.media_state != pj.MediaState.ACTIVE:
+                continue
+            seen.add(call_id)
+            try:
+                stats = parse_dump(call.dump_status(max_len=4096))
+            except Exception as e:
+                self.errors += 1
+                print(f"Error collecting quality of call {call_id}: {e}", file=sys.stderr)
+                continue
+            sample = self._record(call_id, stats, now)
+            if sample:
+                latest[call_id] = sample
+
+        with self._lock:
+            for call_id in [c for c in self._series if c not in seen and self.lib.calls.by_tag(c) is None]:
+                self._ended[call_id] = self._series.pop(call_id).summary()
+                if len(self._ended) > self.keep_ended:
+                    self._ended.popitem(last=False)
+            self.ticks += 1
+            subscribers = list(self._subscribers)
+        elapsed = time.perf_counter() - start
+        self.sample_total += elapsed
+        if elapsed > self.sample_max:
+            self.sample_max = elapsed
+
+        if latest:
+            for callback in subscribers:
+                try:
+                    callback(latest)
+                except Exception as e:
+                    print(f"Error in call quality subscriber: {e}", file=sys.stderr)
+
+    def _record(self, call_id, stats, now):
+        rx = stats['rx']
+        tx = stats['tx']
+        if rx is None:
+            return None
+        with self._lock:
+            series = self._series.get(call_id)
+            if series is None:
+                series = self._series[call_id] = QualitySeries(self.capacity)
+            series.codec = stats['codec']
+            # Loss over the interval since the last sample that closed one
+            packets = rx['packets'] or 0.0
+            lost = rx['lost'] or 0
+            loss_pct = rx['loss_pct'] or 0.0
+            if series.last is None:
+                series.last = (packets, lost)
+            else:
+                d_packets = packets - series.last[0]
+                d_lost = lost - series.last[1]
+                if d_packets >= self.MIN_INTERVAL_STEPS * (rx['packets_step'] or 1.0):
+                    if d_lost <= 0:
+                        loss_pct = 0.0
+                    else:
+                        loss_pct = min(100.0, 100.0 * d_lost / (d_packets + d_lost))
+                    series.last = (packets, lost)
+            jitter = rx['jitter_ms'] or 0.0
+            rtt = stats['rtt_ms'] or 0.0
+            sample = {
+                'time': now,
+                'jitter_ms': jitter,
+                'loss_pct': loss_pct,
+                'rtt_ms': rtt,
+                'rx_kbps': rx['kbps'] or 0.0,
+                'tx_kbps': (tx['kbps'] if tx else None) or 0.0,
+                'mos': estimate_mos(rtt, jitter, loss_pct)
+            }
+            series.record(sample)
+            return series.latest()
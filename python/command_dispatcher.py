@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+import asyncio
+import bisect
+import sys
+import time
+
+# Marks a command argument that has no default
+REQUIRED = object()
+
+class CommandError(Exception):
+    """Raised when a command's arguments are invalid"""
+    pass
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram.
+    Bucket bounds grow geometrically (four buckets per doubling) from
+    1 microsecond to about two minutes, so recording is a bisect and
+    an increment, and percentiles are accurate to within ~19%.
+    """
+    BOUNDS_MS = [0.001 * 2 ** (i / 4) for i in range(108)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.total = 0
+        self.max_ms = 0.0
+        self.sum_ms = 0.0
+
+    def record(self, elapsed_ms):
+        self.counts[bisect.bisect_left(self.BOUNDS_MS, elapsed_ms)] += 1
+        self.total += 1
+        self.sum_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the given percentile, in ms"""
+        if not self.total:
+            return 0.0
+        rank = pct / 100.0 * self.total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                if i < len(self.BOUNDS_MS):
+                    return min(self.BOUNDS_MS[i], self.max_ms)
+                return self.max_ms
+        return self.max_ms
+
+class CommandMetrics:
+    """Call count, error count and latency histogram for one command"""
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.latency = LatencyHistogram()
+
+    def record(self, elapsed_ms, failed):
+        self.count += 1
+        if failed:
+            self.errors += 1
+        self.latency.record(elapsed_ms)
+
+    def snapshot(self):
+        latency = self.latency
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'p50_ms': round(latency.percentile(50), 3),
+            'p95_ms': round(latency.percentile(95), 3),
+            'p99_ms': round(latency.percentile(99), 3),
+            'max_ms': round(latency.max_ms, 3),
+            'avg_ms': round(latency.sum_ms / latency.total, 3) if latency.total else 0.0
+        }
+
+class CommandDispatcher:
+    """
+    Maps frontend command names to handlers.
+    Each handler is registered with an argument schema: a list of
+    (field, type, default) tuples whose values are pulled from the command
+    and passed to the handler positionally, in schema order. Use REQUIRED
+    as the default for mandatory fields. Coroutine handlers are awaited.
+    """
+    def __init__(self, on_error=None):
+        self.handlers = {}
+        self.metrics = {}
+        self.on_error = on_error
+        self.unknown_commands = 0
+
+    def register(self, name, handler, schema=()):
+        """Register a handler for a command name"""
+        self.handlers[name] = (handler, tuple(schema), asyncio.iscoroutinefunction(handler))
+        self.metrics.setdefault(name, CommandMetrics())
+
+    def parse_args(self, name, command):
+        """Validate a command against its schema and return the handler args"""
+        args = []
+        for field, field_type, default in self.handlers[name][1]:
+            value = command.get(field, default)
+            if value is REQUIRED:
+                raise CommandError(f"'{name}' requires '{field}'")
+            if value is not None and field_type is not None and not self._matches(value, field_type):
+                raise CommandError(f"'{name}': '{field}' must be {self._type_name(field_type)}")
+            args.append(value)
+        return args
+
+    async def dispatch(self, command):
+        """Run a command and record its latency. Errors go to on_error."""
+        name = command.get('command') if isinstance(command, dict) else None
+        if name not in self.handlers:
+            # Not reported to the frontend: it also sends commands that
+            # other builds of the backend handle
+            self.unknown_commands += 1
+            print(f"Unknown command: {name}", file=sys.stderr)
+            return
+
+        handler, _, is_async = self.handlers[name]
+        failed = False
+        start = time.perf_counter()
+        try:
+            args = self.parse_args(name, command)
+            if is_async:
+                await handler(*args)
+            else:
+                handler(*args)
+        except Exception as e:
+            failed = True
+            self._report(name, e)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000.0
+            self.metrics[name].record(elapsed_ms, failed)
+
+    def get_metrics(self):
+        """Return a snapshot of the metrics of every command that has run"""
+        return {name: m.snapshot() for name, m in self.metrics.items() if m.count}
+
+    def _report(self, name, error):
+        print(f"Error handling command {name}: {error}", file=sys.stderr)
+        if self.on_error:
+            self.on_error(name, error)
+
+    @staticmethod
+    def _matches(value, field_type):
+        # bool is a subclass of int, but true/false is not a valid number
+        if isinstance(value, bool):
+            types = field_type if isinstance(field_type, tuple) else (field_type,)
+            return bool in types
+        return isinstance(value, field_type)
+
+    @staticmethod
+    def _type_name(field_type):
+        if isinstance(field_type, tuple):
+            return ' or '.join(t.__name__ for t in field_type)
+        return field_type.__name__
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+import threading
+import uuid
+
+class ConferenceGroup:
+    """One conference: its member calls and their conference slots"""
+    def __init__(self, group_id, name):
+        self.group_id = group_id
+        self.name = name
+        self.members = {}
+
+    @property
+    def slots(self):
+        return list(self.members.values())
+
+    def snapshot(self):
+        return {'group_id': self.group_id, 'name': self.name, 'members': list(self.members)}
+
+class ConferenceManager:
+    """
+    Keeps each conference as an explicit group of call slots, so several
+    conferences can run side by side without hearing each other. Adding a
+    call connects it to the group's members only and removing it
+    disconnects those links only, i.e. both cost O(members) bridge
+    operations instead of rewiring every call. Bridge failures are
+    returned as the (src, dst, err) tuples of the Lib.conf_*_many() calls.
+    """
+    def __init__(self, lib):
+        self.lib = lib
+        self.groups = {}
+        self._by_call = {}
+        self._lock = threading.Lock()
+
+    def create(self, members, name=None):
+        """
+        Start a conference from a {call_id: slot} dict. Calls already in
+        another conference are moved out of it first.
+        Returns (group, results).
+        """
+        with self._lock:
+            results = []
+            for call_id in members:
+                results += self._leave(call_id, disconnect=True)
+            group_id = uuid.uuid4().hex[:6]
+            group = ConferenceGroup(group_id, name or f"Conference-{group_id}")
+            self.groups[group_id] = group
+            group.members.update(members)
+            for call_id in members:
+                self._by_call[call_id] = group
+            results += self.lib.conf_connect_mesh(group.slots)
+            return group, results
+
+    def add(self, group_id, call_id, slot):
+        """Add a call to a conference. Returns (group, results)."""
+        with self._lock:
+            group = self.groups.get(group_id)
+            if group is None:
+                raise KeyError(f"Unknown conference '{group_id}'")
+            if group.members.get(call_id) == slot:
+                return group, []
+            results = self._leave(call_id, disconnect=True)
+            results += self.lib.conf_attach_to_mesh(slot, group.slots)
+            group.members[call_id] = slot
+            self._by_call[call_id] = group
+            return group, results
+
+    def remove(self, call_id, disconnect=True):
+        """
+        Take a call out of its conference. Pass disconnect=False when the
+        call's port is already gone from the bridge. Returns (group, results),
+        group being None if the call was in no conference. A conference
+        that loses its last member is dropped.
+        """
+        with self._lock:
+            group = self._by_call.get(call_id)
+            return group, self._leave(call_id, disconnect)
+
+    def end(self, group_id):
+        """Tear down a conference's links. Returns (member call ids, results)."""
+        with self._lock:
+            group = self.groups.pop(group_id, None)
+            if group is None:
+                raise KeyError(f"Unknown conference '{group_id}'")
+            for call_id in group.members:
+                self._by_call.pop(call_id, None)
+            return list(group.members), self.lib.conf_disconnect_mesh(group.slots)
+
+    def group_of(self, call_id):
+        return self._by_call.get(call_id)
+
+    def get(self, group_id=None):
+        """A conference by id. Without an id, the only conference, if there is exactly one."""
+        if group_id is not None:
+            return self.groups.get(group_id)
+        groups = list(self.groups.values())
+        return groups[0] if len(groups) == 1 else None
+
+    def snapshot(self):
+        return [group.snapshot() for group in list(self.groups.values())]
+
+    def _leave(self, call_id, disconnect):
+        group = self._by_call.pop(call_id, None)
+        if group is None:
+            return []
+        slot = group.members.pop(call_id)
+        results = []
+        if disconnect and group.members:
+            pairs = []
+            for other in group.slots:
+                if other != slot:
+                    pairs.append((slot, other))
+                    pairs.append((other, slot))
+            results = self.lib.conf_disconnect_many(pairs)
+        if not group.members:
+            self.groups.pop(group.group_id, None)
+        return results
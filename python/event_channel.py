@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+import json
+import os
+import sys
+import threading
+import time
+
+class EventChannel:
+    """
+    Framed event channel from the backend to the Electron frontend.
+    Every event is written as one line of JSON (newline-delimited records)
+    on a file descriptor reserved for events, so log output never ends up
+    in the middle of a record. Events queued within one tick are coalesced
+    into a single write by a background writer thread.
+    """
+    def __init__(self, fd=None, tick=0.005):
+        if fd is None:
+            fd = self.open_event_fd()
+        self.fd = fd
+        self.tick = tick
+        self.events_sent = 0
+        self.writes = 0
+        self._pending = []
+        self._writing = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._writer = threading.Thread(target=self._run, name="event-channel")
+        self._writer.daemon = True
+        self._writer.start()
+
+    @staticmethod
+    def open_event_fd():
+        """
+        Get the file descriptor to write events to.
+
+        Electron hands the backend an extra pipe and names it in the
+        SOFTPHONE_EVENT_FD environment variable. When started without one
+        (e.g. from a terminal), stdout is duplicated for events and fd 1 is
+        pointed at stderr, so print() and pjsip console logging stay off
+        the event stream.
+        """
+        env_fd = os.environ.get('SOFTPHONE_EVENT_FD')
+        if env_fd:
+            return int(env_fd)
+        sys.stdout.flush()
+        event_fd = os.dup(sys.stdout.fileno())
+        os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+        return event_fd
+
+    def send(self, message):
+        """Queue an event for the frontend"""
+        record = json.dumps(message, separators=(',', ':')).encode('utf-8') + b'\n'
+        with self._cond:
+            if self._closed:
+                return
+            self._pending.append(record)
+            self._cond.notify()
+
+    def flush(self, timeout=1.0):
+        """Wait until every queued event has been written"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._writing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=1.0):
+        """Write out the queued events and stop the writer thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    break
+                closed = self._closed
+
+            # Let the rest of this tick's events pile up behind the first one
+            if not closed:
+                time.sleep(self.tick)
+
+            with self._cond:
+                batch = self._pending
+                self._pending = []
+                self._writing = True
+            try:
+                self._write(b''.join(batch))
+                self.events_sent += len(batch)
+                self.writes += 1
+            except OSError as e:
+                print(f"Error writing events to frontend: {e}", file=sys.stderr)
+                with self._cond:
+                    self._closed = True
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+
+    def _write(self, data):
+        view = memoryview(data)
+        while view:
+            written = os.write(self.fd, view)
+            view = view[written:]
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+import array
+import math
+import sys
+import threading
+import time
+
+class LevelRing:
+    """
+    Fixed-size ring of (tx, rx) signal levels for one conference slot.
+    Both directions are stored in preallocated float arrays, so recording
+    a sample never allocates.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.tx = array.array('f', bytes(4 * capacity))
+        self.rx = array.array('f', bytes(4 * capacity))
+        self.pos = 0
+        self.count = 0
+
+    def record(self, tx_level, rx_level):
+        self.tx[self.pos] = tx_level
+        self.rx[self.pos] = rx_level
+        self.pos = (self.pos + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def latest(self):
+        """Most recent (tx, rx) pair, or (0.0, 0.0) before the first sample"""
+        if not self.count:
+            return (0.0, 0.0)
+        i = self.pos - 1
+        return (self.tx[i], self.rx[i])
+
+    def window(self, samples=None):
+        """The last n samples of each direction, oldest first"""
+        n = self.count if samples is None else min(samples, self.count)
+        start = (self.pos - n) % self.capacity
+        if start + n <= self.capacity:
+            return self.tx[start:start + n], self.rx[start:start + n]
+        wrap = start + n - self.capacity
+        return (self.tx[start:] + self.tx[:wrap],
+                self.rx[start:] + self.rx[:wrap])
+
+def window_stats(levels, silence_threshold):
+    """RMS, peak and fraction of silent samples of a run of levels"""
+    n = len(levels)
+    if not n:
+        return {'rms': 0.0, 'peak': 0.0, 'silence': 1.0}
+    squares = 0.0
+    peak = 0.0
+    silent = 0
+    for level in levels:
+        squares += level * level
+        if level > peak:
+            peak = level
+        if level < silence_threshold:
+            silent += 1
+    return {
+        'rms': round(math.sqrt(squares / n), 4),
+        'peak': round(peak, 4),
+        'silence': round(silent / n, 4)
+    }
+
+class LevelSampler:
+    """
+    Samples the signal levels of the tracked conference slots on a fixed
+    cadence. Each tick reads every slot with one Lib.conf_get_signal_levels()
+    call, i.e. one hold of the library lock, and records the levels into a
+    per-slot LevelRing. Subscribers get the latest levels of every slot
+    every publish_every ticks, on the sampler thread.
+    """
+    def __init__(self, lib, interval=0.05, capacity=200, silence_threshold=0.02):
+        self.lib = lib
+        self.interval = interval
+        self.capacity = capacity
+        self.silence_threshold = silence_threshold
+        self.ticks = 0
+        self.overruns = 0
+        self.errors = 0
+        self.sample_total = 0.0
+        self.sample_max = 0.0
+        self._rings = {}
+        self._slots = ()
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the sampler thread"""
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="level-sampler")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """Stop the sampler thread"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def track(self, slot):
+        """Start sampling a conference slot"""
+        with self._lock:
+            if slot not in self._rings:
+                self._rings[slot] = LevelRing(self.capacity)
+                self._slots = tuple(self._rings)
+
+    def untrack(self, slot):
+        """Stop sampling a conference slot and drop its samples"""
+        with self._lock:
+            if self._rings.pop(slot, None) is not None:
+                self._slots = tuple(self._rings)
+
+    def subscribe(self, callback, publish_every=1):
+        """
+        Call callback({slot: (tx, rx)}) every publish_every ticks.
+        Returns a token for unsubscribe().
+        """
+        token = [callback, max(1, publish_every)]
+        with self._lock:
+            self._subscribers.append(token)
+        return token
+
+    def unsubscribe(self, token):
+        with self._lock:
+            if token in self._subscribers:
+                self._subscribers.remove(token)
+
+    def stats(self, slot, samples=None):
+        """
+        Windowed statistics of a slot over its last samples (all buffered
+        samples by default), or None if the slot is not tracked.
+        """
+        with self._lock:
+            ring = self._rings.get(slot)
+            if ring is None:
+                return None
+            tx, rx = ring.window(samples)
+        return {
+            'samples': len(tx),
+            'tx': window_stats(tx, self.silence_threshold),
+            'rx': window_stats(rx, self.silence_threshold)
+        }
+
+    def get_stats(self):
+        """Sampler health: ticks, overruns and time spent per tick"""
+        ticks = self.ticks
+        return {
+            'slots': len(self._slots),
+            'ticks': ticks,
+            'overruns': self.overruns,
+            'errors': self.errors,
+            'sample_avg_ms': round(self.sample_total / ticks * 1000.0, 3) if ticks else 0.0,
+            'sample_max_ms': round(self.sample_max * 1000.0, 3)
+        }
+
+    def _run(self):
+        try:
+            self.lib.thread_register("level sampler")
+        except Exception as e:
+            print(f"Level sampler could not register with pjsua: {e}", file=sys.stderr)
+            return
+
+        next_tick = time.monotonic()
+        while not self._stop.is_set():
+            self._sample()
+            next_tick += self.interval
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                # Fell behind: skip the missed ticks instead of bursting
+                self.overruns += 1
+                next_tick = time.monotonic()
+                delay = 0
+            self._stop.wait(delay)
+
+    def _sample(self):
+        slots = self._slots
+        if not slots:
+            return
+        start = time.perf_counter()
+        try:
+            results = self.lib.conf_get_signal_levels(slots)
+        except Exception as e:
+            self.errors += 1
+            print(f"Error sampling signal levels: {e}", file=sys.stderr)
+            return
+        elapsed = time.perf_counter() - start
+
+        latest = {}
+        with self._lock:
+            for slot, tx_level, rx_level, err in results:
+                ring = self._rings.get(slot)
+                if ring is None:
+                    continue
+                if err:
+                    self.errors += 1
+                    continue
+                ring.record(tx_level, rx_level)
+                latest[slot] = (tx_level, rx_level)
+            self.ticks += 1
+            ticks = self.ticks
+            subscribers = [cb for cb, every in self._subscribers if ticks % every == 0]
+        self.sample_total += elapsed
+        if elapsed > self.sample_max:
+            self.sample_max = elapsed
+
+        for callback in subscribers:
+            try:
+                callback(latest)
+            except Exception as e:
+                print(f"Error in level subscriber: {e}", file=sys.stderr)
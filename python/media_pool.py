@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+import sys
+import threading
+import pjsua as pj
+
+class MediaAsset:
+    """A WAV prompt, hold music file or playlist and the player that plays it"""
+    def __init__(self, name, files, loop=True, preload=False):
+        self.name = name
+        self.files = files
+        self.loop = loop
+        self.preload = preload
+        self.player_id = None
+        self.slot = -1
+        self.listeners = set()
+        self.opens = 0
+
+    @property
+    def is_playlist(self):
+        return isinstance(self.files, (list, tuple))
+
+class MediaPool:
+    """
+    Shared media players for prompts, hold music and voicemail drops.
+    Each asset is opened by a single WAV player (or playlist) and its
+    conference slot is connected to every call slot listening to it, so
+    playing hold music to many parked calls costs one file reader.
+    The player is destroyed when its last listener detaches, unless the
+    asset is preloaded, in which case it stays open until close().
+    A player that does not loop stops at the end of its file, so an open
+    one is rewound when a listener attaches while nobody is listening;
+    listeners joining a prompt already playing hear the rest of it.
+    """
+    def __init__(self, lib):
+        self.lib = lib
+        self.assets = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, files, loop=True, preload=False):
+        """
+        Add an asset. files is a WAV file name or a list of them for a
+        playlist. Preloaded assets are opened right away.
+        """
+        with self._lock:
+            asset = MediaAsset(name, files, loop, preload)
+            self.assets[name] = asset
+            if preload:
+                self._open(asset)
+        return asset
+
+    def attach(self, name, slot):
+        """Start playing an asset to a conference slot. Returns the player's slot."""
+        with self._lock:
+            asset = self.assets.get(name)
+            if asset is None:
+                raise KeyError(f"Unknown media asset '{name}'")
+            if slot in asset.listeners:
+                return asset.slot
+            if asset.player_id is None:
+                self._open(asset)
+            elif not asset.loop and not asset.listeners:
+                self._rewind(asset)
+            try:
+                self.lib.conf_connect(asset.slot, slot)
+            except pj.Error:
+                if not asset.listeners and not asset.preload:
+                    self._close(asset)
+                raise
+            asset.listeners.add(slot)
+            return asset.slot
+
+    def detach(self, name, slot):
+        """Stop playing an asset to a conference slot."""
+        with self._lock:
+            asset = self.assets.get(name)
+            if asset is None or slot not in asset.listeners:
+                return
+            asset.listeners.discard(slot)
+            try:
+                self.lib.conf_disconnect(asset.slot, slot)
+            except pj.Error as e:
+                # The call's port may already be gone
+                print(f"Error disconnecting {name} from slot {slot}: {e}", file=sys.stderr)
+            if not asset.listeners and not asset.preload:
+                self._close(asset)
+
+    def detach_all(self, slot):
+        """Stop playing every asset to a conference slot, e.g. when its call ends."""
+        for name in [a.name for a in list(self.assets.values()) if slot in a.listeners]:
+            self.detach(name, slot)
+
+    def playing(self, slot):
+        """Names of the assets playing to a conference slot"""
+        return [a.name for a in list(self.assets.values()) if slot in a.listeners]
+
+    def get_stats(self):
+        return {
+            name: {
+                'open': asset.player_id is not None,
+                'listeners': len(asset.listeners),
+                'opens': asset.opens,
+                'preload': asset.preload
+            }
+            for name, asset in list(self.assets.items())
+        }
+
+    def close(self):
+        """Destroy every player."""
+        with self._lock:
+            for asset in self.assets.values():
+                asset.listeners.clear()
+                if asset.player_id is not None:
+                    self._close(asset)
+
+    def _open(self, asset):
+        if asset.is_playlist:
+            asset.player_id = self.lib.create_playlist(list(asset.files), asset.name, asset.loop)
+            asset.slot = self.lib.playlist_get_slot(asset.player_id)
+        else:
+            asset.player_id = self.lib.create_player(asset.files, asset.loop)
+            asset.slot = self.lib.player_get_slot(asset.player_id)
+        asset.opens += 1
+
+    def _rewind(self, asset):
+        if asset.is_playlist:
+            # Playlists cannot seek: start a fresh one
+            self._close(asset)
+            self._open(asset)
+        else:
+            self.lib.player_set_pos(asset.player_id, 0)
+
+    def _close(self, asset):
+        try:
+            if asset.is_playlist:
+                self.lib.playlist_destroy(asset.player_id)
+            else:
+                self.lib.player_destroy(asset.player_id)
+        except pj.Error as e:
+            print(f"Error closing media asset {asset.name}: {e}", file=sys.stderr)
+        asset.player_id = None
+        asset.slot = -1
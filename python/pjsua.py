@@ -59,10 +59,16 @@ tutorial. The paragraphs below explain basic tasks on using this module.
 """
 import _pjsua
 import _thread
+import collections
+import itertools
+import sys
 import threading
+import traceback
 import weakref
 import time
 
+import sip_uri
+
 class Error(BaseException):
     """Error exception class.
     
@@ -242,6 +248,24 @@ class TURNConnType:
     TLS = 255
 
 
+class WorkerMode:
+    """Scheduling modes of the library worker thread.
+
+    Member documentation:
+
+    POLL      -- block in handle_events() with a fixed timeout, holding the
+                 library lock while doing so (the original behavior).
+    ADAPTIVE  -- poll without blocking, then wait outside the library lock.
+                 The wait backs off while the stack is idle and tightens
+                 while calls are active or events are arriving.
+    QUIESCENT -- on every wake-up, poll until no events are pending, then
+                 wait outside the library lock for the idle timeout.
+    """
+    POLL = 0
+    ADAPTIVE = 1
+    QUIESCENT = 2
+
+
 class UAConfig:
     """User agent configuration to be specified in Lib.init().
     
@@ -255,13 +279,22 @@ class UAConfig:
     stun_host   -- the hostname or IP address of the STUN server. This will
                    also be used if DNS SRV resolution for stun_domain fails.
     user_agent  -- Optionally specify the user agent name.
+    thread_cnt  -- number of native worker threads pjsua creates to poll
+                   the SIP stack. Zero (the default) leaves polling to the
+                   Lib worker thread. With native threads, the Python
+                   callbacks are invoked from those threads instead.
     """
-    max_calls = 4
-    nameserver = []
-    stun_domain = ""
-    stun_host = ""
-    user_agent = "pjsip python"
-    
+    __slots__ = ('max_calls', 'thread_cnt', 'nameserver', 'stun_domain',
+                 'stun_host', 'user_agent')
+
+    def __init__(self):
+        self.max_calls = 4
+        self.thread_cnt = 0
+        self.nameserver = []
+        self.stun_domain = ""
+        self.stun_host = ""
+        self.user_agent = "pjsip python"
+
     def _cvt_from_pjsua(self, cfg):
         self.max_calls = cfg.max_calls
         self.thread_cnt = cfg.thread_cnt
@@ -273,7 +306,7 @@ class UAConfig:
     def _cvt_to_pjsua(self):
         cfg = _pjsua.config_default()
         cfg.max_calls = self.max_calls
-        cfg.thread_cnt = 0
+        cfg.thread_cnt = self.thread_cnt
         cfg.nameserver = self.nameserver
         cfg.stun_domain = self.stun_domain
         cfg.stun_host = self.stun_host
@@ -299,13 +332,9 @@ class LogConfig:
                         print str,
 
     """
-    msg_logging = True
-    level = 5
-    console_level = 5
-    decor = 0
-    filename = ""
-    callback = None
-    
+    __slots__ = ('msg_logging', 'level', 'console_level', 'decor', 'filename',
+                 'callback')
+
     def __init__(self, level=-1, filename="", callback=None,
                  console_level=-1):
         self._cvt_from_pjsua(_pjsua.logging_config_default())
@@ -337,6 +366,107 @@ class LogConfig:
         return cfg
 
 
+class WorkerConfig:
+    """Worker thread configuration to be specified in Lib.start().
+
+    Member documentation:
+
+    mode            -- scheduling mode, from WorkerMode constants.
+    poll_timeout    -- handle_events() timeout in milliseconds, for
+                       WorkerMode.POLL.
+    min_timeout     -- shortest wait between polls in milliseconds, used
+                       right after events were handled or an API call
+                       woke the worker.
+    active_timeout  -- longest wait between polls in milliseconds while
+                       there are calls.
+    idle_timeout    -- longest wait between polls in milliseconds while
+                       there are no calls.
+    max_drain       -- maximum number of consecutive polls per wake-up in
+                       WorkerMode.QUIESCENT.
+    """
+    __slots__ = ('mode', 'poll_timeout', 'min_timeout', 'active_timeout',
+                 'idle_timeout', 'max_drain')
+
+    def __init__(self, mode=WorkerMode.ADAPTIVE):
+        self.mode = mode
+        self.poll_timeout = 1
+        self.min_timeout = 1
+        self.active_timeout = 10
+        self.idle_timeout = 50
+        self.max_drain = 64
+
+
+class DispatcherConfig:
+    """Callback dispatcher configuration to be specified in Lib.start().
+
+    The dispatcher moves application callbacks off the thread that polls
+    the SIP stack. Callbacks for the same call, account or buddy always
+    run in order on the same dispatcher thread. Callbacks that must return
+    a value to the stack (incoming SUBSCRIBE, transfer and replace
+    requests, and on_incoming_call2()) still run inline.
+
+    Member documentation:
+
+    thread_cnt  -- number of dispatcher threads.
+    queue_size  -- number of pending callbacks per thread above which the
+                   queue counts as full. The stack thread never waits for
+                   room, since it holds the library lock that callbacks
+                   may need; events over the limit are still queued, and
+                   counted in dispatcher_stats().
+    """
+    __slots__ = ('thread_cnt', 'queue_size')
+
+    def __init__(self, thread_cnt=2, queue_size=256):
+        self.thread_cnt = thread_cnt
+        self.queue_size = queue_size
+
+
+class TraceLevel:
+    """Trace record levels. Lower is more severe; 1 to 6 are the same as
+    the pjsip log levels.
+    """
+    ERROR = 1
+    WARNING = 2
+    INFO = 3
+    DEBUG = 4
+    TRACE = 5
+    DETAIL = 6
+
+
+class TraceConfig:
+    """In-memory trace buffer configuration to be specified in Lib.init().
+
+    The library keeps the most recent trace records in a fixed-size ring:
+    application callbacks with their call id and run time, pjsip log lines
+    and internal object life-cycle events. Records above the configured
+    level are dropped before anything is formatted, so the buffer can stay
+    on in production and be dumped when something goes wrong.
+
+    Member documentation:
+
+    capacity      -- number of records kept. Older records are overwritten.
+    level         -- maximum TraceLevel recorded.
+    capture_log   -- route pjsip log lines into the buffer. This installs
+                     LogConfig.callback, chaining to the application's
+                     callback if one is set and to stdout otherwise. Note
+                     that pjsip only passes lines up to the console level
+                     to the callback.
+    dump_on_error -- write the recent history to stderr when an
+                     application callback raises.
+    dump_seconds  -- seconds of history in such a dump.
+    """
+    __slots__ = ('capacity', 'level', 'capture_log', 'dump_on_error',
+                 'dump_seconds')
+
+    def __init__(self, capacity=4096, level=TraceLevel.INFO,
+                 capture_log=True, dump_on_error=True, dump_seconds=10.0):
+        self.capacity = capacity
+        self.level = level
+        self.capture_log = capture_log
+        self.dump_on_error = dump_on_error
+        self.dump_seconds = dump_seconds
+
+
 class MediaConfig:
     """Media configuration to be specified in Lib.init().
     
@@ -380,28 +510,13 @@ class MediaConfig:
                            the TURNConnType constant.
     turn_cred           -- specify AuthCred for the TURN credential.
     """
-    clock_rate = 16000
-    snd_clock_rate = 0
-    snd_auto_close_time = 5
-    channel_count = 1
-    audio_frame_ptime = 20
-    max_media_ports = 32
-    quality = 6
-    ptime = 0
-    no_vad = False
-    ilbc_mode = 30
-    tx_drop_pct = 0
-    rx_drop_pct = 0
-    ec_options = 0
-    ec_tail_len = 256
-    jb_min = -1
-    jb_max = -1
-    enable_ice = True
-    enable_turn = False
-    turn_server = ""
-    turn_conn_type = TURNConnType.UDP
-    turn_cred = None
-     
+    __slots__ = ('clock_rate', 'snd_clock_rate', 'snd_auto_close_time',
+                 'channel_count', 'audio_frame_ptime', 'max_media_ports',
+                 'quality', 'ptime', 'no_vad', 'ilbc_mode', 'tx_drop_pct',
+                 'rx_drop_pct', 'ec_options', 'ec_tail_len', 'jb_min',
+                 'jb_max', 'enable_ice', 'enable_turn', 'turn_server',
+                 'turn_conn_type', 'turn_cred')
+
     def __init__(self):
         default = _pjsua.media_config_default()
         self._cvt_from_pjsua(default)
@@ -501,23 +616,20 @@ class TransportConfig:
                               2: PJ_QOS_WMM_PRIO_VIDEO: Video priority
                               3: PJ_QOS_WMM_PRIO_VOICE: Voice priority.
     """
-    port = 0
-    bound_addr = ""
-    public_addr = ""
-    
-    qos_type = 0
-    qos_params_flags = 0
-    qos_params_dscp_val = 0
-    qos_params_so_prio = 0
-    qos_params_wmm_prio = 0
-    
-    
+    __slots__ = ('port', 'bound_addr', 'public_addr', 'qos_type',
+                 'qos_params_flags', 'qos_params_dscp_val',
+                 'qos_params_so_prio', 'qos_params_wmm_prio')
 
     def __init__(self, port=0, 
                  bound_addr="", public_addr=""):
         self.port = port
         self.bound_addr = bound_addr
         self.public_addr = public_addr
+        self.qos_type = 0
+        self.qos_params_flags = 0
+        self.qos_params_dscp_val = 0
+        self.qos_params_so_prio = 0
+        self.qos_params_wmm_prio = 0
 
     def _cvt_from_pjsua(self, cfg):
         self.port = cfg.port
@@ -557,15 +669,9 @@ class TransportInfo:
     port        -- the port number.
     ref_cnt     -- number of objects referencing this transport.
     """
-    type = ""
-    description = ""
-    is_reliable = False
-    is_secure = False
-    is_datagram = False
-    host = ""
-    port = 0
-    ref_cnt = 0
-    
+    __slots__ = ('type', 'description', 'is_reliable', 'is_secure',
+                 'is_datagram', 'host', 'port', 'ref_cnt')
+
     def __init__(self, ti):
         self.type = ti.type_name
         self.description = ti.info
@@ -598,23 +704,23 @@ class Transport:
     def info(self):
         """Get TransportInfo.
         """
-        lck = self._lib.auto_lock()
-        ti = _pjsua.transport_get_info(self._id)
-        if not ti:
-            self._lib._err_check("info()", self, -1, "Invalid transport")
-        return TransportInfo(ti)
+        with self._lib.auto_lock():
+            ti = _pjsua.transport_get_info(self._id)
+            if not ti:
+                self._lib._err_check("info()", self, -1, "Invalid transport")
+            return TransportInfo(ti)
 
     def enable(self):
         """Enable this transport."""
-        lck = self._lib.auto_lock()
-        err = _pjsua.transport_set_enable(self._id, True)
-        self._lib._err_check("enable()", self, err)
+        with self._lib.auto_lock():
+            err = _pjsua.transport_set_enable(self._id, True)
+            self._lib._err_check("enable()", self, err)
 
     def disable(self):
         """Disable this transport."""
-        lck = self._lib.auto_lock()
-        err = _pjsua.transport_set_enable(self._id, 0)
-        self._lib._err_check("disable()", self, err)
+        with self._lib.auto_lock():
+            err = _pjsua.transport_set_enable(self._id, 0)
+            self._lib._err_check("disable()", self, err)
 
     def close(self, force=False):
         """Close and destroy this transport.
@@ -622,9 +728,185 @@ class Transport:
         Keyword argument:
         force   -- force deletion of this transport (not recommended).
         """
-        lck = self._lib.auto_lock()
-        err = _pjsua.transport_close(self._id, force)
-        self._lib._err_check("close()", self, err)
+        with self._lib.auto_lock():
+            err = _pjsua.transport_close(self._id, force)
+            self._lib._err_check("close()", self, err)
+
+
+# Transport pool
+class TransportPool:
+    """Set of SIP transports that accounts are spread across, available as
+    Lib.transports.
+
+    Each account (or any other user, identified by a key) is bound to the
+    least used healthy transport of the requested type and keeps it while
+    that transport stays healthy. check() refreshes the usage and health of
+    every transport from Transport.info() and moves the accounts bound with
+    bind() off the transports that have failed.
+    """
+    def __init__(self, lib):
+        self._lib = weakref.proxy(lib)
+        self._entries = []
+        self._by_key = {}
+        self._accounts = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, type, cfg=None, name=None):
+        """Create a transport and add it to the pool.
+
+        Keyword arguments:
+        type    -- transport type from TransportType constant.
+        cfg     -- TransportConfig instance.
+        name    -- name reported in stats(). Defaults to the type and port.
+
+        Return:
+            Transport object
+        """
+        transport = self._lib.create_transport(type, cfg)
+        entry = _PoolEntry(transport, type, name)
+        entry.refresh()
+        if not entry.name:
+            entry.name = "%s:%d" % (entry.info.type if entry.info else type,
+                                    entry.info.port if entry.info else 0)
+        self._entries.append(entry)
+        return transport
+
+    def select(self, key=None, type=None):
+        """Get the transport for a key, binding the key to the least used
+        healthy transport of the type if it is not bound yet.
+
+        Keyword arguments:
+        key     -- hashable key identifying the user of the transport,
+                   e.g. the account URI. None selects without binding.
+        type    -- TransportType constant, or None for any type.
+
+        Return:
+            Transport object, or None if the pool has no healthy transport
+            of that type.
+        """
+        entry = self._by_key.get(key) if key is not None else None
+        if entry and entry.healthy and (type is None or entry.type == type):
+            return entry.transport
+        candidates = [e for e in self._entries
+                      if e.healthy and (type is None or e.type == type)]
+        if not candidates:
+            return None
+        best = min(candidates, key=lambda e: (e.keys, e.ref_cnt))
+        if key is not None:
+            if entry:
+                entry.keys -= 1
+            best.keys += 1
+            self._by_key[key] = best
+        return best.transport
+
+    def bind_config(self, acc_cfg, key=None, type=None):
+        """Bind an AccountConfig to a transport from the pool before the
+        account is created.
+
+        Return:
+            Transport object, or None if no transport is available, in
+            which case pjsua picks one.
+        """
+        transport = self.select(key if key is not None else acc_cfg.id,
+                                type)
+        if transport:
+            acc_cfg.transport_id = transport._id
+        return transport
+
+    def bind(self, account, key=None, type=None):
+        """Bind an existing account to a transport from the pool with
+        Account.set_transport(). check() rebinds it if the transport fails.
+
+        Return:
+            Transport object, or None if no transport is available.
+        """
+        key = key if key is not None else account._id
+        transport = self.select(key, type)
+        if transport:
+            account.set_transport(transport)
+            self._accounts[key] = (weakref.ref(account), type)
+        return transport
+
+    def release(self, key):
+        """Forget the binding of a key."""
+        entry = self._by_key.pop(key, None)
+        if entry:
+            entry.keys -= 1
+        self._accounts.pop(key, None)
+
+    def check(self):
+        """Refresh usage and health of every transport and move the
+        accounts bound with bind() off failed transports.
+
+        Return:
+            list of keys that were moved to another transport.
+        """
+        for entry in self._entries:
+            entry.refresh()
+        moved = []
+        for key, (acc_ref, type) in list(self._accounts.items()):
+            entry = self._by_key.get(key)
+            account = acc_ref()
+            if account is None:
+                self.release(key)
+            elif entry and not entry.healthy:
+                try:
+                    # Stay on the same kind of transport
+                    if self.bind(account, key,
+                                 type if type is not None else entry.type):
+                        moved.append(key)
+                except Error as e:
+                    _Trace(('transport rebind failed', key, e))
+        return moved
+
+    def stats(self):
+        """Return list of dict with the usage and health of every
+        transport."""
+        return [entry.stats() for entry in self._entries]
+
+    def _clear(self):
+        del self._entries[:]
+        self._by_key.clear()
+        self._accounts.clear()
+
+
+class _PoolEntry:
+    def __init__(self, transport, type, name):
+        self.transport = transport
+        self.type = type
+        self.name = name
+        self.info = None
+        self.healthy = False
+        self.keys = 0
+        self.ref_cnt = 0
+        self.failures = 0
+        self.last_error = ""
+
+    def refresh(self):
+        try:
+            self.info = self.transport.info()
+            self.ref_cnt = self.info.ref_cnt
+            self.healthy = True
+        except Error as e:
+            self.healthy = False
+            self.failures += 1
+            self.last_error = str(e)
+
+    def stats(self):
+        info = self.info
+        return {
+            'name': self.name,
+            'type': info.type if info else self.type,
+            'host': info.host if info else "",
+            'port': info.port if info else 0,
+            'healthy': self.healthy,
+            'bound': self.keys,
+            'ref_cnt': self.ref_cnt,
+            'failures': self.failures,
+            'last_error': self.last_error
+        }
 
 
 class SIPUri:
@@ -657,8 +939,10 @@ class SIPUri:
         uri -- the URI string.
 
         """
+        parsed = sip_uri.parse_uri(uri)
         self.scheme, self.user, self.host, self.port, self.transport = \
-            _pjsua.parse_simple_uri(uri)
+            parsed.scheme, parsed.user, parsed.host, parsed.port, \
+            parsed.transport
 
     def encode(self):
         """Encode this object into SIP URI string.
@@ -672,7 +956,7 @@ class SIPUri:
             output = output + self.user + "@"
         output = output + self.host
         if self.port:
-            output = output + ":" + output(self.port)
+            output = output + ":" + str(self.port)
         if self.transport:
             output = output + ";transport=" + self.transport
         return output
@@ -689,11 +973,7 @@ class AuthCred:
     passwd_type -- password encoding (zero for plain-text)
     passwd      -- the password
     """
-    scheme = "Digest"
-    realm = "*"
-    username = ""
-    passwd_type = 0
-    passwd = ""
+    __slots__ = ('scheme', 'realm', 'username', 'passwd_type', 'passwd')
 
     def __init__(self, realm, username, passwd, scheme="Digest", passwd_type=0):
         self.scheme = scheme
@@ -757,26 +1037,13 @@ class AccountConfig:
     rtp_transport_cfg       -- the rtp-transport-configuration that is usede, when
                                a rtp-connection is being established.
     """
-    priority = 0
-    id = ""
-    force_contact = ""
-    reg_uri = ""
-    reg_timeout = 0
-    require_100rel = False
-    publish_enabled = False
-    pidf_tuple_id = ""
-    proxy = []
-    auth_cred = []
-    auth_initial_send = False
-    auth_initial_algorithm = ""
-    transport_id = -1
-    allow_contact_rewrite = True
-    ka_interval = 15
-    ka_data = "\r\n"
-    use_srtp = 0
-    srtp_secure_signaling = 1
-    rtp_transport_cfg = None
-    mwi_enabled = False
+    __slots__ = ('priority', 'id', 'force_contact', 'reg_uri', 'reg_timeout',
+                 'require_100rel', 'publish_enabled', 'pidf_tuple_id',
+                 'proxy', 'auth_cred', 'auth_initial_send',
+                 'auth_initial_algorithm', 'transport_id',
+                 'allow_contact_rewrite', 'ka_interval', 'ka_data',
+                 'use_srtp', 'srtp_secure_signaling', 'rtp_transport_cfg',
+                 'mwi_enabled')
 
     def __init__(self, domain="", username="", password="", 
                  display="", registrar="", proxy=""):
@@ -797,6 +1064,8 @@ class AccountConfig:
                      will be constructed from the domain name.
 
         """
+        self.auth_cred = []
+        self.rtp_transport_cfg = None
         default = _pjsua.acc_config_default()
         self._cvt_from_pjsua(default)
         if domain!="":
@@ -929,14 +1198,8 @@ class AccountInfo:
     online_text     -- the account's presence status text.
 
     """
-    is_default = False
-    uri = ""
-    reg_active = False
-    reg_expires = -1
-    reg_status = 0
-    reg_reason = ""
-    online_status = False
-    online_text = ""
+    __slots__ = ('is_default', 'uri', 'reg_active', 'reg_expires',
+                 'reg_status', 'reg_reason', 'online_status', 'online_text')
 
     def __init__(self, ai):
         self.is_default = ai.is_default
@@ -1153,19 +1416,19 @@ class Account:
     def info(self):
         """Retrieve AccountInfo for this account.
         """
-        lck = self._lib().auto_lock()
-        ai = _pjsua.acc_get_info(self._id)
-        if ai==None:
-            self._lib()._err_check("info()", self, -1, "Invalid account")
-        return AccountInfo(ai)
+        with self._lib().auto_lock():
+            ai = _pjsua.acc_get_info(self._id)
+            if ai==None:
+                self._lib()._err_check("info()", self, -1, "Invalid account")
+            return AccountInfo(ai)
 
     def is_valid(self):
         """
         Check if this account is still valid.
 
         """
-        lck = self._lib().auto_lock()
-        return _pjsua.acc_is_valid(self._id)
+        with self._lib().auto_lock():
+            return _pjsua.acc_is_valid(self._id)
 
     def set_callback(self, cb):
         """Register callback to receive notifications from this object.
@@ -1185,28 +1448,28 @@ class Account:
         and as the account to receive incoming requests when more exact
         matching criteria fails.
         """
-        lck = self._lib().auto_lock()
-        err = _pjsua.acc_set_default(self._id)
-        self._lib()._err_check("set_default()", self, err)
+        with self._lib().auto_lock():
+            err = _pjsua.acc_set_default(self._id)
+            self._lib()._err_check("set_default()", self, err)
 
     def is_default(self):
         """ Check if this account is the default account.
 
         """
-        lck = self._lib().auto_lock()
-        def_id = _pjsua.acc_get_default()
-        return self.is_valid() and def_id==self._id
+        with self._lib().auto_lock():
+            def_id = _pjsua.acc_get_default()
+            return self.is_valid() and def_id==self._id
 
     def delete(self):
         """ Delete this account.
         
         """
-        lck = self._lib().auto_lock()
-        err = _pjsua.acc_set_user_data(self._id, 0)
-        self._lib()._err_check("delete()", self, err)
-        err = _pjsua.acc_del(self._id)
-        self._lib()._err_check("delete()", self, err)
-        self._id = -1
+        with self._lib().auto_lock():
+            err = _pjsua.acc_set_user_data(self._id, 0)
+            self._lib()._err_check("delete()", self, err)
+            err = _pjsua.acc_del(self._id)
+            self._lib()._err_check("delete()", self, err)
+            self._id = -1
 
     def set_basic_status(self, is_online):
         """ Set basic presence status of this account.
@@ -1215,9 +1478,9 @@ class Account:
         is_online   -- boolean to indicate basic presence availability.
 
         """
-        lck = self._lib().auto_lock()
-        err = _pjsua.acc_set_online_status(self._id, is_online)
-        self._lib()._err_check("set_basic_status()", self, err)
+        with self._lib().auto_lock():
+            err = _pjsua.acc_set_online_status(self._id, is_online)
+            self._lib()._err_check("set_basic_status()", self, err)
 
     def set_presence_status(self, is_online, 
                             activity=PresenceActivity.UNKNOWN, 
@@ -1232,10 +1495,10 @@ class Account:
         rpid_id     -- optional string to be placed as RPID ID. 
 
         """
-        lck = self._lib().auto_lock()
-        err = _pjsua.acc_set_online_status2(self._id, is_online, activity,
-                                            pres_text, rpid_id)
-        self._lib()._err_check("set_presence_status()", self, err)
+        with self._lib().auto_lock():
+            err = _pjsua.acc_set_online_status2(self._id, is_online, activity,
+                                                pres_text, rpid_id)
+            self._lib()._err_check("set_presence_status()", self, err)
 
     def set_registration(self, renew):
         """Manually renew registration or unregister from the server.
@@ -1245,9 +1508,9 @@ class Account:
                    Setting this value for False will trigger unregistration.
 
         """
-        lck = self._lib().auto_lock()
-        err = _pjsua.acc_set_registration(self._id, renew)
-        self._lib()._err_check("set_registration()", self, err)
+        with self._lib().auto_lock():
+            err = _pjsua.acc_set_registration(self._id, renew)
+            self._lib()._err_check("set_registration()", self, err)
 
     def set_transport(self, transport):
         """Set this account to only use the specified transport to send
@@ -1257,9 +1520,9 @@ class Account:
         transport   -- Transport object.
 
         """
-        lck = self._lib().auto_lock()
-        err = _pjsua.acc_set_transport(self._id, transport._id)
-        self._lib()._err_check("set_transport()", self, err)
+        with self._lib().auto_lock():
+            err = _pjsua.acc_set_transport(self._id, transport._id)
+            self._lib()._err_check("set_transport()", self, err)
 
     def make_call(self, dst_uri, cb=None, hdr_list=None):
         """Make outgoing call to the specified URI.
@@ -1276,13 +1539,13 @@ class Account:
         Return:
             Call instance.
         """
-        lck = self._lib().auto_lock()
-        call = Call(self._lib(), -1, cb)
-        err, cid = _pjsua.call_make_call(self._id, dst_uri, 0, 
-                                         call, Lib._create_msg_data(hdr_list))
-        self._lib()._err_check("make_call()", self, err)
-        call.attach_to_id(cid)
-        return call
+        with self._lib().auto_lock():
+            call = Call(self._lib(), -1, cb)
+            err, cid = _pjsua.call_make_call(self._id, dst_uri, 0, 
+                                             call, Lib._create_msg_data(hdr_list))
+            self._lib()._err_check("make_call()", self, err)
+            call.attach_to_id(cid)
+            return call
 
     def add_buddy(self, uri, cb=None):
         """Add new buddy.
@@ -1297,14 +1560,17 @@ class Account:
         Return:
             Buddy object
         """
-        lck = self._lib().auto_lock()
-        buddy_cfg = _pjsua.buddy_config_default()
-        buddy_cfg.uri = uri
-        buddy_cfg.subscribe = False
-        err, buddy_id = _pjsua.buddy_add(buddy_cfg)
-        self._lib()._err_check("add_buddy()", self, err)
-        buddy = Buddy(self._lib(), buddy_id, self, cb)
-        return buddy
+        with self._lib().auto_lock():
+            buddy_cfg = _pjsua.buddy_config_default()
+            buddy_cfg.uri = uri
+            buddy_cfg.subscribe = False
+            err, buddy_id = _pjsua.buddy_add(buddy_cfg)
+            self._lib()._err_check("add_buddy()", self, err)
+            buddy = Buddy(self._lib(), buddy_id, self, cb)
+            if buddy._uri_key:
+                self._lib()._buddy_index.setdefault(buddy._uri_key,
+                                                    []).append(buddy)
+            return buddy
 
     def pres_notify(self, pres_obj, state, reason="", hdr_list=None):
         """Send NOTIFY to inform account presence status or to terminate
@@ -1317,9 +1583,9 @@ class Account:
         reason      -- Optional reason phrase.
         hdr_list    -- Optional header list.
         """
-        lck = self._lib().auto_lock()
-        _pjsua.acc_pres_notify(self._id, pres_obj, state, reason, 
-                               Lib._create_msg_data(hdr_list))
+        with self._lib().auto_lock():
+            _pjsua.acc_pres_notify(self._id, pres_obj, state, reason, 
+                                   Lib._create_msg_data(hdr_list))
     
     def send_pager(self, uri, text, im_id=0, content_type="text/plain", \
                    hdr_list=None):
@@ -1336,12 +1602,12 @@ class Account:
                         request.
 
         """
-        lck = self._lib().auto_lock()
-        err = _pjsua.im_send(self._id, uri, \
-                             content_type, text, \
-                             Lib._create_msg_data(hdr_list), \
-                             im_id)
-        self._lib()._err_check("send_pager()", self, err)
+        with self._lib().auto_lock():
+            err = _pjsua.im_send(self._id, uri, \
+                                 content_type, text, \
+                                 Lib._create_msg_data(hdr_list), \
+                                 im_id)
+            self._lib()._err_check("send_pager()", self, err)
 
 class CallCallback:
     """Class to receive event notification from Call objects. 
@@ -1514,26 +1780,31 @@ class CallInfo:
     call_time       -- call's connected duration in seconds.
     total_time      -- total call duration in seconds.
     """
-    role = CallRole.CALLER
-    account = None
-    uri = ""
-    contact = ""
-    remote_uri = ""
-    remote_contact = ""
-    sip_call_id = ""
-    state = CallState.NULL
-    state_text = ""
-    last_code = 0
-    last_reason = ""
-    media_state = MediaState.NULL
-    media_dir = MediaDir.NULL
-    conf_slot = -1
-    call_time = 0
-    total_time = 0
+    __slots__ = ('role', 'account', 'uri', 'contact', 'remote_uri',
+                 'remote_contact', 'sip_call_id', 'state', 'state_text',
+                 'last_code', 'last_reason', 'media_state', 'media_dir',
+                 'conf_slot', 'call_time', 'total_time')
 
     def __init__(self, lib=None, ci=None):
         if lib and ci:
             self._cvt_from_pjsua(lib, ci)
+            return
+        self.role = CallRole.CALLER
+        self.account = None
+        self.uri = ""
+        self.contact = ""
+        self.remote_uri = ""
+        self.remote_contact = ""
+        self.sip_call_id = ""
+        self.state = CallState.NULL
+        self.state_text = ""
+        self.last_code = 0
+        self.last_reason = ""
+        self.media_state = MediaState.NULL
+        self.media_dir = MediaDir.NULL
+        self.conf_slot = -1
+        self.call_time = 0
+        self.total_time = 0
 
     def _cvt_from_pjsua(self, lib, ci):
         self.role = ci.role
@@ -1563,7 +1834,12 @@ class Call:
     _id = -1
     _cb = None
     _lib = None
-    _obj_name = ""
+    _info_cache = None
+    _tag = None
+    _sip_call_id = ""
+    _number = ""
+    _state = None
+    _media_state = None
 
     def __init__(self, lib, call_id, cb=None):
         self._lib = weakref.ref(lib)
@@ -1577,18 +1853,23 @@ class Call:
         _Trace((self, 'destroyed'))
 
     def __str__(self):
-        return self._obj_name
+        if self._info_cache:
+            return "{Call " + self._info_cache.remote_uri + "}"
+        if self._id != -1:
+            return "{Call %d}" % self._id
+        return "{Call object}"
 
     def attach_to_id(self, call_id):
-        lck = self._lib().auto_lock()
-        if self._id != -1:
-            _pjsua.call_set_user_data(self._id, 0)
-        self._id = call_id
-        if self._id != -1:
-            _pjsua.call_set_user_data(self._id, self)
-            self._obj_name = "{Call " + self.info().remote_uri + "}"
-        else:
-            self._obj_name = "{Call object}"
+        lib = self._lib()
+        with lib.auto_lock():
+            if self._id != -1:
+                _pjsua.call_set_user_data(self._id, 0)
+                lib.calls._remove(self, self._id)
+            self._id = call_id
+            self._info_cache = None
+            if self._id != -1:
+                _pjsua.call_set_user_data(self._id, self)
+                lib.calls._add(self)
 
     def set_callback(self, cb):
         """
@@ -1605,28 +1886,58 @@ class Call:
 
     def info(self):
         """
-        Get the CallInfo.
+        Get the CallInfo. This always queries pjsua, and also refreshes
+        the snapshot returned by cached_info().
         """
-        lck = self._lib().auto_lock()
-        ci = _pjsua.call_get_info(self._id)
-        if not ci:
-            self._lib()._err_check("info", self, -1, "Invalid call")
-        call_info = CallInfo(self._lib(), ci)
+        with self._lib().auto_lock():
+            ci = _pjsua.call_get_info(self._id)
+            if not ci:
+                self._lib()._err_check("info", self, -1, "Invalid call")
+            call_info = CallInfo(self._lib(), ci)
+            self._info_cache = call_info
+            self._lib().calls._index(self, call_info)
+            return call_info
+
+    def cached_info(self):
+        """
+        Get the last CallInfo snapshot of this call without querying pjsua.
+
+        The snapshot is refreshed by the library whenever the call state or
+        media state changes, so it reflects the last reported event; fields
+        that change continuously (call_time, total_time) are only as fresh
+        as that event. Falls back to info() if no snapshot exists yet.
+
+        Inside a callback run by the callback dispatcher, this returns the
+        snapshot taken when that event was raised.
+        """
+        event = getattr(_dispatch_local, 'event', None)
+        if event is not None and event[0] is self:
+            return event[1]
+        call_info = self._info_cache
+        if call_info is None:
+            call_info = self.info()
         return call_info
 
+    def _refresh_info(self):
+        ci = _pjsua.call_get_info(self._id)
+        if ci:
+            self._info_cache = CallInfo(self._lib(), ci)
+            self._lib().calls._index(self, self._info_cache)
+        return self._info_cache
+
     def is_valid(self):
         """
         Check if this call is still valid.
         """
-        lck = self._lib().auto_lock()
-        return _pjsua.call_is_active(self._id)
+        with self._lib().auto_lock():
+            return _pjsua.call_is_active(self._id)
 
     def dump_status(self, with_media=True, indent="", max_len=1024):
         """
         Dump the call status.
         """
-        lck = self._lib().auto_lock()
-        return _pjsua.call_dump(self._id, with_media, max_len, indent)
+        with self._lib().auto_lock():
+            return _pjsua.call_dump(self._id, with_media, max_len, indent)
 
     def answer(self, code=200, reason="", hdr_list=None):
         """
@@ -1640,10 +1951,10 @@ class Call:
                     INVITE response.
 
         """
-        lck = self._lib().auto_lock()
-        err = _pjsua.call_answer(self._id, code, reason, 
-                                   Lib._create_msg_data(hdr_list))
-        self._lib()._err_check("answer()", self, err)
+        with self._lib().auto_lock():
+            err = _pjsua.call_answer(self._id, code, reason, 
+                                       Lib._create_msg_data(hdr_list))
+            self._lib()._err_check("answer()", self, err)
 
     def hangup(self, code=603, reason="", hdr_list=None):
         """
@@ -1657,10 +1968,10 @@ class Call:
                     message.
 
         """
-        lck = self._lib().auto_lock()
-        err = _pjsua.call_hangup(self._id, code, reason, 
-                                   Lib._create_msg_data(hdr_list))
-        self._lib()._err_check("hangup()", self, err)
+        with self._lib().auto_lock():
+            err = _pjsua.call_hangup(self._id, code, reason, 
+                                       Lib._create_msg_data(hdr_list))
+            self._lib()._err_check("hangup()", self, err)
 
     def hold(self, hdr_list=None):
         """
@@ -1670,9 +1981,9 @@ class Call:
         hdr_list -- Optional list of headers to be sent with the
                     message.
         """
-        lck = self._lib().auto_lock()
-        err = _pjsua.call_set_hold(self._id, Lib._create_msg_data(hdr_list))
-        self._lib()._err_check("hold()", self, err)
+        with self._lib().auto_lock():
+            err = _pjsua.call_set_hold(self._id, Lib._create_msg_data(hdr_list))
+            self._lib()._err_check("hold()", self, err)
 
     def unhold(self, hdr_list=None):
         """
@@ -1683,10 +1994,10 @@ class Call:
                     message.
 
         """
-        lck = self._lib().auto_lock()
-        err = _pjsua.call_reinvite(self._id, True, 
-                                     Lib._create_msg_data(hdr_list))
-        self._lib()._err_check("unhold()", self, err)
+        with self._lib().auto_lock():
+            err = _pjsua.call_reinvite(self._id, True, 
+                                         Lib._create_msg_data(hdr_list))
+            self._lib()._err_check("unhold()", self, err)
 
     def reinvite(self, hdr_list=None):
         """
@@ -1697,10 +2008,10 @@ class Call:
                       message.
 
         """
-        lck = self._lib().auto_lock()
-        err = _pjsua.call_reinvite(self._id, True, 
-                                     Lib._create_msg_data(hdr_list))
-        self._lib()._err_check("reinvite()", self, err)
+        with self._lib().auto_lock():
+            err = _pjsua.call_reinvite(self._id, True, 
+                                         Lib._create_msg_data(hdr_list))
+            self._lib()._err_check("reinvite()", self, err)
 
     def update(self, hdr_list=None, options=0):
         """
@@ -1712,10 +2023,10 @@ class Call:
         options    -- Must be zero for now.
 
         """
-        lck = self._lib().auto_lock()
-        err = _pjsua.call_update(self._id, options, 
-                                   Lib._create_msg_data(hdr_list))
-        self._lib()._err_check("update()", self, err)
+        with self._lib().auto_lock():
+            err = _pjsua.call_update(self._id, options, 
+                                       Lib._create_msg_data(hdr_list))
+            self._lib()._err_check("update()", self, err)
 
     def transfer(self, dest_uri, hdr_list=None):
         """
@@ -1727,10 +2038,10 @@ class Call:
                     message.
 
         """
-        lck = self._lib().auto_lock()
-        err = _pjsua.call_xfer(self._id, dest_uri, 
-                                 Lib._create_msg_data(hdr_list))
-        self._lib()._err_check("transfer()", self, err)
+        with self._lib().auto_lock():
+            err = _pjsua.call_xfer(self._id, dest_uri, 
+                                     Lib._create_msg_data(hdr_list))
+            self._lib()._err_check("transfer()", self, err)
 
     def transfer_to_call(self, call, hdr_list=None, options=0):
         """
@@ -1743,10 +2054,10 @@ class Call:
         options  -- Must be zero for now.
 
         """
-        lck = self._lib().auto_lock()
-        err = _pjsua.call_xfer_replaces(self._id, call._id, options,
-                                          Lib._create_msg_data(hdr_list))
-        self._lib()._err_check("transfer_to_call()", self, err)
+        with self._lib().auto_lock():
+            err = _pjsua.call_xfer_replaces(self._id, call._id, options,
+                                              Lib._create_msg_data(hdr_list))
+            self._lib()._err_check("transfer_to_call()", self, err)
 
     def dial_dtmf(self, digits):
         """
@@ -1756,9 +2067,9 @@ class Call:
         digits  -- DTMF digit string.
 
         """
-        lck = self._lib().auto_lock()
-        err = _pjsua.call_dial_dtmf(self._id, digits)
-        self._lib()._err_check("dial_dtmf()", self, err)
+        with self._lib().auto_lock():
+            err = _pjsua.call_dial_dtmf(self._id, digits)
+            self._lib()._err_check("dial_dtmf()", self, err)
 
     def send_request(self, method, hdr_list=None, content_type=None,
                      body=None):
@@ -1777,20 +2088,20 @@ class Call:
         body         -- Optional SIP message body.
 
         """
-        lck = self._lib().auto_lock()
-        if hdr_list or body:
-            msg_data = _pjsua.Msg_Data()
-            if hdr_list:
-                msg_data.hdr_list = hdr_list
-            if content_type:
-                msg_data.content_type = content_type
-            if body:
-                msg_data.msg_body = body
-        else:
-            msg_data = None
+        with self._lib().auto_lock():
+            if hdr_list or body:
+                msg_data = _pjsua.Msg_Data()
+                if hdr_list:
+                    msg_data.hdr_list = hdr_list
+                if content_type:
+                    msg_data.content_type = content_type
+                if body:
+                    msg_data.msg_body = body
+            else:
+                msg_data = None
                 
-        err = _pjsua.call_send_request(self._id, method, msg_data)
-        self._lib()._err_check("send_request()", self, err)
+            err = _pjsua.call_send_request(self._id, method, msg_data)
+            self._lib()._err_check("send_request()", self, err)
 
     def send_pager(self, text, im_id=0, content_type="text/plain", 
                hdr_list=None):
@@ -1806,12 +2117,198 @@ class Call:
                         request.
 
         """
-        lck = self._lib().auto_lock()
-        err = _pjsua.call_send_im(self._id, \
-                             content_type, text, \
-                             Lib._create_msg_data(hdr_list), \
-                             im_id)
-        self._lib()._err_check("send_pager()", self, err)
+        with self._lib().auto_lock():
+            err = _pjsua.call_send_im(self._id, \
+                                 content_type, text, \
+                                 Lib._create_msg_data(hdr_list), \
+                                 im_id)
+            self._lib()._err_check("send_pager()", self, err)
+
+
+# Call registry
+class CallRegistry:
+    """Index of the library's live calls, available as Lib.calls.
+
+    A call is added when it gets a pjsua call id and removed when it is
+    disconnected. Besides the pjsua call id, calls can be looked up by
+    SIP Call-ID, by the user part (e.g. the phone number) of the remote
+    URI, by an application tag such as the application's own call id, and
+    by call state and media state, e.g. to find the calls on hold. The
+    indexes are updated from the CallInfo snapshots taken on every call
+    and media state event. All lookups are dictionary lookups; none of
+    them queries pjsua.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_id = {}
+        self._by_tag = {}
+        self._by_sip_call_id = {}
+        self._by_number = {}
+        self._by_state = {}
+        self._by_media_state = {}
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(self.all())
+
+    def __contains__(self, call):
+        return call._id != -1 and self._by_id.get(call._id) is call
+
+    def all(self):
+        """Return list of all live calls."""
+        with self._lock:
+            return list(self._by_id.values())
+
+    def find(self, call_id):
+        """Get the Call with the specified pjsua call id, or None."""
+        return self._by_id.get(call_id)
+
+    def by_tag(self, tag):
+        """Get the Call with the specified application tag, or None."""
+        return self._by_tag.get(tag)
+
+    def by_sip_call_id(self, sip_call_id):
+        """Get the Call with the specified SIP Call-ID, or None."""
+        return self._by_sip_call_id.get(sip_call_id)
+
+    def by_number(self, number):
+        """Return list of calls whose remote URI has the specified number,
+        as sip_uri.phone_number() gives it, oldest first."""
+        with self._lock:
+            return list(self._by_number.get(number, ()))
+
+    def by_state(self, state):
+        """Return list of calls in the specified CallState, in the order
+        they entered it."""
+        with self._lock:
+            return list(self._by_state.get(state, {}).values())
+
+    def by_media_state(self, media_state):
+        """Return list of calls in the specified MediaState, in the order
+        they entered it."""
+        with self._lock:
+            return list(self._by_media_state.get(media_state, {}).values())
+
+    def tagged(self, media_state=None):
+        """Return a dict of application tag to Call for the tagged calls.
+
+        Keyword arguments:
+        media_state -- only return the calls in this MediaState, in the
+                       order they entered it.
+        """
+        with self._lock:
+            if media_state is None:
+                return dict(self._by_tag)
+            calls = self._by_media_state.get(media_state, {}).values()
+            return {call._tag: call for call in calls
+                    if call._tag is not None}
+
+    def counts(self):
+        """Return the number of live calls per call state and per media
+        state, as two dicts."""
+        with self._lock:
+            return ({state: len(calls) for state, calls in self._by_state.items()},
+                    {state: len(calls) for state, calls in self._by_media_state.items()})
+
+    def tag(self, call, tag):
+        """Set the application tag of a call, replacing any previous tag.
+
+        Keyword arguments:
+        call    -- the Call object.
+        tag     -- any hashable value, unique among the live calls.
+        """
+        with self._lock:
+            if call._tag is not None:
+                self._by_tag.pop(call._tag, None)
+            call._tag = tag
+            # A call that has already been removed must not be indexed again
+            if call._id != -1 and self._by_id.get(call._id) is call:
+                self._by_tag[tag] = call
+
+    def untag(self, tag):
+        """Remove an application tag. Return the Call it named, or None."""
+        with self._lock:
+            call = self._by_tag.pop(tag, None)
+            if call:
+                call._tag = None
+            return call
+
+    def clear(self):
+        """Forget every call."""
+        with self._lock:
+            self._by_id.clear()
+            self._by_tag.clear()
+            self._by_sip_call_id.clear()
+            self._by_number.clear()
+            self._by_state.clear()
+            self._by_media_state.clear()
+
+    def _add(self, call):
+        with self._lock:
+            self._by_id[call._id] = call
+            if call._tag is not None:
+                self._by_tag[call._tag] = call
+
+    def _index(self, call, call_info):
+        # Index the SIP Call-ID, number and states from the call's latest
+        # CallInfo
+        number = sip_uri.phone_number(call_info.remote_uri) or ""
+        with self._lock:
+            if self._by_id.get(call._id) is not call:
+                return
+            if call_info.sip_call_id and \
+               call_info.sip_call_id != call._sip_call_id:
+                self._by_sip_call_id.pop(call._sip_call_id, None)
+                call._sip_call_id = call_info.sip_call_id
+                self._by_sip_call_id[call._sip_call_id] = call
+            if number != call._number:
+                self._unindex_number(call)
+                call._number = number
+                if number:
+                    self._by_number.setdefault(number, []).append(call)
+            if call_info.state != call._state:
+                self._move(self._by_state, call, call._state, call_info.state)
+                call._state = call_info.state
+            if call_info.media_state != call._media_state:
+                self._move(self._by_media_state, call, call._media_state,
+                           call_info.media_state)
+                call._media_state = call_info.media_state
+
+    def _remove(self, call, call_id):
+        with self._lock:
+            if self._by_id.get(call_id) is call:
+                del self._by_id[call_id]
+            if call._tag is not None and self._by_tag.get(call._tag) is call:
+                del self._by_tag[call._tag]
+            if self._by_sip_call_id.get(call._sip_call_id) is call:
+                del self._by_sip_call_id[call._sip_call_id]
+            self._unindex_number(call)
+            self._move(self._by_state, call, call._state, None)
+            self._move(self._by_media_state, call, call._media_state, None)
+            call._sip_call_id = ""
+            call._number = ""
+            call._state = None
+            call._media_state = None
+
+    def _move(self, index, call, old, new):
+        # Move a call between the buckets of a state index; keyed by the
+        # object since the call id is gone by the time a call is removed
+        calls = index.get(old)
+        if calls is not None:
+            calls.pop(id(call), None)
+            if not calls:
+                del index[old]
+        if new is not None:
+            index.setdefault(new, {})[id(call)] = call
+
+    def _unindex_number(self, call):
+        calls = self._by_number.get(call._number)
+        if calls and call in calls:
+            calls.remove(call)
+            if not calls:
+                del self._by_number[call._number]
 
   
 class BuddyInfo:
@@ -1831,18 +2328,21 @@ class BuddyInfo:
     sub_term_reason -- The termination reason string of the last presence
                        subscription to this buddy, if any.
     """
-    uri = ""
-    contact = ""
-    online_status = 0
-    online_text = ""
-    activity = PresenceActivity.UNKNOWN
-    subscribed = False
-    sub_state = SubscriptionState.NULL
-    sub_term_reason = ""
+    __slots__ = ('uri', 'contact', 'online_status', 'online_text', 'activity',
+                 'subscribed', 'sub_state', 'sub_term_reason')
 
     def __init__(self, pjsua_bi=None):
         if pjsua_bi:
             self._cvt_from_pjsua(pjsua_bi)
+            return
+        self.uri = ""
+        self.contact = ""
+        self.online_status = 0
+        self.online_text = ""
+        self.activity = PresenceActivity.UNKNOWN
+        self.subscribed = False
+        self.sub_state = SubscriptionState.NULL
+        self.sub_term_reason = ""
 
     def _cvt_from_pjsua(self, inf):
         self.uri = inf.uri
@@ -1928,12 +2428,15 @@ class Buddy:
     _cb = None
     _obj_name = ""
     _acc = None
+    _uri_key = None
 
     def __init__(self, lib, id, account, cb):
         self._id = id
         self._lib = weakref.ref(lib)
         self._acc = weakref.ref(account)
-        self._obj_name = "{Buddy " + self.info().uri + "}"
+        uri = self.info().uri
+        self._uri_key = sip_uri.parse_uri(uri).aor
+        self._obj_name = "{Buddy " + uri + "}"
         self.set_callback(cb)
         _pjsua.buddy_set_user_data(self._id, self)
         _Trace((self, 'created'))
@@ -1950,8 +2453,8 @@ class Buddy:
         """
         Get buddy info as BuddyInfo.
         """
-        lck = self._lib().auto_lock()
-        return BuddyInfo(_pjsua.buddy_get_info(self._id))
+        with self._lib().auto_lock():
+            return BuddyInfo(_pjsua.buddy_get_info(self._id))
 
     def set_callback(self, cb):
         """Install callback to receive notifications from this object.
@@ -1969,27 +2472,33 @@ class Buddy:
         """
         Subscribe to buddy's presence status notification.
         """
-        lck = self._lib().auto_lock()
-        err = _pjsua.buddy_subscribe_pres(self._id, True)
-        self._lib()._err_check("subscribe()", self, err)
+        with self._lib().auto_lock():
+            err = _pjsua.buddy_subscribe_pres(self._id, True)
+            self._lib()._err_check("subscribe()", self, err)
 
     def unsubscribe(self):
         """
         Unsubscribe from buddy's presence status notification.
         """
-        lck = self._lib().auto_lock()
-        err = _pjsua.buddy_subscribe_pres(self._id, False)
-        self._lib()._err_check("unsubscribe()", self, err)
+        with self._lib().auto_lock():
+            err = _pjsua.buddy_subscribe_pres(self._id, False)
+            self._lib()._err_check("unsubscribe()", self, err)
 
     def delete(self):
         """
         Remove this buddy from the buddy list.
         """
-        lck = self._lib().auto_lock()
-        if self._id != -1:
-            _pjsua.buddy_set_user_data(self._id, 0)
-        err = _pjsua.buddy_del(self._id)
-        self._lib()._err_check("delete()", self, err)
+        with self._lib().auto_lock():
+            if self._id != -1:
+                _pjsua.buddy_set_user_data(self._id, 0)
+            index = self._lib()._buddy_index
+            buddies = index.get(self._uri_key)
+            if buddies and self in buddies:
+                buddies.remove(self)
+                if not buddies:
+                    del index[self._uri_key]
+            err = _pjsua.buddy_del(self._id)
+            self._lib()._err_check("delete()", self, err)
 
     def send_pager(self, text, im_id=0, content_type="text/plain", \
                    hdr_list=None):
@@ -2005,12 +2514,12 @@ class Buddy:
                         request.
 
         """
-        lck = self._lib().auto_lock()
-        err = _pjsua.im_send(self._acc()._id, self.info().uri, \
-                             content_type, text, \
-                             Lib._create_msg_data(hdr_list), \
-                             im_id)
-        self._lib()._err_check("send_pager()", self, err)
+        with self._lib().auto_lock():
+            err = _pjsua.im_send(self._acc()._id, self.info().uri, \
+                                 content_type, text, \
+                                 Lib._create_msg_data(hdr_list), \
+                                 im_id)
+            self._lib()._err_check("send_pager()", self, err)
 
     def send_typing_ind(self, is_typing=True, hdr_list=None):
         """Send typing indication to remote buddy.
@@ -2021,10 +2530,10 @@ class Buddy:
                      request.
 
         """
-        lck = self._lib().auto_lock()
-        err = _pjsua.im_typing(self._acc()._id, self.info().uri, \
-                               is_typing, Lib._create_msg_data(hdr_list))
-        self._lib()._err_check("send_typing_ind()", self, err)
+        with self._lib().auto_lock():
+            err = _pjsua.im_typing(self._acc()._id, self.info().uri, \
+                                   is_typing, Lib._create_msg_data(hdr_list))
+            self._lib()._err_check("send_typing_ind()", self, err)
 
 
 
@@ -2038,10 +2547,8 @@ class SoundDeviceInfo:
     output_channels     -- number of playback channels supported.
     default_clock_rate  -- default sampling rate.
     """
-    name = ""
-    input_channels = 0
-    output_channels = 0
-    default_clock_rate = 0
+    __slots__ = ('name', 'input_channels', 'output_channels',
+                 'default_clock_rate')
 
     def __init__(self, sdi):
         self.name = sdi.name
@@ -2068,29 +2575,22 @@ class CodecInfo:
     plc_enabled     -- specify if Packet Lost Concealment is currently
                        enabled.
     """
-    name = ""
-    priority = 0
-    clock_rate = 0
-    channel_count = 0
-    avg_bps = 0
-    frm_ptime = 0
-    ptime = 0
-    pt = 0
-    vad_enabled = False
-    plc_enabled = False
+    __slots__ = ('name', 'priority', 'clock_rate', 'channel_count', 'avg_bps',
+                 'frm_ptime', 'ptime', 'pt', 'vad_enabled', 'plc_enabled')
 
     def __init__(self, codec_info, codec_param):
+        info = codec_param.info
+        setting = codec_param.setting
         self.name = codec_info.codec_id
         self.priority = codec_info.priority
-        self.clock_rate = codec_param.info.clock_rate
-        self.channel_count = codec_param.info.channel_cnt
-        self.avg_bps = codec_param.info.avg_bps
-        self.frm_ptime = codec_param.info.frm_ptime
-        self.ptime = codec_param.info.frm_ptime * \
-                        codec_param.setting.frm_per_pkt
-        self.ptime = codec_param.info.pt
-        self.vad_enabled = codec_param.setting.vad
-        self.plc_enabled = codec_param.setting.plc
+        self.clock_rate = info.clock_rate
+        self.channel_count = info.channel_cnt
+        self.avg_bps = info.avg_bps
+        self.frm_ptime = info.frm_ptime
+        self.ptime = info.frm_ptime * setting.frm_per_pkt
+        self.pt = info.pt
+        self.vad_enabled = setting.vad
+        self.plc_enabled = setting.plc
 
     def _cvt_to_pjsua(self):
         ci = _pjsua.Codec_Info()
@@ -2109,11 +2609,8 @@ class CodecParameter:
     vad_enabled -- specify if VAD should be enabled.
     plc_enabled -- specify if PLC should be enabled.
     """
-    ptime = 0
-    vad_enabled = False
-    plc_enabled = False
-    _codec_param = None
-    
+    __slots__ = ('ptime', 'vad_enabled', 'plc_enabled', '_codec_param')
+
     def __init__(self, codec_param):
         self.ptime = codec_param.info.frm_ptime * \
                         codec_param.setting.frm_per_pkt
@@ -2129,20 +2626,142 @@ class CodecParameter:
         return self._codec_param
 
 
-# Library mutex
-class _LibMutex:
-    def __init__(self, lck):
-        self._lck = lck
-        self._lck.acquire()
-    #_Trace(('lock acquired',))
+# Library lock
+class _LibLock:
+    """Re-entrant library lock, used as a context manager:
 
-    def __del__(self):
-        try:
-            self._lck.release()
-        #_Trace(('lock released',))
-        except:
-        #_Trace(('lock release error',))
-            pass
+        with lib.auto_lock():
+            ...
+
+    Releasing the lock from any thread but the worker wakes the worker.
+
+    When statistics are enabled (Lib.enable_lock_stats()), each outermost
+    acquisition records how long the caller waited for the lock and how
+    long it held it, attributed to the calling function. Nested
+    acquisitions by the lock owner are not counted.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self.stats_enabled = False
+        self.wakeup = None
+        self.worker_ident = None
+        self.reset_stats()
+
+    def __enter__(self):
+        local = self._local
+        depth = getattr(local, 'depth', 0)
+        if depth or not self.stats_enabled:
+            self._lock.acquire()
+            local.depth = depth + 1
+            if not depth:
+                local.site = None
+            return self
+
+        start = time.perf_counter()
+        contended = not self._lock.acquire(False)
+        if contended:
+            self._lock.acquire()
+        acquired = time.perf_counter()
+        local.depth = 1
+        local.acquired = acquired
+        code = sys._getframe(1).f_code
+        local.site = getattr(code, 'co_qualname', code.co_name)
+
+        # Stats are only ever touched while holding the lock
+        site = self._sites.get(local.site)
+        if site is None:
+            site = self._sites[local.site] = _LockSiteStats()
+        site.acquisitions += 1
+        self.acquisitions += 1
+        if contended:
+            waited = acquired - start
+            site.contended += 1
+            site.wait_total += waited
+            site.wait_max = max(site.wait_max, waited)
+            self.contended += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        local = self._local
+        local.depth -= 1
+        if not local.depth and local.site is not None:
+            held = time.perf_counter() - local.acquired
+            site = self._sites.get(local.site)
+            if site is not None:
+                site.hold_total += held
+                site.hold_max = max(site.hold_max, held)
+            self.hold_total += held
+            self.hold_max = max(self.hold_max, held)
+        self._lock.release()
+        # API calls usually leave work for the stack (requests to send,
+        # timers to schedule), so let the worker poll again promptly
+        if (not local.depth and self.wakeup is not None and
+                threading.get_ident() != self.worker_ident):
+            self.wakeup.set()
+        return False
+
+    def reset_stats(self):
+        with self._lock:
+            self.acquisitions = 0
+            self.contended = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.hold_total = 0.0
+            self.hold_max = 0.0
+            self._sites = {}
+
+    def stats(self, top=10):
+        """Return the lock statistics as a dict, times in milliseconds."""
+        with self._lock:
+            sites = sorted(self._sites.items(),
+                           key=lambda item: item[1].wait_total, reverse=True)
+            return {
+                'enabled': self.stats_enabled,
+                'acquisitions': self.acquisitions,
+                'contended': self.contended,
+                'wait_total_ms': _ms(self.wait_total),
+                'wait_max_ms': _ms(self.wait_max),
+                'hold_total_ms': _ms(self.hold_total),
+                'hold_max_ms': _ms(self.hold_max),
+                'top_contended': [dict(site=name, **site.as_dict())
+                                  for name, site in sites[:top]
+                                  if site.contended],
+                'top_holders': [dict(site=name, **site.as_dict())
+                                for name, site in sorted(
+                                    self._sites.items(),
+                                    key=lambda item: item[1].hold_total,
+                                    reverse=True)[:top]]
+            }
+
+
+def _ms(seconds):
+    return round(seconds * 1000.0, 3)
+
+
+class _LockSiteStats:
+    __slots__ = ('acquisitions', 'contended', 'wait_total', 'wait_max',
+                 'hold_total', 'hold_max')
+
+    def __init__(self):
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.hold_total = 0.0
+        self.hold_max = 0.0
+
+    def as_dict(self):
+        return {
+            'acquisitions': self.acquisitions,
+            'contended': self.contended,
+            'wait_total_ms': _ms(self.wait_total),
+            'wait_max_ms': _ms(self.wait_max),
+            'hold_total_ms': _ms(self.hold_total),
+            'hold_max_ms': _ms(self.hold_max)
+        }
 
 
 # PJSUA Library
@@ -2151,11 +2770,21 @@ enable_trace = False
 
 class Lib:
     """Library instance.
-    
+
+    Member documentation:
+
+    calls       -- CallRegistry of the live calls.
+    transports  -- TransportPool of the transports accounts are spread
+                   across.
     """
     _quit = False
     _has_thread = False
     _lock = None
+    _worker_cfg = None
+    _worker_stats = None
+    _dispatcher = None
+    _worker_exited = None
+    _codecs = None
 
     def __init__(self):
         global _lib
@@ -2163,7 +2792,11 @@ class Lib:
             raise Error("__init()__", None, -1, 
                         "Library instance already exist")
 
-        self._lock = threading.RLock()
+        self._lock = _LibLock()
+        # Buddy URI key -> Buddy objects with that URI, oldest first
+        self._buddy_index = {}
+        self.calls = CallRegistry()
+        self.transports = TransportPool(self)
         err = _pjsua.create()
         self._err_check("_pjsua.create()", None, err)
         _lib = self
@@ -2182,7 +2815,8 @@ class Lib:
         """
         return _lib
 
-    def init(self, ua_cfg=None, log_cfg=None, media_cfg=None):
+    def init(self, ua_cfg=None, log_cfg=None, media_cfg=None,
+             trace_cfg=None):
         """
         Initialize pjsua with the specified configurations.
 
@@ -2190,11 +2824,18 @@ class Lib:
         ua_cfg      -- optional UAConfig instance
         log_cfg     -- optional LogConfig instance
         media_cfg   -- optional MediaConfig instance
+        trace_cfg   -- optional TraceConfig instance
 
         """
         if not ua_cfg: ua_cfg = UAConfig()
         if not log_cfg: log_cfg = LogConfig()
         if not media_cfg: media_cfg = MediaConfig()
+        if not trace_cfg: trace_cfg = TraceConfig()
+
+        _trace.configure(trace_cfg)
+        log_cfg_pjsua = log_cfg._cvt_to_pjsua()
+        if trace_cfg.capture_log:
+            log_cfg_pjsua.cb = _LogCapture(log_cfg.callback)
 
         py_ua_cfg = ua_cfg._cvt_to_pjsua()
         py_ua_cfg.cb.on_call_state = _cb_on_call_state
@@ -2213,37 +2854,126 @@ class Lib:
         py_ua_cfg.cb.on_typing = _cb_on_typing
         py_ua_cfg.cb.on_mwi_info = _cb_on_mwi_info;
    
-        err = _pjsua.init(py_ua_cfg, log_cfg._cvt_to_pjsua(), 
+        err = _pjsua.init(py_ua_cfg, log_cfg_pjsua, 
                           media_cfg._cvt_to_pjsua())
         self._err_check("init()", self, err)
 
-    def destroy(self):
-        """Destroy the library, and pjsua."""
+    def destroy(self, timeout=20.0):
+        """Destroy the library, and pjsua.
+
+        Keyword argument:
+        timeout -- seconds to wait for the worker thread to exit.
+
+        """
         global _lib
+        deadline = time.monotonic() + timeout
+        if self._dispatcher:
+            self._dispatcher.stop(min(1.0, timeout))
+            self._dispatcher = None
         if self._has_thread:
             self._quit = 1
-            loop = 0
-            while self._quit != 2 and loop < 400:
-                self.handle_events(5)
-                loop = loop + 1
-                time.sleep(0.050)
+            self._lock.wakeup.set()
+            remaining = max(0.0, deadline - time.monotonic())
+            if not self._worker_exited.wait(remaining):
+                _Trace(('worker thread did not exit in time',))
         _pjsua.destroy()
+        self._buddy_index.clear()
+        self.calls.clear()
+        self.transports._clear()
         _lib = None
 
-    def start(self, with_thread=True):
+    def start(self, with_thread=True, worker_cfg=None, dispatcher_cfg=None):
         """Start the library. 
 
         Keyword argument:
-        with_thread -- specify whether the module should create worker
-                       thread.
+        with_thread    -- specify whether the module should create worker
+                          thread.
+        worker_cfg     -- optional WorkerConfig instance for the worker
+                          thread.
+        dispatcher_cfg -- optional DispatcherConfig instance. If given,
+                          application callbacks run on the dispatcher's
+                          threads instead of the thread polling the stack.
+
+        """
+        with self.auto_lock():
+            err = _pjsua.start()
+            self._err_check("start()", self, err)
+            self._load_codecs()
+            if dispatcher_cfg:
+                self._dispatcher = _CallbackDispatcher(dispatcher_cfg)
+            self._has_thread = with_thread
+            if self._has_thread:
+                self._worker_cfg = worker_cfg or WorkerConfig()
+                self._worker_stats = _WorkerStats(self._worker_cfg.mode)
+                self._lock.wakeup = threading.Event()
+                self._worker_exited = threading.Event()
+                _thread.start_new(_worker_thread_main, (0,))
+
+    def shutdown(self, accounts=(), grace=1.0, timeout=5.0):
+        """Hang up every call, unregister the accounts and destroy the
+        library, all within a deadline.
+
+        The hangups and unregistrations are sent together, then given up to
+        grace seconds to complete before the accounts are deleted. The
+        worker thread gets whatever is left of the timeout to exit.
 
-        """
-        lck = self.auto_lock()
-        err = _pjsua.start()
-        self._err_check("start()", self, err)
-        self._has_thread = with_thread
-        if self._has_thread:
-            _thread.start_new(_worker_thread_main, (0,))
+        Keyword arguments:
+        accounts -- Account objects to unregister and delete.
+        grace    -- seconds to wait for the calls to end and the accounts
+                    to unregister.
+        timeout  -- overall deadline, in seconds.
+
+        Return:
+            dict of elapsed milliseconds per phase: hangup, grace,
+            accounts, destroy and total.
+
+        """
+        deadline = time.monotonic() + timeout
+        phases = {}
+        start = last = time.perf_counter()
+
+        with self.auto_lock():
+            _pjsua.call_hangup_all()
+            for acc in accounts:
+                if acc._id != -1:
+                    # Unregistration failures must not hold up shutdown
+                    _pjsua.acc_set_registration(acc._id, False)
+        now = time.perf_counter()
+        phases['hangup'] = _ms(now - last)
+        last = now
+
+        grace_end = min(deadline, time.monotonic() + grace)
+        while time.monotonic() < grace_end:
+            with self.auto_lock():
+                if not self._has_thread:
+                    _pjsua.handle_events(10)
+                busy = _pjsua.call_get_count() > 0 or any(
+                    acc._id != -1 and
+                    _is_registered(_pjsua.acc_get_info(acc._id))
+                    for acc in accounts)
+            if not busy:
+                break
+            if self._has_thread:
+                time.sleep(0.010)
+        now = time.perf_counter()
+        phases['grace'] = _ms(now - last)
+        last = now
+
+        for acc in accounts:
+            if acc._id != -1:
+                try:
+                    acc.delete()
+                except Error as e:
+                    _Trace(('shutdown: ', e))
+        now = time.perf_counter()
+        phases['accounts'] = _ms(now - last)
+        last = now
+
+        self.destroy(max(0.0, deadline - time.monotonic()))
+        now = time.perf_counter()
+        phases['destroy'] = _ms(now - last)
+        phases['total'] = _ms(now - start)
+        return phases
 
     def handle_events(self, timeout=50):
         """Poll the events from underlying pjsua library.
@@ -2255,8 +2985,87 @@ class Lib:
         timeout -- in milliseconds.
 
         """
-        lck = self.auto_lock()
-        return _pjsua.handle_events(timeout)
+        with self.auto_lock():
+            return _pjsua.handle_events(timeout)
+
+    def poll_until_quiescent(self, timeout=0, max_polls=64):
+        """Poll the events from underlying pjsua library until none are
+        pending.
+
+        The first poll waits up to timeout; subsequent polls do not block
+        and stop as soon as one returns no events, or after max_polls.
+
+        Keyword arguments:
+        timeout   -- in milliseconds, for the first poll.
+        max_polls -- maximum number of polls.
+
+        Return:
+            Number of events handled.
+        """
+        total = 0
+        with self.auto_lock():
+            n = _pjsua.handle_events(timeout)
+            polls = 1
+            while n > 0:
+                total += n
+                if polls >= max_polls:
+                    break
+                n = _pjsua.handle_events(0)
+                polls += 1
+        return total
+
+    def dispatcher_stats(self):
+        """Get callback dispatcher statistics.
+
+        Return:
+            dict with the current and maximum queue depth, the number of
+            callbacks dispatched, the number of callbacks queued over
+            queue_size, handler errors, and average and maximum dispatch
+            lag and handler time in milliseconds; None if callbacks run
+            inline.
+        """
+        if not self._dispatcher:
+            return None
+        return self._dispatcher.stats()
+
+    def dispatcher_mark(self):
+        """Mark the callbacks queued on the dispatcher so far.
+
+        Return:
+            an opaque mark for dispatcher_passed(), or None if callbacks
+            run inline.
+        """
+        if not self._dispatcher:
+            return None
+        return self._dispatcher.mark()
+
+    def dispatcher_passed(self, mark):
+        """Check whether every callback queued before a mark has run.
+
+        Keyword argument:
+        mark    -- a value returned by dispatcher_mark().
+
+        Return:
+            True once those callbacks have finished and dropped their
+            arguments, or if callbacks run inline.
+        """
+        if mark is None or not self._dispatcher:
+            return True
+        return self._dispatcher.passed(mark)
+
+    def worker_stats(self):
+        """Get worker thread statistics.
+
+        Return:
+            dict with the scheduling mode, loop iterations, events handled,
+            average and maximum events per iteration, the number of idle
+            iterations and wake-ups, the current wait in milliseconds, and
+            the worker's CPU time and CPU usage since it started; None if
+            the library runs without a worker thread.
+        """
+        if not self._worker_stats:
+            return None
+        return self._worker_stats.as_dict()
 
     def thread_register(self, name):
         """Register external threads (threads that are not created by PJSIP,
@@ -2283,8 +3092,8 @@ class Lib:
             code is returned.
 
         """
-        lck = self.auto_lock()
-        return _pjsua.verify_sip_url(sip_url)
+        with self.auto_lock():
+            return _pjsua.verify_sip_url(sip_url)
 
     def create_transport(self, type, cfg=None):
         """Create SIP transport instance of the specified type. 
@@ -2297,11 +3106,11 @@ class Lib:
             Transport object
 
         """
-        lck = self.auto_lock()
-        if not cfg: cfg=TransportConfig()
-        err, tp_id = _pjsua.transport_create(type, cfg._cvt_to_pjsua())
-        self._err_check("create_transport()", self, err)
-        return Transport(self, tp_id)
+        with self.auto_lock():
+            if not cfg: cfg=TransportConfig()
+            err, tp_id = _pjsua.transport_create(type, cfg._cvt_to_pjsua())
+            self._err_check("create_transport()", self, err)
+            return Transport(self, tp_id)
 
     def create_account(self, acc_config, set_default=True, cb=None):
         """
@@ -2317,10 +3126,10 @@ class Lib:
             Account instance
 
         """
-        lck = self.auto_lock()
-        err, acc_id = _pjsua.acc_add(acc_config._cvt_to_pjsua(), set_default)
-        self._err_check("create_account()", self, err)
-        return Account(self, acc_id, cb)
+        with self.auto_lock():
+            err, acc_id = _pjsua.acc_add(acc_config._cvt_to_pjsua(), set_default)
+            self._err_check("create_account()", self, err)
+            return Account(self, acc_id, cb)
 
     def create_account_for_transport(self, transport, set_default=True,
                                      cb=None):
@@ -2336,10 +3145,10 @@ class Lib:
             Account instance
 
         """
-        lck = self.auto_lock()
-        err, acc_id = _pjsua.acc_add_local(transport._id, set_default)
-        self._err_check("create_account_for_transport()", self, err)
-        return Account(self, acc_id, cb)
+        with self.auto_lock():
+            err, acc_id = _pjsua.acc_add_local(transport._id, set_default)
+            self._err_check("create_account_for_transport()", self, err)
+            return Account(self, acc_id, cb)
 
     def modify_account(self, acc_id, acc_config):
         """Modify configuration of a pjsua account.
@@ -2349,16 +3158,16 @@ class Lib:
         acc_config  -- New account configuration.
 
         """
-        lck = self.auto_lock()
-        err = _pjsua.acc_modify(acc_id, acc_config._cvt_to_pjsua())
-        self._err_check("modify_account()", self, err)
+        with self.auto_lock():
+            err = _pjsua.acc_modify(acc_id, acc_config._cvt_to_pjsua())
+            self._err_check("modify_account()", self, err)
 
     def hangup_all(self):
         """Hangup all calls.
 
         """
-        lck = self.auto_lock()
-        _pjsua.call_hangup_all()
+        with self.auto_lock():
+            _pjsua.call_hangup_all()
 
     # Sound device API
 
@@ -2369,12 +3178,12 @@ class Lib:
             list of SoundDeviceInfo. The index of the element specifies
             the device ID for the device.
         """
-        lck = self.auto_lock()
-        sdi_list = _pjsua.enum_snd_devs()
-        info = []
-        for sdi in sdi_list:
-            info.append(SoundDeviceInfo(sdi))
-        return info
+        with self.auto_lock():
+            sdi_list = _pjsua.enum_snd_devs()
+            info = []
+            for sdi in sdi_list:
+                info.append(SoundDeviceInfo(sdi))
+            return info
 
     def get_snd_dev(self):
         """Get the device IDs of current sound devices used by pjsua.
@@ -2382,8 +3191,8 @@ class Lib:
         Return:
             (capture_dev_id, playback_dev_id) tuple
         """
-        lck = self.auto_lock()
-        return _pjsua.get_snd_dev()
+        with self.auto_lock():
+            return _pjsua.get_snd_dev()
 
     def set_snd_dev(self, capture_dev, playback_dev):
         """Change the current sound devices.
@@ -2393,18 +3202,18 @@ class Lib:
         playback_dev -- the device ID of playback device to be used.
 
         """
-        lck = self.auto_lock()
-        err = _pjsua.set_snd_dev(capture_dev, playback_dev)
-        self._err_check("set_current_sound_devices()", self, err)
+        with self.auto_lock():
+            err = _pjsua.set_snd_dev(capture_dev, playback_dev)
+            self._err_check("set_current_sound_devices()", self, err)
     
     def set_null_snd_dev(self):
         """Disable the sound devices. This is useful if the system
         does not have sound device installed.
 
         """
-        lck = self.auto_lock()
-        err = _pjsua.set_null_snd_dev()
-        self._err_check("set_null_snd_dev()", self, err)
+        with self.auto_lock():
+            err = _pjsua.set_null_snd_dev()
+            self._err_check("set_null_snd_dev()", self, err)
 
     
     # Conference bridge
@@ -2416,8 +3225,8 @@ class Lib:
             conference bridge capacity.
 
         """
-        lck = self.auto_lock()
-        return _pjsua.conf_get_max_ports()
+        with self.auto_lock():
+            return _pjsua.conf_get_max_ports()
 
     def conf_connect(self, src_slot, dst_slot):
         """Establish unidirectional media flow from souce to sink. 
@@ -2438,9 +3247,9 @@ class Lib:
                        the destination/receiver.
 
         """
-        lck = self.auto_lock()
-        err = _pjsua.conf_connect(src_slot, dst_slot)
-        self._err_check("conf_connect()", self, err)
+        with self.auto_lock():
+            err = _pjsua.conf_connect(src_slot, dst_slot)
+            self._err_check("conf_connect()", self, err)
     
     def conf_disconnect(self, src_slot, dst_slot):
         """Disconnect media flow from the source to destination port.
@@ -2452,9 +3261,82 @@ class Lib:
                        the destination/receiver.
 
         """
-        lck = self.auto_lock()
-        err = _pjsua.conf_disconnect(src_slot, dst_slot)
-        self._err_check("conf_disconnect()", self, err)
+        with self.auto_lock():
+            err = _pjsua.conf_disconnect(src_slot, dst_slot)
+            self._err_check("conf_disconnect()", self, err)
+
+    def conf_connect_many(self, pairs):
+        """Establish media flow for many (source, sink) slot pairs at once.
+
+        All pairs are connected under a single acquisition of the library
+        lock. Failures do not stop the batch and are not raised; they are
+        reported in the result instead.
+
+        Keyword arguments:
+        pairs       -- iterable of (src_slot, dst_slot) tuples.
+
+        Return:
+            list of (src_slot, dst_slot, err) tuples in the order of pairs,
+            where err is zero on success or the pjsip error code.
+        """
+        return self._conf_apply(_pjsua.conf_connect, pairs)
+
+    def conf_disconnect_many(self, pairs):
+        """Disconnect media flow for many (source, sink) slot pairs at once.
+
+        Like conf_connect_many(), this runs under a single acquisition of
+        the library lock and reports failures in the result.
+
+        Keyword arguments:
+        pairs       -- iterable of (src_slot, dst_slot) tuples.
+
+        Return:
+            list of (src_slot, dst_slot, err) tuples in the order of pairs.
+        """
+        return self._conf_apply(_pjsua.conf_disconnect, pairs)
+
+    def conf_connect_mesh(self, slots):
+        """Connect every slot to every other slot in both directions.
+
+        Keyword arguments:
+        slots       -- list of conference slot numbers. Duplicates are
+                       ignored and no slot is connected to itself.
+
+        Return:
+            list of (src_slot, dst_slot, err) tuples, see conf_connect_many().
+        """
+        slots = _unique_slots(slots)
+        return self.conf_connect_many((src, dst) for src in slots
+                                      for dst in slots if src != dst)
+
+    def conf_disconnect_mesh(self, slots):
+        """Undo conf_connect_mesh() for the specified slots.
+
+        Return:
+            list of (src_slot, dst_slot, err) tuples, see conf_connect_many().
+        """
+        slots = _unique_slots(slots)
+        return self.conf_disconnect_many((src, dst) for src in slots
+                                         for dst in slots if src != dst)
+
+    def conf_attach_to_mesh(self, slot, mesh_slots):
+        """Connect one slot to every slot of an existing mesh in both
+        directions, e.g. to add a party to a running conference.
+
+        Keyword arguments:
+        slot        -- the conference slot to add.
+        mesh_slots  -- list of slot numbers already in the mesh. The slot
+                       itself is skipped if it is listed.
+
+        Return:
+            list of (src_slot, dst_slot, err) tuples, see conf_connect_many().
+        """
+        pairs = []
+        for other in _unique_slots(mesh_slots):
+            if other != slot:
+                pairs.append((slot, other))
+                pairs.append((other, slot))
+        return self.conf_connect_many(pairs)
 
     def conf_set_tx_level(self, slot, level):
         """Adjust the signal level to be transmitted from the bridge to 
@@ -2465,9 +3347,9 @@ class Lib:
         level       -- Signal level adjustment. Value 1.0 means no level
                        adjustment, while value 0 means to mute the port.
         """
-        lck = self.auto_lock()
-        err = _pjsua.conf_set_tx_level(slot, level)
-        self._err_check("conf_set_tx_level()", self, err)
+        with self.auto_lock():
+            err = _pjsua.conf_set_tx_level(slot, level)
+            self._err_check("conf_set_tx_level()", self, err)
         
     def conf_set_rx_level(self, slot, level):
         """Adjust the signal level to be received from the specified port
@@ -2478,9 +3360,9 @@ class Lib:
         level       -- Signal level adjustment. Value 1.0 means no level
                        adjustment, while value 0 means to mute the port.
         """
-        lck = self.auto_lock()
-        err = _pjsua.conf_set_rx_level(slot, level)
-        self._err_check("conf_set_rx_level()", self, err)
+        with self.auto_lock():
+            err = _pjsua.conf_set_rx_level(slot, level)
+            self._err_check("conf_set_rx_level()", self, err)
         
     def conf_get_signal_level(self, slot):
         """Get last signal level transmitted to or received from the 
@@ -2494,10 +3376,30 @@ class Lib:
         Return value:
             (tx_level, rx_level) tuple.
         """
-        lck = self.auto_lock()
-        err, tx_level, rx_level = _pjsua.conf_get_signal_level(slot)
-        self._err_check("conf_get_signal_level()", self, err)
-        return (tx_level, rx_level)
+        with self.auto_lock():
+            err, tx_level, rx_level = _pjsua.conf_get_signal_level(slot)
+            self._err_check("conf_get_signal_level()", self, err)
+            return (tx_level, rx_level)
+
+    def conf_get_signal_levels(self, slots):
+        """Get the last signal levels of many ports under a single
+        acquisition of the library lock. Failures are not raised.
+
+        Keyword arguments:
+        slots       -- iterable of conference slot numbers.
+
+        Return value:
+            list of (slot, tx_level, rx_level, err) tuples in the order of
+            slots. The levels are 0.0 when err is not zero.
+        """
+        results = []
+        with self.auto_lock():
+            for slot in slots:
+                err, tx_level, rx_level = _pjsua.conf_get_signal_level(slot)
+                if err != 0:
+                    tx_level = rx_level = 0.0
+                results.append((slot, tx_level, rx_level, err))
+        return results
         
 
 
@@ -2506,18 +3408,30 @@ class Lib:
     def enum_codecs(self):
         """Return list of codecs supported by pjsua.
 
+        The codec table is read once and cached until the codec priority
+        or parameters are changed through this library. The CodecInfo
+        objects are shared with the cache and should not be modified.
+
         Return:
             list of CodecInfo
 
         """
-        lck = self.auto_lock()
-        ci_list = _pjsua.enum_codecs()
-        codec_info = []
-        for ci in ci_list:
-            cp = _pjsua.codec_get_param(ci.codec_id)
-            if cp:
-                codec_info.append(CodecInfo(ci, cp))
-        return codec_info
+        with self.auto_lock():
+            return [ci for ci, cp in self._load_codecs().values()]
+
+    def get_codec_info(self, name):
+        """Get the CodecInfo of the specified codec from the codec cache.
+
+        Keyword arguments:
+        name    -- codec name.
+
+        Return:
+            CodecInfo, or None if there is no such codec.
+
+        """
+        with self.auto_lock():
+            entry = self._load_codecs().get(name)
+            return entry[0] if entry else None
 
     def set_codec_priority(self, name, priority):
         """Change the codec priority.
@@ -2527,9 +3441,12 @@ class Lib:
         priority -- Codec priority, which range is 0-255.
 
         """
-        lck = self.auto_lock()
-        err = _pjsua.codec_set_priority(name, priority)
-        self._err_check("set_codec_priority()", self, err)
+        with self.auto_lock():
+            try:
+                err = _pjsua.codec_set_priority(name, priority)
+            finally:
+                self._codecs = None
+            self._err_check("set_codec_priority()", self, err)
 
     def get_codec_parameter(self, name):
         """Get codec parameter for the specified codec.
@@ -2538,12 +3455,12 @@ class Lib:
         name    -- codec name.
 
         """
-        lck = self.auto_lock()
-        cp = _pjsua.codec_get_param(name)
-        if not cp:
-            self._err_check("get_codec_parameter()", self, -1, 
-                            "Invalid codec name")
-        return CodecParameter(cp)
+        with self.auto_lock():
+            entry = self._load_codecs().get(name)
+            if not entry:
+                self._err_check("get_codec_parameter()", self, -1, 
+                                "Invalid codec name")
+            return CodecParameter(entry[1])
 
     def set_codec_parameter(self, name, param):
         """Modify codec parameter for the specified codec.
@@ -2553,9 +3470,13 @@ class Lib:
         param   -- codec parameter.
 
         """
-        lck = self.auto_lock()
-        err = _pjsua.codec_set_param(name, param._cvt_to_pjsua())
-        self._err_check("set_codec_parameter()", self, err)
+        with self.auto_lock():
+            try:
+                err = _pjsua.codec_set_param(name, param._cvt_to_pjsua())
+            finally:
+                # The parameter may share its pjsua object with the cache
+                self._codecs = None
+            self._err_check("set_codec_parameter()", self, err)
     
     # WAV playback and recording
 
@@ -2570,13 +3491,13 @@ class Lib:
             WAV player ID
 
         """
-        lck = self.auto_lock()
-        opt = 0
-        if not loop:
-            opt = opt + 1
-        err, player_id = _pjsua.player_create(filename, opt)
-        self._err_check("create_player()", self, err)
-        return player_id
+        with self.auto_lock():
+            opt = 0
+            if not loop:
+                opt = opt + 1
+            err, player_id = _pjsua.player_create(filename, opt)
+            self._err_check("create_player()", self, err)
+            return player_id
         
     def player_get_slot(self, player_id):
         """Get the conference port ID for the specified player.
@@ -2588,12 +3509,12 @@ class Lib:
             Conference slot number for the player
 
         """
-        lck = self.auto_lock()
-        slot = _pjsua.player_get_conf_port(player_id)
-        if slot < 0:
-                self._err_check("player_get_slot()", self, -1, 
-                                "Invalid player id")
-        return slot
+        with self.auto_lock():
+            slot = _pjsua.player_get_conf_port(player_id)
+            if slot < 0:
+                    self._err_check("player_get_slot()", self, -1, 
+                                    "Invalid player id")
+            return slot
 
     def player_set_pos(self, player_id, pos):
         """Set WAV playback position.
@@ -2603,9 +3524,9 @@ class Lib:
         pos         -- playback position, in samples
 
         """
-        lck = self.auto_lock()
-        err = _pjsua.player_set_pos(player_id, pos)
-        self._err_check("player_set_pos()", self, err)
+        with self.auto_lock():
+            err = _pjsua.player_set_pos(player_id, pos)
+            self._err_check("player_set_pos()", self, err)
         
     def player_destroy(self, player_id):
         """Destroy the WAV player.
@@ -2614,9 +3535,9 @@ class Lib:
         player_id   -- the WAV player ID.
 
         """
-        lck = self.auto_lock()
-        err = _pjsua.player_destroy(player_id)
-        self._err_check("player_destroy()", self, err)
+        with self.auto_lock():
+            err = _pjsua.player_destroy(player_id)
+            self._err_check("player_destroy()", self, err)
 
     def create_playlist(self, filelist, label="playlist", loop=True):
         """Create WAV playlist.
@@ -2631,13 +3552,13 @@ class Lib:
         Return:
             playlist_id
         """
-        lck = self.auto_lock()
-        opt = 0
-        if not loop:
-            opt = opt + 1
-        err, playlist_id = _pjsua.playlist_create(label, filelist, opt)
-        self._err_check("create_playlist()", self, err)
-        return playlist_id 
+        with self.auto_lock():
+            opt = 0
+            if not loop:
+                opt = opt + 1
+            err, playlist_id = _pjsua.playlist_create(label, filelist, opt)
+            self._err_check("create_playlist()", self, err)
+            return playlist_id 
 
     def playlist_get_slot(self, playlist_id):
         """Get the conference port ID for the specified playlist.
@@ -2649,12 +3570,12 @@ class Lib:
             Conference slot number for the playlist
 
         """
-        lck = self.auto_lock()
-        slot = _pjsua.player_get_conf_port(playlist_id)
-        if slot < 0:
-                self._err_check("playlist_get_slot()", self, -1, 
-                                "Invalid playlist id")
-        return slot
+        with self.auto_lock():
+            slot = _pjsua.player_get_conf_port(playlist_id)
+            if slot < 0:
+                    self._err_check("playlist_get_slot()", self, -1, 
+                                    "Invalid playlist id")
+            return slot
 
     def playlist_destroy(self, playlist_id):
         """Destroy the WAV playlist.
@@ -2663,9 +3584,9 @@ class Lib:
         playlist_id   -- the WAV playlist ID.
 
         """
-        lck = self.auto_lock()
-        err = _pjsua.player_destroy(playlist_id)
-        self._err_check("playlist_destroy()", self, err)
+        with self.auto_lock():
+            err = _pjsua.player_destroy(playlist_id)
+            self._err_check("playlist_destroy()", self, err)
 
     def create_recorder(self, filename):
         """Create WAV file recorder.
@@ -2677,10 +3598,10 @@ class Lib:
             WAV recorder ID
 
         """
-        lck = self.auto_lock()
-        err, rec_id = _pjsua.recorder_create(filename, 0, None, -1, 0)
-        self._err_check("create_recorder()", self, err)
-        return rec_id
+        with self.auto_lock():
+            err, rec_id = _pjsua.recorder_create(filename, 0, None, -1, 0)
+            self._err_check("create_recorder()", self, err)
+            return rec_id
         
     def recorder_get_slot(self, rec_id):
         """Get the conference port ID for the specified recorder.
@@ -2692,12 +3613,12 @@ class Lib:
             Conference slot number for the recorder
 
         """
-        lck = self.auto_lock()
-        slot = _pjsua.recorder_get_conf_port(rec_id)
-        if slot < 1:
-            self._err_check("recorder_get_slot()", self, -1, 
-                            "Invalid recorder id")
-        return slot
+        with self.auto_lock():
+            slot = _pjsua.recorder_get_conf_port(rec_id)
+            if slot < 1:
+                self._err_check("recorder_get_slot()", self, -1, 
+                                "Invalid recorder id")
+            return slot
 
     def recorder_destroy(self, rec_id):
         """Destroy the WAV recorder.
@@ -2706,9 +3627,9 @@ class Lib:
         rec_id   -- the WAV recorder ID.
 
         """
-        lck = self.auto_lock()
-        err = _pjsua.recorder_destroy(rec_id)
-        self._err_check("recorder_destroy()", self, err)
+        with self.auto_lock():
+            err = _pjsua.recorder_destroy(rec_id)
+            self._err_check("recorder_destroy()", self, err)
 
 
     # Internal functions
@@ -2717,10 +3638,32 @@ class Lib:
     def strerror(err):
         return _pjsua.strerror(err)
     
+    def _load_codecs(self):
+        # Codec name -> (CodecInfo, pjsua codec parameter), in pjsua's
+        # enumeration order. Must be called with the library lock held.
+        if self._codecs is None:
+            codecs = {}
+            for ci in _pjsua.enum_codecs():
+                cp = _pjsua.codec_get_param(ci.codec_id)
+                if cp:
+                    codecs[ci.codec_id] = (CodecInfo(ci, cp), cp)
+            self._codecs = codecs
+        return self._codecs
+
     def _err_check(self, op_name, obj, err_code, err_msg=""):
         if err_code != 0:
             raise Error(op_name, obj, err_code, err_msg)
 
+    def _conf_apply(self, op, pairs):
+        # Run a conference bridge operation on many slot pairs under one
+        # lock acquisition, collecting the error code of each.
+        pairs = list(pairs)
+        results = []
+        with self.auto_lock():
+            for src_slot, dst_slot in pairs:
+                results.append((src_slot, dst_slot, op(src_slot, dst_slot)))
+        return results
+
     @staticmethod
     def _create_msg_data(hdr_list):
         if not hdr_list:
@@ -2730,12 +3673,60 @@ class Lib:
         return msg_data
     
     def auto_lock(self):
-        return _LibMutex(self._lock)
+        """Return the library lock, to be used in a with statement."""
+        return self._lock
+
+    def trace_records(self, seconds=None, level=None):
+        """Get the records in the trace buffer, oldest first.
+
+        Keyword arguments:
+        seconds -- only return records from the last seconds.
+        level   -- only return records up to this TraceLevel.
+
+        Return:
+            list of dict with time, thread, level, event, call_id,
+            duration_ms and message.
+        """
+        return _trace.records(seconds, level)
+
+    def dump_trace(self, file=None, seconds=None):
+        """Write the trace buffer as text, to stderr by default."""
+        _trace.dump(file or sys.stderr, seconds)
+
+    def enable_lock_stats(self, enable=True):
+        """Enable or disable library lock contention statistics.
+
+        Keyword argument:
+        enable  -- boolean to turn statistics collection on or off.
+        """
+        self._lock.stats_enabled = enable
+
+    def lock_stats(self, top=10, reset=False):
+        """Get library lock statistics.
+
+        Keyword arguments:
+        top     -- number of call sites to report in each ranking.
+        reset   -- clear the statistics after reading them.
+
+        Return:
+            dict with acquisition count, contended count, total and
+            maximum wait and hold times (in milliseconds), and the call
+            sites that waited and held the lock the longest.
+        """
+        stats = self._lock.stats(top)
+        if reset:
+            self._lock.reset_stats()
+        return stats
 
     # Internal dictionary manipulation for calls, accounts, and buddies
 
     def _lookup_call(self, call_id):
-        return _pjsua.call_get_user_data(call_id)
+        call = self.calls.find(call_id)
+        if call is None:
+            # A callback raised from within Account.make_call(), before
+            # the call is registered
+            call = _pjsua.call_get_user_data(call_id)
+        return call
 
     def _lookup_account(self, acc_id):
         return _pjsua.acc_get_user_data(acc_id)
@@ -2744,11 +3735,12 @@ class Lib:
         if buddy_id != -1:
             buddy = _pjsua.buddy_get_user_data(buddy_id)
         elif uri:
-            buddy_id = _pjsua.buddy_find(uri)
-            if buddy_id != -1:
-                buddy = _pjsua.buddy_get_user_data(buddy_id)
-            else:
-                buddy = None
+            # Buddies are only created through Account.add_buddy(), which
+            # indexes them, so a miss here means there is no such buddy.
+            # Several buddies may share a URI; like buddy_find(), the
+            # oldest one gets the event.
+            buddies = self._buddy_index.get(sip_uri.parse_uri(uri).aor)
+            buddy = buddies[0] if buddies else None
         else:
             buddy = None
             
@@ -2756,10 +3748,27 @@ class Lib:
 
     # Account allbacks
 
+    def _dispatch(self, key, fn, *args):
+        """Run an application callback, on the callback dispatcher if one
+        is running, otherwise inline on the calling thread."""
+        if self._dispatcher:
+            self._dispatcher.submit(key, None, fn, args)
+        else:
+            _run_callback(fn, args, -1)
+
+    def _dispatch_call(self, call, call_info, name, *args):
+        """Run a CallCallback method, or another callback if name is a
+        function. The method is resolved on call._cb when it runs."""
+        if self._dispatcher:
+            self._dispatcher.submit(call._id, (call, call_info), name, args)
+        else:
+            fn = getattr(call._cb, name) if isinstance(name, str) else name
+            _run_callback(fn, args, call._id)
+
     def _cb_on_reg_state(self, acc_id):
         acc = self._lookup_account(acc_id)
         if acc:
-            acc._cb.on_reg_state()
+            self._dispatch(('acc', acc_id), acc._cb.on_reg_state)
 
     def _cb_on_incoming_subscribe(self, acc_id, buddy_id, from_uri, 
                                   contact_uri, pres_obj):
@@ -2775,9 +3784,12 @@ class Lib:
         acc = self._lookup_account(acc_id)
         if acc:
             if 'on_incoming_call2' in acc._cb.__class__.__dict__:
+                # rdata is only valid during this callback
                 acc._cb.on_incoming_call2( Call(self, call_id), rdata )
             else:
-                acc._cb.on_incoming_call( Call(self, call_id) )
+                call = Call(self, call_id)
+                self._dispatch_call(call, call._refresh_info(),
+                                    acc._cb.on_incoming_call, call)
         else:
             _pjsua.call_hangup(call_id, 603, None, None)
 
@@ -2788,22 +3800,29 @@ class Lib:
         if call:
             if call._id == -1:
                 call.attach_to_id(call_id)
-            done = (call.info().state == CallState.DISCONNECTED)
-            call._cb.on_state()
+            call_info = call._refresh_info()
+            done = (call_info is not None and
+                    call_info.state == CallState.DISCONNECTED)
+            self._dispatch_call(call, call_info, 'on_state')
             if done:
                 _pjsua.call_set_user_data(call_id, 0)
+                self.calls._remove(call, call_id)
+                # pjsua reuses the id; don't let a late __del__ touch it
+                call._id = -1
         else:
             pass
 
     def _cb_on_call_media_state(self, call_id):
         call = self._lookup_call(call_id)
         if call:
-            call._cb.on_media_state()
+            call_info = call._refresh_info()
+            self._dispatch_call(call, call_info, 'on_media_state')
 
     def _cb_on_dtmf_digit(self, call_id, digits):
         call = self._lookup_call(call_id)
         if call:
-            call._cb.on_dtmf_digit(digits)
+            self._dispatch_call(call, call._info_cache,
+                                'on_dtmf_digit', digits)
 
     def _cb_on_call_transfer_request(self, call_id, dst, code):
         call = self._lookup_call(call_id)
@@ -2830,7 +3849,8 @@ class Lib:
         old_call = self._lookup_call(old_call_id)
         new_call = self._lookup_call(new_call_id)
         if old_call and new_call:
-            old_call._cb.on_replaced(new_call)
+            self._dispatch_call(old_call, old_call._info_cache,
+                                'on_replaced', new_call)
 
     def _cb_on_pager(self, call_id, from_uri, to_uri, contact, mime_type, 
                      body, acc_id):
@@ -2838,14 +3858,17 @@ class Lib:
         if call_id != -1:
             call = self._lookup_call(call_id)
         if call:
-            call._cb.on_pager(mime_type, body)
+            self._dispatch_call(call, call._info_cache,
+                                'on_pager', mime_type, body)
         else:
             acc = self._lookup_account(acc_id)
             buddy = self._lookup_buddy(-1, from_uri)
             if buddy:
-                buddy._cb.on_pager(mime_type, body)
+                self._dispatch(('buddy', buddy._id), buddy._cb.on_pager,
+                               mime_type, body)
             else:
-                acc._cb.on_pager(from_uri, contact, mime_type, body)
+                self._dispatch(('acc', acc_id), acc._cb.on_pager,
+                               from_uri, contact, mime_type, body)
 
     def _cb_on_pager_status(self, call_id, to_uri, body, user_data, 
                             code, reason, acc_id):
@@ -2853,14 +3876,19 @@ class Lib:
         if call_id != -1:
             call = self._lookup_call(call_id)
         if call:
-            call._cb.on_pager_status(body, user_data, code, reason)
+            self._dispatch_call(call, call._info_cache,
+                                'on_pager_status',
+                                body, user_data, code, reason)
         else:
             acc = self._lookup_account(acc_id)
             buddy = self._lookup_buddy(-1, to_uri)
             if buddy:
-                buddy._cb.on_pager_status(body, user_data, code, reason)
+                self._dispatch(('buddy', buddy._id),
+                               buddy._cb.on_pager_status,
+                               body, user_data, code, reason)
             else:
-                acc._cb.on_pager_status(to_uri, body, user_data, code, reason)
+                self._dispatch(('acc', acc_id), acc._cb.on_pager_status,
+                               to_uri, body, user_data, code, reason)
 
     def _cb_on_typing(self, call_id, from_uri, to_uri, contact, is_typing, 
                       acc_id):
@@ -2868,24 +3896,27 @@ class Lib:
         if call_id != -1:
             call = self._lookup_call(call_id)
         if call:
-            call._cb.on_typing(is_typing)
+            self._dispatch_call(call, call._info_cache,
+                                'on_typing', is_typing)
         else:
             acc = self._lookup_account(acc_id)
             buddy = self._lookup_buddy(-1, from_uri)
             if buddy:
-                buddy._cb.on_typing(is_typing)
+                self._dispatch(('buddy', buddy._id), buddy._cb.on_typing,
+                               is_typing)
             else:
-                acc._cb.on_typing(from_uri, contact, is_typing)
+                self._dispatch(('acc', acc_id), acc._cb.on_typing,
+                               from_uri, contact, is_typing)
 
     def _cb_on_mwi_info(self, acc_id, body):
         acc = self._lookup_account(acc_id)
         if acc:
-            return acc._cb.on_mwi_info(body)
+            self._dispatch(('acc', acc_id), acc._cb.on_mwi_info, body)
 
     def _cb_on_buddy_state(self, buddy_id):
         buddy = self._lookup_buddy(buddy_id)
         if buddy:
-            buddy._cb.on_state()
+            self._dispatch(('buddy', buddy_id), buddy._cb.on_state)
 
 #
 # Internal
@@ -2938,20 +3969,322 @@ def _cb_on_typing(call_id, from_uri, to, contact, is_typing, acc_id):
 def _cb_on_mwi_info(acc_id, body):
     _lib._cb_on_mwi_info(acc_id, body)
 
+# Callback dispatcher
+_dispatch_local = threading.local()
+
+class _CallbackDispatcher:
+    # Queues are unbounded: submit() runs on the stack thread with the
+    # library lock held, so waiting there for a handler that needs the
+    # lock would deadlock. queue_size only marks the queue as full.
+    def __init__(self, cfg):
+        self._queues = [collections.deque()
+                        for i in range(max(1, cfg.thread_cnt))]
+        self._ready = [threading.Condition()
+                       for i in range(len(self._queues))]
+        self._queue_size = cfg.queue_size
+        # Items queued and items finished, per queue
+        self._submitted = [0] * len(self._queues)
+        self._completed = [0] * len(self._queues)
+        self._stats_lock = threading.Lock()
+        self.dispatched = 0
+        self.full = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        self.run_total = 0.0
+        self.run_max = 0.0
+        self._threads = []
+        for i, q in enumerate(self._queues):
+            t = threading.Thread(target=self._run,
+                                 args=(i, q, self._ready[i]),
+                                 name="pjsua dispatcher %d" % i)
+            t.daemon = True
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, key, event, fn, args):
+        i = hash(key) % len(self._queues)
+        q = self._queues[i]
+        item = (time.perf_counter(), event, fn, args)
+        with self._ready[i]:
+            q.append(item)
+            self._submitted[i] += 1
+            depth = len(q)
+            self._ready[i].notify()
+        if depth > self._queue_size:
+            with self._stats_lock:
+                self.full += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def mark(self):
+        return list(self._submitted)
+
+    def passed(self, mark):
+        return all(done >= queued
+                   for done, queued in zip(self._completed, mark))
+
+    def stop(self, timeout=1.0):
+        for q, ready in zip(self._queues, self._ready):
+            with ready:
+                q.append(None)
+                ready.notify()
+        for t in self._threads:
+            if t is not threading.current_thread():
+                t.join(timeout)
+
+    def _run(self, index, q, ready):
+        err = _pjsua.thread_register("python dispatcher %d" % index, 0)
+        if err != 0:
+            _Trace(('dispatcher thread_register() error', err))
+        while True:
+            with ready:
+                while not q:
+                    ready.wait()
+                item = q.popleft()
+            if item is None:
+                break
+            queued, event, fn, args = item
+            if event and isinstance(fn, str):
+                # Call callbacks are looked up when they run, so an event
+                # queued before on_incoming_call() installed the
+                # application's callback still reaches it
+                fn = getattr(event[0]._cb, fn)
+            started = time.perf_counter()
+            _dispatch_local.event = event
+            try:
+                failed = not _run_callback(fn, args,
+                                           event[0]._id if event else -1)
+            finally:
+                _dispatch_local.event = None
+                # Drop the references before the item counts as finished
+                item = event = fn = args = None
+                self._completed[index] += 1
+            finished = time.perf_counter()
+            with self._stats_lock:
+                lag = started - queued
+                run = finished - started
+                self.dispatched += 1
+                self.lag_total += lag
+                self.lag_max = max(self.lag_max, lag)
+                self.run_total += run
+                self.run_max = max(self.run_max, run)
+                if failed:
+                    self.errors += 1
+
+    def stats(self):
+        with self._stats_lock:
+            n = self.dispatched
+            return {
+                'depth': sum(len(q) for q in self._queues),
+                'max_depth': self.max_depth,
+                'dispatched': n,
+                'queue_full': self.full,
+                'errors': self.errors,
+                'lag_avg_ms': _ms(self.lag_total / n) if n else 0.0,
+                'lag_max_ms': _ms(self.lag_max),
+                'run_avg_ms': _ms(self.run_total / n) if n else 0.0,
+                'run_max_ms': _ms(self.run_max)
+            }
+
+
 # Worker thread
+class _WorkerStats:
+    def __init__(self, mode):
+        self.mode = mode
+        self.iterations = 0
+        self.events = 0
+        self.max_events = 0
+        self.idle_iterations = 0
+        self.wakeups = 0
+        self.timeout = 0
+        self.cpu_time = 0.0
+        self.started = time.monotonic()
+
+    def record(self, events):
+        self.iterations += 1
+        if events > 0:
+            self.events += events
+            self.max_events = max(self.max_events, events)
+        else:
+            self.idle_iterations += 1
+
+    def as_dict(self):
+        wall = time.monotonic() - self.started
+        return {
+            'mode': self.mode,
+            'iterations': self.iterations,
+            'events': self.events,
+            'events_per_iteration': (float(self.events) / self.iterations
+                                     if self.iterations else 0.0),
+            'max_events_per_iteration': self.max_events,
+            'idle_iterations': self.idle_iterations,
+            'wakeups': self.wakeups,
+            'timeout_ms': self.timeout,
+            'cpu_seconds': self.cpu_time,
+            'cpu_percent': 100.0 * self.cpu_time / wall if wall > 0 else 0.0
+        }
+
+
+def _worker_poll(lib, cfg):
+    with lib._lock:
+        if cfg.mode == WorkerMode.POLL:
+            return _pjsua.handle_events(cfg.poll_timeout), 0
+        n = _pjsua.handle_events(0)
+        if cfg.mode == WorkerMode.QUIESCENT:
+            polls = 1
+            total = 0
+            while n > 0:
+                total += n
+                if polls >= cfg.max_drain:
+                    break
+                n = _pjsua.handle_events(0)
+                polls += 1
+            n = total
+        return n, _pjsua.call_get_count()
+
 def _worker_thread_main(arg):
     global _lib
     _Trace(('worker thread started..',))
     thread_desc = 0;
     err = _pjsua.thread_register("python worker", thread_desc)
     _lib._err_check("thread_register()", _lib, err)
+    lib = _lib
+    cfg = lib._worker_cfg
+    stats = lib._worker_stats
+    wakeup = lib._lock.wakeup
+    lib._lock.worker_ident = threading.get_ident()
+    timeout = cfg.min_timeout
     while _lib and _lib._quit == 0:
-        _lib.handle_events(1)
-    time.sleep(0.050)
-    if _lib:
-        _lib._quit = 2
+        n, call_cnt = _worker_poll(lib, cfg)
+        stats.record(n)
+        stats.cpu_time = time.thread_time()
+        if cfg.mode == WorkerMode.POLL:
+            continue
+
+        if cfg.mode == WorkerMode.QUIESCENT:
+            timeout = cfg.idle_timeout
+        elif n > 0:
+            timeout = cfg.min_timeout
+        else:
+            limit = cfg.active_timeout if call_cnt else cfg.idle_timeout
+            timeout = min(timeout * 2, limit)
+        stats.timeout = timeout
+        if wakeup.wait(timeout / 1000.0):
+            wakeup.clear()
+            stats.wakeups += 1
+            timeout = cfg.min_timeout
+    lib._quit = 2
+    lib._worker_exited.set()
     _Trace(('worker thread exited..',))
 
+def _is_registered(acc_info):
+    # has_registration only says a registrar is configured; expires drops
+    # to zero or below once the unregistration completes. acc_get_info()
+    # returns None for an account pjsua has already removed.
+    return (acc_info is not None and acc_info.has_registration and
+            acc_info.expires > 0)
+
+def _unique_slots(slots):
+    # Conference slots in their original order, without duplicates
+    unique = []
+    for slot in slots:
+        if slot not in unique:
+            unique.append(slot)
+    return unique
+
+# Tracing
+class _TraceBuffer:
+    def __init__(self, cfg):
+        self._seq = itertools.count()
+        self.configure(cfg)
+
+    def configure(self, cfg):
+        self.cfg = cfg
+        self.level = cfg.level
+        self._buf = [None] * cfg.capacity
+
+    def record(self, level, event, call_id=-1, duration=None, message=""):
+        # Callers check the level first so nothing is formatted for
+        # records that are dropped
+        seq = next(self._seq)
+        buf = self._buf
+        buf[seq % len(buf)] = (seq, time.time(),
+                               threading.current_thread().name, level,
+                               event, call_id, duration, message)
+
+    def records(self, seconds=None, level=None):
+        recs = sorted(r for r in list(self._buf) if r)
+        if seconds is not None:
+            since = time.time() - seconds
+            recs = [r for r in recs if r[1] >= since]
+        if level is not None:
+            recs = [r for r in recs if r[3] <= level]
+        return [{
+                'time': ts,
+                'thread': thread,
+                'level': lvl,
+                'event': event,
+                'call_id': call_id,
+                'duration_ms': _ms(duration) if duration is not None else None,
+                'message': message
+            } for seq, ts, thread, lvl, event, call_id, duration, message
+              in recs]
+
+    def dump(self, file, seconds=None):
+        for r in self.records(seconds):
+            line = "%s.%03d %-20s %d %-24s" % (
+                time.strftime("%H:%M:%S", time.localtime(r['time'])),
+                int(r['time'] * 1000) % 1000, r['thread'][:20], r['level'],
+                r['event'])
+            if r['call_id'] != -1:
+                line += " call=%d" % r['call_id']
+            if r['duration_ms'] is not None:
+                line += " %.3fms" % r['duration_ms']
+            if r['message']:
+                line += " " + r['message'].rstrip()
+            print(line, file=file)
+        file.flush()
+
+_trace = _TraceBuffer(TraceConfig())
+
+class _LogCapture:
+    """LogConfig.callback that records pjsip log lines in the trace buffer
+    and passes them on to the application's callback or stdout."""
+    def __init__(self, callback=None):
+        self.callback = callback
+
+    def __call__(self, level, msg, length):
+        if level <= _trace.level:
+            _trace.record(level, "pjsip", message=msg)
+        if self.callback:
+            self.callback(level, msg, length)
+        else:
+            sys.stdout.write(msg)
+
+def _run_callback(fn, args, call_id):
+    # Run an application callback and trace it. Return False if it raised.
+    started = time.perf_counter()
+    try:
+        fn(*args)
+        ok = True
+    except Exception:
+        ok = False
+        tb = traceback.format_exc()
+        sys.stderr.write(tb)
+    duration = time.perf_counter() - started
+    if ok:
+        if TraceLevel.INFO <= _trace.level:
+            _trace.record(TraceLevel.INFO, fn.__name__, call_id, duration)
+    else:
+        _trace.record(TraceLevel.ERROR, fn.__name__, call_id, duration, tb)
+        if _trace.cfg.dump_on_error:
+            print("** trace of the last %g seconds **"
+                  % _trace.cfg.dump_seconds, file=sys.stderr)
+            _trace.dump(sys.stderr, _trace.cfg.dump_seconds)
+    return ok
+
 def _Trace(args):
     global enable_trace
     if enable_trace:
@@ -2959,4 +4292,6 @@ def _Trace(args):
         for arg in args:
             print(arg, end=' ')
         print(" **")
-
+    if TraceLevel.DEBUG <= _trace.level:
+        _trace.record(TraceLevel.DEBUG, "trace",
+                      message=" ".join(str(arg) for arg in args))
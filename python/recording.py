@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+import glob
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pjsua as pj
+
+def data_directory():
+    """
+    Where the backend keeps its files: SOFTPHONE_DATA_DIR (set by the
+    Electron app to its userData path), else the platform's per-user
+    application data directory.
+    """
+    path = os.environ.get('SOFTPHONE_DATA_DIR')
+    if path:
+        return path
+    if sys.platform == 'win32':
+        base = os.environ.get('APPDATA') or os.path.expanduser('~')
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Application Support')
+    else:
+        base = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+    return os.path.join(base, 'softphone')
+
+class Recording:
+    """The recorder currently attached to one call"""
+    def __init__(self, call_id, call_slot, part, filename, started=None, mic=True):
+        self.call_id = call_id
+        self.call_slot = call_slot
+        self.mic = mic
+        self.part = part
+        self.filename = filename
+        self.rec_id = None
+        self.rec_slot = -1
+        self.started = started or time.time()
+
+class RecordingManager:
+    """
+    Records calls to WAV files, one segment at a time.
+    The call's conference slot is connected to the recorder, and so is the
+    microphone (slot 0) while it feeds the call, so the bridge mixes the
+    two directions into one file without picking up what is said to other
+    calls or while muted; set_microphone() follows those changes. A segment is closed when recording stops, or by rotate() once
+    it exceeds max_seconds or max_bytes, in which case recording continues
+    in a new part. Closed segments are handed to a worker pool that
+    compresses them and appends them to index.jsonl, so file I/O never runs
+    on the SIP or command threads.
+    A relative directory is taken relative to data_directory(). It is
+    created on the first recording; segments a previous run left
+    uncompressed are queued for compression at the same time.
+    """
+    def __init__(self, lib, directory='recordings', max_seconds=1800, max_bytes=50 * 1024 * 1024,
+                 compress=True, workers=2):
+        self.lib = lib
+        self.directory = os.path.join(data_directory(), directory)
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.active = {}
+        self.parts = {}
+        self.segments = 0
+        self.rotations = 0
+        self.errors = 0
+        self.pending = 0
+        self.abandoned = 0
+        self.available = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        self._abort = threading.Event()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="recording")
+        self._futures = set()
+
+    def start(self, call_id, call_slot, mic=True):
+        """
+        Start recording a call, unless it is already being recorded; a
+        recording whose call has moved to another slot follows it. mic says
+        whether the microphone currently feeds the call.
+        Returns the Recording, or None if recording is not possible.
+        """
+        with self._lock:
+            rec = self.active.get(call_id)
+            if rec:
+                if rec.call_slot != call_slot:
+                    self._move(rec, call_slot)
+                self._set_mic(rec, mic)
+                return rec
+            if not self._prepare():
+                return None
+            rec = self._open(call_id, call_slot, mic)
+            if rec:
+                self.active[call_id] = rec
+            return rec
+
+    def stop(self, call_id):
+        """Close a call's recording and queue it for compression and indexing"""
+        with self._lock:
+            rec = self.active.pop(call_id, None)
+            if rec:
+                self._close(rec)
+
+    def release(self, call_id):
+        """Stop recording a call that has ended and forget its part numbers"""
+        with self._lock:
+            rec = self.active.pop(call_id, None)
+            self.parts.pop(call_id, None)
+            if rec:
+                self._close(rec)
+
+    def set_microphone(self, call_id, enabled):
+        """Record the microphone in a call's recording, or stop recording it"""
+        with self._lock:
+            rec = self.active.get(call_id)
+            if rec:
+                self._set_mic(rec, enabled)
+
+    def is_recording(self, call_id):
+        return call_id in self.active
+
+    def rotate(self):
+        """Start a new part for every recording that is too long or too large"""
+        now = time.time()
+        rotated = 0
+        with self._lock:
+            for call_id, rec in list(self.active.items()):
+                try:
+                    size = os.path.getsize(rec.filename)
+                except OSError:
+                    size = 0
+                if now - rec.started < self.max_seconds and size < self.max_bytes:
+                    continue
+                # Open the next part before closing this one so no audio is lost
+                new_rec = self._open(call_id, rec.call_slot, rec.mic)
+                if new_rec is None:
+                    continue
+                self.active[call_id] = new_rec
+                self._close(rec)
+                self.rotations += 1
+                rotated += 1
+        return rotated
+
+    def get_stats(self):
+        return {
+            'available': self.available,
+            'directory': self.directory,
+            'active': len(self.active),
+            'segments': self.segments,
+            'rotations': self.rotations,
+            'pending': self.pending,
+            'errors': self.errors
+        }
+
+    def close(self, timeout=None):
+        """
+        Stop every recording and give the queued files up to timeout
+        seconds (no limit if None) to finish. Compressions still running
+        then are abandoned, leaving their WAV files for the next start.
+        """
+        for call_id in list(self.active):
+            self.release(call_id)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for future in list(self._futures):
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                future.result(remaining)
+            except Exception:
+                break
+        self._abort.set()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        # Queued jobs cancelled by shutdown never ran, so they are still pending
+        left = self.pending + self.abandoned
+        if left:
+            print(f"{left} recording(s) left uncompressed until the next start", file=sys.stderr)
+
+    def _prepare(self):
+        # Create the directory on first use and pick up leftovers from the last run
+        if self.available is None:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                leftovers = sorted(glob.glob(os.path.join(self.directory, '*.wav')))
+                self.available = True
+            except OSError as e:
+                self.available = False
+                self._error()
+                print(f"Recording unavailable, cannot use {self.directory}: {e}", file=sys.stderr)
+                return False
+            for filename in leftovers:
+                call_id, _, part = os.path.basename(filename)[:-4].rpartition('-')
+                try:
+                    mtime = os.path.getmtime(filename)
+                except OSError:
+                    continue
+                rec = Recording(call_id, -1, int(part) if part.isdigit() else 0, filename, started=mtime)
+                self._submit(rec, mtime)
+        return self.available
+
+    def _open(self, call_id, call_slot, mic):
+        part = self.parts.get(call_id, 0) + 1
+        self.parts[call_id] = part
+        filename = os.path.join(self.directory, f"{call_id}-{part:03d}.wav")
+        rec = Recording(call_id, call_slot, part, filename, mic=mic)
+        try:
+            rec.rec_id = self.lib.create_recorder(filename)
+            rec.rec_slot = self.lib.recorder_get_slot(rec.rec_id)
+            links = [(call_slot, rec.rec_slot)]
+            if mic:
+                links.append((0, rec.rec_slot))
+            self.lib.conf_connect_many(links)
+        except pj.Error as e:
+            self._error()
+            print(f"Error starting recording of call {call_id}: {e}", file=sys.stderr)
+            if rec.rec_id is not None:
+                self._destroy(rec)
+            return None
+        return rec
+
+    def _move(self, rec, call_slot):
+        # The old slot's links went with its port, if it is gone
+        try:
+            self.lib.conf_disconnect(rec.call_slot, rec.rec_slot)
+        except pj.Error:
+            pass
+        try:
+            self.lib.conf_connect(call_slot, rec.rec_slot)
+        except pj.Error as e:
+            self._error()
+            print(f"Error moving recording of call {rec.call_id} to slot {call_slot}: {e}", file=sys.stderr)
+        rec.call_slot = call_slot
+
+    def _set_mic(self, rec, enabled):
+        if rec.mic == enabled:
+            return
+        try:
+            if enabled:
+                self.lib.conf_connect(0, rec.rec_slot)
+            else:
+                self.lib.conf_disconnect(0, rec.rec_slot)
+            rec.mic = enabled
+        except pj.Error as e:
+            self._error()
+            print(f"Error switching the microphone of recording {rec.call_id}: {e}", file=sys.stderr)
+
+    def _error(self):
+        # Errors are counted on the SIP, command and worker threads
+        with self._stats_lock:
+            self.errors += 1
+
+    def _close(self, rec):
+        self._destroy(rec)
+        self.segments += 1
+        self._submit(rec, time.time())
+
+    def _submit(self, rec, ended):
+        self.pending += 1
+        future = self._pool.submit(self._finish, rec, ended)
+        self._futures.add(future)
+        future.add_done_callback(self._futures.discard)
+
+    def _destroy(self, rec):
+        try:
+            self.lib.recorder_destroy(rec.rec_id)
+        except pj.Error as e:
+            self._error()
+            print(f"Error closing recorder of call {rec.call_id}: {e}", file=sys.stderr)
+
+    def _finish(self, rec, ended):
+        # Runs on the worker pool: compress the segment and index it
+        try:
+            size = os.path.getsize(rec.filename)
+            filename = rec.filename
+            if self.compress:
+                filename = rec.filename + '.gz'
+                with open(rec.filename, 'rb') as src, gzip.open(filename, 'wb', compresslevel=6) as dst:
+                    while True:
+                        if self._abort.is_set():
+                            break
+                        chunk = src.read(1024 * 1024)
+                        if not chunk:
+                            break
+                        dst.write(chunk)
+                if self._abort.is_set():
+                    # Shutting down: keep the WAV for the next start
+                    os.remove(filename)
+                    with self._stats_lock:
+                        self.abandoned += 1
+                    return
+                os.remove(rec.filename)
+            entry = {
+                'call_id': rec.call_id,
+                'part': rec.part,
+                'file': os.path.basename(filename),
+                'started': round(rec.started, 3),
+                'ended': round(ended, 3),
+                'duration': round(ended - rec.started, 3),
+                'wav_bytes': size,
+                'stored_bytes': os.path.getsize(filename)
+            }
+            with self._index_lock:
+                with open(os.path.join(self.directory, 'index.jsonl'), 'a') as index:
+                    index.write(json.dumps(entry) + '\n')
+        except OSError as e:
+            self._error()
+            print(f"Error finishing recording {rec.filename}: {e}", file=sys.stderr)
+        finally:
+            with self._lock:
+                self.pending -= 1
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+import asyncio
+import random
+import sys
+import time
+import pjsua as pj
+from command_dispatcher import LatencyHistogram
+
+class LineState:
+    """Registration state of one account (dialer line)"""
+    PENDING = 'pending'
+    REGISTERING = 'registering'
+    REGISTERED = 'registered'
+    FAILED = 'failed'
+    UNREGISTERED = 'unregistered'
+
+    def __init__(self, key, acc_cfg, cb=None, default=False):
+        self.key = key
+        self.acc_cfg = acc_cfg
+        self.inner_cb = cb
+        self.default = default
+        self.account = None
+        self.callback = None
+        self.state = self.PENDING
+        self.reg_status = 0
+        self.reg_reason = ''
+        self.expires = 0
+        self.started = None
+        self.registered_at = None
+        self.time_to_registered_ms = None
+        self.refreshes = 0
+        self.failures = 0
+        self.waiter = None
+
+    def snapshot(self):
+        return {
+            'key': self.key,
+            'uri': self.acc_cfg.id,
+            'state': self.state,
+            'code': self.reg_status,
+            'reason': self.reg_reason,
+            'expires': self.expires,
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+            'time_to_registered_ms': self.time_to_registered_ms
+        }
+
+class _LineCallback(pj.AccountCallback):
+    """Feeds registration events of one line to the manager and forwards
+    every event to the line's own AccountCallback."""
+    def __init__(self, manager, line):
+        self.manager = manager
+        self.line = line
+        pj.AccountCallback.__init__(self)
+
+    def _set_account(self, account):
+        pj.AccountCallback._set_account(self, account)
+        if self.line.inner_cb:
+            self.line.inner_cb._set_account(account)
+
+    def on_reg_state(self):
+        self.manager._post(self.line, self.account.info())
+        if self.line.inner_cb:
+            self.line.inner_cb.on_reg_state()
+
+    def on_incoming_call(self, call):
+        if self.line.inner_cb:
+            self.line.inner_cb.on_incoming_call(call)
+        else:
+            call.hangup()
+
+    def on_incoming_subscribe(self, buddy, from_uri, contact_uri, pres_obj):
+        if self.line.inner_cb:
+            return self.line.inner_cb.on_incoming_subscribe(buddy, from_uri, contact_uri, pres_obj)
+        return (200, None)
+
+    def on_pager(self, from_uri, contact, mime_type, body):
+        if self.line.inner_cb:
+            self.line.inner_cb.on_pager(from_uri, contact, mime_type, body)
+
+    def on_pager_status(self, to_uri, body, im_id, code, reason):
+        if self.line.inner_cb:
+            self.line.inner_cb.on_pager_status(to_uri, body, im_id, code, reason)
+
+    def on_typing(self, from_uri, contact, is_typing):
+        if self.line.inner_cb:
+            self.line.inner_cb.on_typing(from_uri, contact, is_typing)
+
+    def on_mwi_info(self, body):
+        if self.line.inner_cb:
+            self.line.inner_cb.on_mwi_info(body)
+
+class RegistrationManager:
+    """
+    Registers many accounts without flooding the registrar.
+    At most `concurrency` REGISTER transactions are outstanding at a time,
+    and each account waits a random 0..jitter seconds before it is created.
+    The state of every line is kept up to date from on_reg_state, including
+    refreshes and failures after the initial registration. on_change is
+    called on the event loop with the line whenever its state changes.
+    """
+    def __init__(self, lib, concurrency=8, jitter=0.25, timeout=30.0, on_change=None):
+        self.lib = lib
+        self.concurrency = max(1, concurrency)
+        self.jitter = jitter
+        self.timeout = timeout
+        self.on_change = on_change
+        self.lines = {}
+        self.time_to_registered = LatencyHistogram()
+        self.loop = None
+
+    def add_line(self, key, acc_cfg, cb=None, default=False):
+        """
+        Add an account to register. cb receives all of its events. The
+        default line becomes pjsua's default account, whatever order the
+        lines end up being created in.
+        """
+        line = LineState(key, acc_cfg, cb, default)
+        self.lines[key] = line
+        return line
+
+    async def register_all(self):
+        """Register every pending line; returns when each has a final answer"""
+        self.loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.concurrency)
+        pending = [line for line in self.lines.values() if line.state == LineState.PENDING]
+        await asyncio.gather(*[self._register(line, slots) for line in pending])
+        return [line.snapshot() for line in pending]
+
+    def account(self, key):
+        line = self.lines.get(key)
+        return line.account if line else None
+
+    def accounts(self):
+        return [line.account for line in self.lines.values() if line.account]
+
+    def get_stats(self):
+        """Line counts per state and time-to-registered percentiles"""
+        states = {}
+        for line in self.lines.values():
+            states[line.state] = states.get(line.state, 0) + 1
+        ttr = self.time_to_registered
+        return {
+            'lines': len(self.lines),
+            'states': states,
+            'refreshes': sum(line.refreshes for line in self.lines.values()),
+            'failures': sum(line.failures for line in self.lines.values()),
+            'time_to_registered_ms': {
+                'count': ttr.total,
+                'p50': round(ttr.percentile(50), 3),
+                'p95': round(ttr.percentile(95), 3),
+                'max': round(ttr.max_ms, 3)
+            }
+        }
+
+    async def _register(self, line, slots):
+        async with slots:
+            if self.jitter:
+                await asyncio.sleep(random.uniform(0, self.jitter))
+            line.waiter = self.loop.create_future()
+            line.started = time.perf_counter()
+            self._set_state(line, LineState.REGISTERING)
+            try:
+                line.callback = _LineCallback(self, line)
+                line.account = self.lib.create_account(line.acc_cfg, set_default=line.default,
+                                                       cb=line.callback)
+            except pj.Error as e:
+                print(f"Error creating account {line.key}: {e}", file=sys.stderr)
+                line.failures += 1
+                line.reg_reason = str(e)
+                self._set_state(line, LineState.FAILED)
+                return
+            try:
+                await asyncio.wait_for(line.waiter, self.timeout)
+            except asyncio.TimeoutError:
+                line.failures += 1
+                line.reg_reason = 'Registration timed out'
+                self._set_state(line, LineState.FAILED)
+            finally:
+                line.waiter = None
+
+    def _post(self, line, info):
+        # Called on the pjsua callback thread
+        if self.loop:
+            self.loop.call_soon_threadsafe(self._on_reg_state, line, info)
+
+    def _on_reg_state(self, line, info):
+        line.reg_status = info.reg_status
+        line.reg_reason = info.reg_reason
+        line.expires = info.reg_expires
+        if 200 <= info.reg_status < 300:
+            if info.reg_expires > 0:
+                if line.state == LineState.REGISTERED:
+                    line.refreshes += 1
+                elif line.registered_at is None:
+                    line.registered_at = time.perf_counter()
+                    line.time_to_registered_ms = round((line.registered_at - line.started) * 1000.0, 3)
+                    self.time_to_registered.record(line.time_to_registered_ms)
+                state = LineState.REGISTERED
+            else:
+                state = LineState.UNREGISTERED
+        elif info.reg_status >= 300:
+            line.failures += 1
+            state = LineState.FAILED
+        else:
+            return
+
+        if line.waiter and not line.waiter.done():
+            line.waiter.set_result(state)
+        if state != line.state or state == LineState.FAILED:
+            self._set_state(line, state)
+
+    def _set_state(self, line, state):
+        line.state = state
+        if self.on_change:
+            try:
+                self.on_change(line)
+            except Exception as e:
+                print(f"Error in registration state handler: {e}", file=sys.stderr)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# name-addr: optional display name (quoted or bare) followed by <uri>
+_NAME_ADDR_RE = re.compile(r'\s*(?:"((?:[^"\\]|\\.)*)"|([^<"]*?))\s*<([^>]*)>')
+# sip/sips URI: user@ is optional, host may be an IPv6 reference
+_SIP_RE = re.compile(r'\s*(sips?):(?:([^@?]*)@)?(\[[^\]]*\]|[^:;?]*)(?::(\d+))?([^?]*)', re.IGNORECASE)
+# tel URI: the number is everything up to the first parameter
+_TEL_RE = re.compile(r'\s*(tel):([^;?]*)([^?]*)', re.IGNORECASE)
+_VISUAL_SEPARATORS_RE = re.compile(r'[\s\-.()]')
+
+_URI_FIELDS = ('scheme', 'user', 'host', 'port', 'params', 'display', 'number')
+
+class SipUri(namedtuple('SipUri', _URI_FIELDS)):
+    """
+    Parsed SIP, SIPS or tel URI. Instances are immutable, so the cached
+    result of parse_uri() can be shared by every caller.
+    scheme is lowercase ('' if the URI is not understood), port is 0 when
+    absent, params is a tuple of (name, value) pairs and number is the
+    user part without user parameters (the subscriber number of a tel URI),
+    or None when the URI has no user part.
+    """
+    __slots__ = ()
+
+    def param(self, name, default=None):
+        name = name.lower()
+        for key, value in self.params:
+            if key == name:
+                return value
+        return default
+
+    @property
+    def transport(self):
+        return self.param('transport', '')
+
+    @property
+    def aor(self):
+        """The URI without display name, port or parameters ('' if not understood)"""
+        if not self.scheme:
+            return ''
+        if self.scheme == 'tel':
+            return 'tel:' + self.user
+        return f"{self.scheme}:{self.user}@{self.host}" if self.user else f"{self.scheme}:{self.host}"
+
+_EMPTY = SipUri('', '', '', 0, (), '', None)
+
+def _parse_params(text):
+    params = []
+    for item in text.split(';'):
+        if item:
+            name, _, value = item.partition('=')
+            params.append((name.strip().lower(), value.strip()))
+    return tuple(params)
+
+@lru_cache(maxsize=1024)
+def parse_uri(uri):
+    """
+    Parse a URI or name-addr such as '"Alice" <sip:6001@pbx.example.com;transport=tcp>'.
+    Results are cached by the raw string, so the same remote URI seen on
+    every call state change is parsed once. Never raises: a string that is
+    not a SIP or tel URI gives a SipUri with an empty scheme.
+    """
+    if not uri:
+        return _EMPTY
+    display = ''
+    m = _NAME_ADDR_RE.match(uri)
+    if m:
+        display = m.group(1) if m.group(1) is not None else m.group(2)
+        uri = m.group(3)
+
+    m = _SIP_RE.match(uri)
+    if m:
+        scheme, user, host, port, params = m.groups()
+        user = user or ''
+        number = user.split(';', 1)[0] or None
+        return SipUri(scheme.lower(), user, host.lower(), int(port) if port else 0,
+                      _parse_params(params), display, number)
+
+    m = _TEL_RE.match(uri)
+    if m:
+        user = m.group(2).strip()
+        number = _VISUAL_SEPARATORS_RE.sub('', user) or None
+        return SipUri('tel', user, '', 0, _parse_params(m.group(3)), display, number)
+
+    return _EMPTY._replace(display=display)
+
+def phone_number(uri):
+    """The number (user part) of a URI, or None if it has none"""
+    return parse_uri(uri).number
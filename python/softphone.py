@@ -1,44 +1,43 @@
+import asyncio
+import threading
 import time
 import uuid
 import pjsua as pj
+import aiopjsua
 import json
 import os
 import sys
-import re
-
-def handle_command(command):
-    try:
-        if command['command'] == 'make_call':
-            phone_number = command.get('number')
-            if phone_number:
-                backend.make_call(phone_number)
-        elif command['command'] == 'hangup_call':
-            call_id = command.get('call_id')
-            backend.hangup_call(call_id)
-        elif command['command'] == 'answer_call':
-            call_id = command.get('call_id')
-            backend.answer_call(call_id)
-        elif command['command'] == 'set_mute':
-            call_id = command.get('call_id')
-            muted = command.get('muted', False)
-            backend.set_mute(call_id, muted)
-        elif command['command'] == 'set_hold':
-            call_id = command.get('call_id')
-            on_hold = command.get('on_hold', False)
-            backend.set_hold(call_id, on_hold)
-        elif command['command'] == 'switch_call':
-            call_id = command.get('call_id')
-            backend.switch_call(call_id)
-        elif command['command'] == 'setup_conference':
-            backend.setup_conference()
-        elif command['command'] == 'merge_call_to_conference':
-            call_id = command.get('call_id')
-            backend.merge_call_to_conference(call_id)
-        elif command['command'] == 'end_conference':
-            group_id = command.get('group_id')
-            backend.end_conference(group_id)
-    except Exception as e:
-        print(f"Error handling command: {e}", file=sys.stderr)
+import signal
+from event_channel import EventChannel
+from command_dispatcher import CommandDispatcher, REQUIRED
+from level_sampler import LevelSampler
+from registration import RegistrationManager, LineState
+from media_pool import MediaPool
+from recording import RecordingManager
+from call_quality import CallQualityCollector
+from sip_uri import phone_number
+from conference import ConferenceManager
+from call_lifecycle import CallLifecycle
+
+async def handle_command(command):
+    await backend.commands.dispatch(command)
+
+PRIMARY_LINE = 'primary'
+
+# Media pool asset played to held calls
+HOLD_MUSIC = 'hold_music'
+
+# The Electron app kills the backend 5 s after asking it to stop: in-flight
+# commands get this long, then shutdown() gets SHUTDOWN_TIMEOUT
+COMMAND_DRAIN_TIMEOUT = 1.0
+SHUTDOWN_TIMEOUT = 3.0
+
+TRANSPORT_TYPES = {
+    'udp': pj.TransportType.UDP,
+    'tcp': pj.TransportType.TCP,
+    'tls': pj.TransportType.TLS,
+    None: None
+}
 
 class CallCallback(pj.CallCallback):
     def __init__(self, backend, call, call_id=None):
@@ -47,32 +46,36 @@ class CallCallback(pj.CallCallback):
         self.call_id = call_id
 
     def on_state(self):
-        call_info = self.call.info()
-        remote_uri = call_info.remote_uri
-        match = re.search(r'sip:([^@]+)@', remote_uri)
-        phone_number = match.group(1)
+        call_info = self.call.cached_info()
         print(f"Call with {call_info.remote_uri} is {call_info.state_text}, code = {call_info.last_code}")
         self.backend.send_to_frontend({
             'type': 'call_state',
             'remote_uri': call_info.remote_uri,
             'state': call_info.state_text,
-            'number': phone_number,
+            'number': phone_number(call_info.remote_uri),
             'code': call_info.last_code,
             'id':  self.call_id,
         })
 
-        if call_info.state_text.lower() == "disconnctd":
-            if self.call_id in self.backend.calls:
-                del self.backend.calls[self.call_id]
+        if call_info.state == pj.CallState.DISCONNECTED:
+            # pjsua drops the call from its registry when it disconnects
+            if self.backend.lifecycle.release(self.call_id):
                 print(f"Call {self.call_id} removed from active calls.")
 
     def on_media_state(self):
-        if self.call.info().media_state == pj.MediaState.ACTIVE:
-            call_slot = self.call.info().conf_slot
+        if self.call.cached_info().media_state == pj.MediaState.ACTIVE:
+            call_slot = self.call.cached_info().conf_slot
+            mic = self.call_id not in self.backend.muted_calls
             self.backend.lib.conf_connect(call_slot, 0)
-            self.backend.lib.conf_connect(0, call_slot)
+            self.backend.set_microphone(self.call_id, call_slot, mic)
+            self.backend.track_call_levels(self.call_id, call_slot)
+            if self.backend.config.get('recording', {}).get('auto'):
+                self.backend.recordings.start(self.call_id, call_slot, mic=mic)
             print("Media is now active")
         else:
+            # A held call keeps its conference slot (and its hold music)
+            if self.call.cached_info().conf_slot == -1:
+                self.backend.release_call_media(self.call_id)
             print("Media is inactive")
 
 class AccountCallback(pj.AccountCallback):
@@ -83,18 +86,15 @@ class AccountCallback(pj.AccountCallback):
     def on_incoming_call(self, call):
         self.backend.current_call = call
         call_id = str(uuid.uuid4())
-        self.backend.calls[call_id] = call  # Store the mapping
+        self.backend.lib.calls.tag(call, call_id)  # Store the mapping
 
         call_cb = CallCallback(backend=self.backend, call=call, call_id=call_id)
-        call.set_callback(call_cb)
-
-        match = re.search(r'sip:([^@]+)@', call.info().remote_uri)
-        phone_number = match.group(1)
+        self.backend.lifecycle.track(call_id, aiopjsua.AioCall(call, cb=call_cb, loop=self.backend.loop))
 
         self.backend.send_to_frontend({
             'type': 'incoming_call',
-            'remote_uri': call.info().remote_uri,
-            'number': phone_number,
+            'remote_uri': call.cached_info().remote_uri,
+            'number': phone_number(call.cached_info().remote_uri),
             'id': call_id
         })
 
@@ -103,10 +103,24 @@ class SoftphoneBackend:
         self.lib = None
         self.account = None
         self.current_call = None
-        self.calls = {}
+        self.events = EventChannel()
+        self.lifecycle = None
+        self.aio_account = None
+        self.loop = None
+        self.levels = None
+        self.level_slots = {}
+        self.muted_calls = set()
+        self.level_subscription = None
+        self.registrations = None
+        self.media = None
+        self.recordings = None
+        self.quality = None
+        self.conferences = None
         # self.config_path = config_path
         # print("second 123", config_path)
         self.config = self.get_static_config()
+        self.commands = CommandDispatcher(on_error=self.report_command_error)
+        self.register_commands()
         self.init_pjsua()
     # def load_config(self):
     #     if not os.path.exists(self.config_path):
@@ -139,10 +153,243 @@ class SoftphoneBackend:
             "log_level": "info"
         }
 
+    def register_commands(self):
+        """Map frontend command names to handlers and their arguments."""
+        register = self.commands.register
+        register('make_call', self.make_call, [('number', str, REQUIRED)])
+        register('hangup_call', self.hangup_call, [('call_id', str, REQUIRED)])
+        register('answer_call', self.answer_call, [('call_id', str, REQUIRED)])
+        register('set_mute', self.set_mute, [('call_id', str, REQUIRED), ('muted', bool, False)])
+        register('set_hold', self.set_hold, [('call_id', str, REQUIRED), ('on_hold', bool, False)])
+        register('switch_call', self.switch_call, [('call_id', str, REQUIRED)])
+        register('setup_conference', self.setup_conference, [('call_ids', list, None)])
+        register('merge_call_to_conference', self.merge_call_to_conference, [('call_id', str, REQUIRED), ('group_id', str, None)])
+        register('remove_from_conference', self.remove_from_conference, [('call_id', str, REQUIRED)])
+        register('end_conference', self.end_conference, [('group_id', None, None)])
+        register('get_conferences', self.send_conferences)
+        register('get_call_lifecycle_stats', self.send_call_lifecycle_stats, [('sweep', bool, False)])
+        register('get_metrics', self.send_metrics)
+        register('enable_lock_stats', self.enable_lock_stats, [('enabled', bool, True)])
+        register('get_lock_stats', self.send_lock_stats, [('reset', bool, False)])
+        register('get_worker_stats', self.send_worker_stats)
+        register('get_dispatcher_stats', self.send_dispatcher_stats)
+        register('subscribe_levels', self.subscribe_levels, [('enabled', bool, True), ('interval_ms', int, 100)])
+        register('get_level_stats', self.send_level_stats, [('call_id', str, REQUIRED), ('samples', int, None)])
+        register('get_registration_stats', self.send_registration_stats)
+        register('get_trace', self.send_trace, [('seconds', (int, float), 10)])
+        register('get_transport_stats', self.send_transport_stats)
+        register('play_media', self.play_media, [('call_id', str, REQUIRED), ('asset', str, REQUIRED)])
+        register('stop_media', self.stop_media, [('call_id', str, REQUIRED), ('asset', str, None)])
+        register('get_media_stats', self.send_media_stats)
+        register('set_recording', self.set_recording, [('call_id', str, REQUIRED), ('enabled', bool, True)])
+        register('get_recording_stats', self.send_recording_stats)
+        register('get_call_stats', self.send_call_stats, [('call_id', str, REQUIRED), ('samples', int, None)])
+
+    def report_command_error(self, command, error):
+        self.send_to_frontend({'type': 'error', 'command': command, 'message': str(error)})
+
+    def send_metrics(self):
+        self.send_to_frontend({'type': 'metrics', 'commands': self.commands.get_metrics()})
+
+    def enable_lock_stats(self, enabled):
+        self.lib.enable_lock_stats(enabled)
+
+    def send_lock_stats(self, reset):
+        self.send_to_frontend({'type': 'lock_stats', 'stats': self.lib.lock_stats(reset=reset)})
+
+    def send_worker_stats(self):
+        self.send_to_frontend({'type': 'worker_stats', 'stats': self.lib.worker_stats()})
+
+    def send_dispatcher_stats(self):
+        self.send_to_frontend({'type': 'dispatcher_stats', 'stats': self.lib.dispatcher_stats()})
+
+    def track_call_levels(self, call_id, slot):
+        """Sample the signal levels of a call's conference slot."""
+        old_slot = self.level_slots.get(call_id)
+        if old_slot == slot:
+            return
+        if old_slot is not None:
+            self.levels.untrack(old_slot)
+        self.level_slots[call_id] = slot
+        self.levels.track(slot)
+
+    def on_call_released(self, call_id, call):
+        self.release_call_media(call_id)
+        if self.current_call is call:
+            self.current_call = None
+
+    async def reap_calls(self, interval=60.0):
+        """Periodically release calls whose end was never reported and count leaked ones."""
+        while self.lib:
+            await asyncio.sleep(interval)
+            if not self.lib:
+                break
+            swept = self.lifecycle.sweep()
+            if swept:
+                print(f"Released {swept} call(s) that ended without a DISCONNECTED event")
+
+    def send_call_lifecycle_stats(self, sweep):
+        if sweep:
+            self.lifecycle.sweep()
+        self.send_to_frontend({'type': 'call_lifecycle_stats', 'stats': self.lifecycle.get_stats()})
+
+    def release_call_media(self, call_id):
+        """Stop sampling and playing media to a call whose media is gone."""
+        slot = self.level_slots.pop(call_id, None)
+        if slot is not None:
+            self.levels.untrack(slot)
+            self.media.detach_all(slot)
+        self.muted_calls.discard(call_id)
+        self.recordings.release(call_id)
+        # The bridge has already dropped the port's links
+        group, _ = self.conferences.remove(call_id, disconnect=False)
+        if group:
+            self.send_conference_state(group, f"Call {call_id} left the conference")
+
+    def load_media(self):
+        """Register the prompts and hold music from the config."""
+        media = self.config.get('media', {})
+        assets = [(name, files, False) for name, files in media.get('prompts', {}).items()]
+        if media.get('hold_music'):
+            assets.insert(0, (HOLD_MUSIC, media['hold_music'], True))
+        for name, files, loop in assets:
+            try:
+                # Preloaded so the first caller doesn't wait for the file to open
+                self.media.register(name, files, loop=loop, preload=True)
+            except pj.Error as e:
+                # Still registered: attaching retries the open
+                print(f"⚠️ Could not open media asset {name}: {e}", file=sys.stderr)
+
+    def set_microphone(self, call_id, call_slot, enabled):
+        """Connect or disconnect the microphone from a call and its recording."""
+        if enabled:
+            self.lib.conf_connect(0, call_slot)
+        else:
+            self.lib.conf_disconnect(0, call_slot)
+        self.recordings.set_microphone(call_id, enabled)
+
+    def start_hold_music(self, call_id, call_info):
+        if call_info.conf_slot == -1:
+            return
+        # The held party hears the music, if any, instead of our microphone
+        self.set_microphone(call_id, call_info.conf_slot, False)
+        if HOLD_MUSIC in self.media.assets:
+            self.media.attach(HOLD_MUSIC, call_info.conf_slot)
+
+    def stop_hold_music(self, call_info):
+        if call_info.conf_slot != -1:
+            self.media.detach(HOLD_MUSIC, call_info.conf_slot)
+
+    def play_media(self, call_id, asset):
+        """Play a prompt or other media asset to a call."""
+        call = self.get_call_by_id(call_id)
+        call_info = call.cached_info() if call else None
+        if not call_info or call_info.conf_slot == -1:
+            self.send_to_frontend({'type': 'error', 'message': 'Call media is not active'})
+            return
+        if asset not in self.media.assets:
+            self.send_to_frontend({'type': 'error', 'message': f"Unknown media asset '{asset}'"})
+            return
+        self.media.attach(asset, call_info.conf_slot)
+        self.send_to_frontend({'type': 'media_state', 'id': call_id, 'playing': self.media.playing(call_info.conf_slot)})
+
+    def stop_media(self, call_id, asset):
+        """Stop one media asset, or all of them, playing to a call."""
+        call = self.get_call_by_id(call_id)
+        call_info = call.cached_info() if call else None
+        if not call_info or call_info.conf_slot == -1:
+            return
+        if asset:
+            self.media.detach(asset, call_info.conf_slot)
+        else:
+            self.media.detach_all(call_info.conf_slot)
+        self.send_to_frontend({'type': 'media_state', 'id': call_id, 'playing': self.media.playing(call_info.conf_slot)})
+
+    def send_media_stats(self):
+        self.send_to_frontend({'type': 'media_stats', 'assets': self.media.get_stats()})
+
+    def set_recording(self, call_id, enabled):
+        """Start or stop recording a call."""
+        if enabled:
+            call = self.get_call_by_id(call_id)
+            call_info = call.cached_info() if call else None
+            if not call_info or call_info.conf_slot == -1:
+                self.send_to_frontend({'type': 'error', 'message': 'Call media is not active'})
+                return
+            # Our side is only recorded while the microphone feeds the call
+            mic = call_info.media_state == pj.MediaState.ACTIVE and call_id not in self.muted_calls
+            if not self.recordings.start(call_id, call_info.conf_slot, mic=mic):
+                self.send_to_frontend({'type': 'error', 'message': 'Recording is unavailable'})
+        else:
+            self.recordings.stop(call_id)
+        self.send_to_frontend({'type': 'recording_state', 'id': call_id, 'recording': self.recordings.is_recording(call_id)})
+
+    def send_recording_stats(self):
+        self.send_to_frontend({'type': 'recording_stats', 'stats': self.recordings.get_stats()})
+
+    async def rotate_recordings(self, interval=10.0):
+        """Split long recordings into parts; compression runs on the recording workers."""
+        while self.lib:
+            await asyncio.sleep(interval)
+            if not self.lib:
+                break
+            self.recordings.rotate()
+
+    def send_call_quality(self, latest):
+        # Runs on the collector thread; send_to_frontend only queues the event
+        self.send_to_frontend({'type': 'call_quality', 'calls': latest})
+
+    def send_call_stats(self, call_id, samples):
+        stats = self.quality.call_stats(call_id, samples)
+        if stats is None:
+            self.send_to_frontend({'type': 'error', 'message': 'No media statistics for this call'})
+            return
+        self.send_to_frontend({
+            'type': 'call_stats',
+            'id': call_id,
+            'stats': stats,
+            'collector': self.quality.get_stats()
+        })
+
+    def subscribe_levels(self, enabled, interval_ms):
+        """Stream the signal levels of every active call to the frontend."""
+        if self.level_subscription:
+            self.levels.unsubscribe(self.level_subscription)
+            self.level_subscription = None
+        if enabled:
+            every = max(1, round(interval_ms / 1000.0 / self.levels.interval))
+            self.level_subscription = self.levels.subscribe(self.send_levels, every)
+
+    def send_levels(self, latest):
+        # Runs on the sampler thread; send_to_frontend only queues the event
+        levels = {}
+        for call_id, slot in list(self.level_slots.items()):
+            if slot in latest:
+                tx_level, rx_level = latest[slot]
+                levels[call_id] = {'tx': round(tx_level, 4), 'rx': round(rx_level, 4)}
+        if levels:
+            self.send_to_frontend({'type': 'signal_levels', 'levels': levels})
+
+    def send_level_stats(self, call_id, samples):
+        slot = self.level_slots.get(call_id)
+        stats = self.levels.stats(slot, samples) if slot is not None else None
+        if stats is None:
+            self.send_to_frontend({'type': 'error', 'message': 'Call media is not active'})
+            return
+        self.send_to_frontend({
+            'type': 'level_stats',
+            'id': call_id,
+            'stats': stats,
+            'sampler': self.levels.get_stats()
+        })
+
+    def send_trace(self, seconds):
+        """Send the last seconds of the pjsua trace buffer."""
+        self.send_to_frontend({'type': 'trace', 'records': self.lib.trace_records(seconds)})
+
     def send_to_frontend(self, message):
         try:
-            json_message = json.dumps(message)
-            print(json_message, flush=True)
+            self.events.send(message)
         except Exception as e:
             print(f"Error sending message to frontend: {e}", file=sys.stderr)
 
@@ -152,33 +399,124 @@ class SoftphoneBackend:
             self.lib = pj.Lib()
 
             self.lib.init(log_cfg=pj.LogConfig(level=log_level, console_level=log_level))
-            self.lib.create_transport(pj.TransportType.TCP, pj.TransportConfig())
-            self.lib.start()
+            self.create_transports()
+            # Run our callbacks off the thread that polls the SIP stack
+            self.lib.start(dispatcher_cfg=pj.DispatcherConfig())
+            self.levels = LevelSampler(self.lib)
+            self.levels.start()
+            self.quality = CallQualityCollector(self.lib, interval=self.config.get('quality', {}).get('interval', 5.0))
+            self.quality.subscribe(self.send_call_quality)
+            self.quality.start()
+            self.media = MediaPool(self.lib)
+            self.conferences = ConferenceManager(self.lib)
+            self.lifecycle = CallLifecycle(self.lib, on_release=self.on_call_released)
+            self.load_media()
+            rec = self.config.get('recording', {})
+            self.recordings = RecordingManager(
+                self.lib,
+                directory=rec.get('directory', 'recordings'),
+                max_seconds=rec.get('max_minutes', 30) * 60,
+                max_bytes=rec.get('max_mb', 50) * 1024 * 1024,
+                compress=rec.get('compress', True),
+                workers=rec.get('workers', 2)
+            )
             self.set_audio_devices()
 
-            sip = self.config['sip']
-
-            if sip['username'] and sip['password'] and sip['domain']:
-                acc_cfg = pj.AccountConfig(
-                    domain=sip['domain'],
-                    username=sip['username'],
-                    password=sip['password']
-                )
-                acc_cfg.id = f"sip:{sip['username']}@{sip['domain']}"
-                if sip['proxy']:
-                    acc_cfg.proxy = [f"sip:{sip['proxy']}"]
-
-                self.account = self.lib.create_account(acc_cfg)
-                acc_cb = AccountCallback(account=self.account, backend=self)
-                self.account.set_callback(acc_cb)
-
-                print("SIP account registered", self.account)
-                self.send_to_frontend({'type': 'registered', 'message': 'SIP registered successfully'})
+            # Accounts are registered once the command loop is running
+            reg = self.config.get('registration', {})
+            self.registrations = RegistrationManager(
+                self.lib,
+                concurrency=reg.get('concurrency', 8),
+                jitter=reg.get('jitter', 0.25),
+                timeout=reg.get('timeout', 30.0),
+                on_change=self.on_registration_change
+            )
+            for key, sip in self.get_lines():
+                if sip.get('username') and sip.get('password') and sip.get('domain'):
+                    acc_cfg = self.make_account_config(sip)
+                    self.lib.transports.bind_config(acc_cfg, key, TRANSPORT_TYPES.get(sip.get('transport')))
+                    # The primary line is pjsua's default account, which gets
+                    # requests that match no account
+                    self.registrations.add_line(key, acc_cfg, AccountCallback(account=None, backend=self),
+                                                default=(key == PRIMARY_LINE))
 
         except pj.Error as e:
             self.send_to_frontend({'type': 'error', 'message': f"PJSUA init error: {str(e)}"})
             self.shutdown()
 
+    def create_transports(self):
+        """Create the SIP transports that the accounts are spread across."""
+        for tp in self.config.get('transports', [{'type': 'tcp'}]):
+            tp_type = TRANSPORT_TYPES[tp.get('type', 'tcp')]
+            tp_cfg = pj.TransportConfig(port=tp.get('port', 0), bound_addr=tp.get('bound_addr', ''))
+            try:
+                self.lib.transports.add(tp_type, tp_cfg, name=tp.get('name'))
+            except pj.Error as e:
+                print(f"Error creating {tp.get('type', 'tcp')} transport: {e}", file=sys.stderr)
+        if not len(self.lib.transports):
+            raise pj.Error("create_transports()", self.lib, -1, "No SIP transport could be created")
+
+    async def monitor_transports(self, interval=30.0):
+        """Check transport health periodically and report accounts moved off failed ones."""
+        while self.lib:
+            await asyncio.sleep(interval)
+            if not self.lib:
+                break
+            moved = self.lib.transports.check()
+            if moved:
+                self.send_to_frontend({'type': 'transport_state', 'moved': moved, 'transports': self.lib.transports.stats()})
+
+    def send_transport_stats(self):
+        self.lib.transports.check()
+        self.send_to_frontend({'type': 'transport_stats', 'transports': self.lib.transports.stats()})
+
+    def get_lines(self):
+        """The primary SIP account followed by the extra dialer lines."""
+        lines = [(PRIMARY_LINE, self.config['sip'])]
+        for i, sip in enumerate(self.config.get('lines', [])):
+            lines.append((sip.get('key') or f"line-{i + 1}", sip))
+        return lines
+
+    @staticmethod
+    def make_account_config(sip):
+        acc_cfg = pj.AccountConfig(
+            domain=sip['domain'],
+            username=sip['username'],
+            password=sip['password']
+        )
+        acc_cfg.id = f"sip:{sip['username']}@{sip['domain']}"
+        if sip.get('proxy'):
+            acc_cfg.proxy = [f"sip:{sip['proxy']}"]
+        return acc_cfg
+
+    async def register_accounts(self):
+        if self.registrations:
+            await self.registrations.register_all()
+            # Let the transport pool move the accounts if their transport fails
+            for line in self.registrations.lines.values():
+                if line.account:
+                    self.lib.transports.bind(line.account, line.key)
+            print(f"SIP registration finished: {self.registrations.get_stats()['states']}")
+
+    def on_registration_change(self, line):
+        if line.key == PRIMARY_LINE and line.account and not self.account:
+            self.account = line.account
+            self.aio_account = aiopjsua.AioAccount(self.account, cb=line.callback, loop=self.loop)
+
+        self.send_to_frontend(dict(line.snapshot(), type='registration_state'))
+        if line.key != PRIMARY_LINE:
+            return
+        if line.state == LineState.REGISTERED and line.refreshes == 0:
+            print("SIP account registered", self.account)
+            self.send_to_frontend({'type': 'registered', 'message': 'SIP registered successfully'})
+        elif line.state == LineState.FAILED:
+            self.send_to_frontend({'type': 'error', 'message': f"SIP registration failed: {line.reg_reason}"})
+
+    def send_registration_stats(self):
+        stats = self.registrations.get_stats() if self.registrations else {}
+        lines = [line.snapshot() for line in self.registrations.lines.values()] if self.registrations else []
+        self.send_to_frontend({'type': 'registration_stats', 'stats': stats, 'lines': lines})
+
     def set_audio_devices(self):
         audio_cfg = self.config.get('audio', {})
         input_dev = audio_cfg.get('input_device')
@@ -205,19 +543,16 @@ class SoftphoneBackend:
     def make_call(self, uri):
         if self.account:
             try:
-                for call_id, call in self.calls.items():
-                    call_info = call.info()
-                    if call_info.media_state == pj.MediaState.ACTIVE:
-                        call.hold()
-                        print(f"Call {call_id} put on hold.")
+                self.hold_active_calls()
 
                 print(f"Making call to {uri}")
                 sip = self.config['sip']
                 dst_uri = f"sip:{uri}@{sip['domain']}"
                 call_id = str(uuid.uuid4())
-                self.calls[call_id] = self.account.make_call(dst_uri)
-                call_callback = CallCallback(backend=self, call=self.calls[call_id], call_id=call_id)
-                self.calls[call_id].set_callback(call_callback)
+                call_callback = CallCallback(backend=self, call=None, call_id=call_id)
+                aio_call = self.aio_account.start_call(dst_uri, call_callback)
+                self.lib.calls.tag(aio_call.call, call_id)
+                self.lifecycle.track(call_id, aio_call)
 
                 self.send_to_frontend({'type': 'call_init', 'id': call_id})
 
@@ -229,114 +564,114 @@ class SoftphoneBackend:
                 self.send_to_frontend({'type': 'error', 'message': f"Unexpected error: {str(e)}"})
 
     def answer_call(self, current_call_id):
-        if self.calls[current_call_id]:
+        call = self.get_call_by_id(current_call_id)
+        if call:
             try:
-                self.calls[current_call_id].answer(200)
-
-                for call_ids in self.calls:
-                    # Skip holding the current answered call
-                    if call_ids != current_call_id:
-                        if self.calls[call_ids].info().media_state == pj.MediaState.ACTIVE:
-                            self.calls[call_ids].hold()
+                call.answer(200)
+                # Hold every other call, skipping the current answered call
+                self.hold_active_calls(except_id=current_call_id)
 
             except pj.Error as e:
                 self.send_to_frontend({'type': 'error', 'message': f"Answer call failed: {str(e)}"})
 
     def hangup_call(self, call_id):
         try:
-            call_ids = list(self.calls.keys()) if call_id == 'all' else [call_id]  # Create a copy of keys
+            call_ids = list(self.calls) if call_id == 'all' else [call_id]
             for call_id in call_ids:
-                if self.calls.get(call_id):  # Use .get() to avoid KeyError
-                    if self.calls[call_id].info().state not in [pj.CallState.DISCONNECTED, pj.CallState.NULL]:
-                        self.calls[call_id].hangup()
-                    del self.calls[call_id]  # Safely delete after processing
+                call = self.get_call_by_id(call_id)
+                if call:
+                    if call.cached_info().state not in [pj.CallState.DISCONNECTED, pj.CallState.NULL]:
+                        call.hangup()
+                    # The wrapper is released on DISCONNECTED, after the final call_state event
+                    self.lib.calls.untag(call_id)
                 else:
                     print(f"Call {call_id} is already terminated or not active.")
 
-            if len(self.calls) > 0:
-                first_call = list(self.calls.values())[0]
-                try:
-                    call_info = first_call.info()
-                    if call_info.media_state in [pj.MediaState.LOCAL_HOLD, pj.MediaState.ACTIVE]:
+            # Resume the call that has been on hold longest, if nothing else is active
+            if not self.lib.calls.tagged(media_state=pj.MediaState.ACTIVE):
+                held = self.lib.calls.tagged(media_state=pj.MediaState.LOCAL_HOLD)
+                if held:
+                    first_call = next(iter(held.values()))
+                    try:
+                        self.stop_hold_music(first_call.cached_info())
                         first_call.reinvite()
-                except Exception as e:
-                    print(f"Error retrieving info or unholding call: {e}")
+                    except Exception as e:
+                        print(f"Error retrieving info or unholding call: {e}")
 
         except pj.Error as e:
                 self.send_to_frontend({'type': 'error', 'message': f"Hangup call failed: {str(e)}"})
 
-    def setup_conference(self):
+    async def setup_conference(self, call_ids):
+        """Start a new conference with the given calls, or with every call not already in one."""
         try:
-            active_slots = []
-
-            # Activate all calls and collect slots
-            for call_id in self.calls:
-                info = self.calls[call_id].info()
-                if info.media_state != pj.MediaState.ACTIVE:
-                    self.calls[call_id].reinvite()
-                    time.sleep(2)
-                    info = self.calls[call_id].info()
-
-                if info.media_state == pj.MediaState.ACTIVE and info.conf_slot != -1:
-                    active_slots.append(info.conf_slot)
+            if call_ids is None:
+                call_ids = [call_id for call_id in self.calls if not self.conferences.group_of(call_id)]
+
+            # Re-invite every inactive call at once, then wait for their media
+            infos = await asyncio.gather(*[self.activate_call(call_id) for call_id in call_ids])
+
+            members = {}
+            for call_id, info in zip(call_ids, infos):
+                if info:
+                    members[call_id] = info.conf_slot
                 else:
                     print(f"⚠️ Call {call_id} still inactive.")
 
-            if len(active_slots) < 2:
+            if len(members) < 2:
                 self.send_to_frontend({'type': 'error', 'message': 'Need at least 2 active calls for conference'})
                 return
 
-            group_name = f"Conference-{uuid.uuid4().hex[:6]}"
-            # Connect all slots to each other
-            for i in range(len(active_slots)):
-                for j in range(i + 1, len(active_slots)):
-                    self.lib.conf_connect(active_slots[i], active_slots[j])
-                    self.lib.conf_connect(active_slots[j], active_slots[i])
-
-            call_list = []
-
-            for call_id in self.calls:
-                call_info = self.calls[call_id].info()
-                if call_info.media_state == pj.MediaState.ACTIVE:
-                    remote_uri = call_info.remote_uri
-                    match = re.search(r'sip:([^@]+)@', remote_uri)
-                    phone_number = match.group(1) if match else None
-
-                    call_list.append({
-                        'number': phone_number,
-                        'state': str(call_info.state),
-                        'id': call_id,
-                    })
-
-            self.send_to_frontend({
-                'type': 'conference_state',
-                'message': 'Conference call set up successfully',
-                'group_name': group_name,
-                'calls': call_list
-            })
-            print("✅ Conference bridge created.")
+            # Connect the members to each other in one pass over the bridge
+            group, results = self.conferences.create(members)
+            self.report_conf_failures(results)
+            self.send_conference_state(group, 'Conference call set up successfully')
+            print(f"✅ Conference bridge {group.group_id} created.")
 
         except Exception as e:
             print(f"❌ Error setting up conference: {e}")
             self.send_to_frontend({'type': 'error', 'message': str(e)})
 
+    def send_conferences(self):
+        self.send_to_frontend({'type': 'conferences', 'groups': self.conferences.snapshot()})
+
+    def send_conference_state(self, group, message):
+        call_list = []
+        for call_id in list(group.members):
+            call = self.get_call_by_id(call_id)
+            if call:
+                call_info = call.cached_info()
+                call_list.append({
+                    'number': phone_number(call_info.remote_uri),
+                    'state': str(call_info.state),
+                    'id': call_id,
+                })
+        self.send_to_frontend({
+            'type': 'conference_state',
+            'message': message,
+            'group_id': group.group_id,
+            'group_name': group.name,
+            'calls': call_list
+        })
+
     def set_mute(self, call_id, muted):
         """Mute or unmute a call."""
         try:
             call = self.get_call_by_id(call_id)
             if call:
-                call_info = call.info()
+                call_info = call.cached_info()
                 print(f"Call ID: {call_id}, Media State: {call_info.media_state}, Conf Slot: {call_info.conf_slot}")
 
                 if call_info.media_state == pj.MediaState.ACTIVE:
                     call_slot = call_info.conf_slot
                     if muted:
                         self.lib.conf_disconnect(call_slot, 0)
-                        self.lib.conf_disconnect(0, call_slot)
+                        self.set_microphone(call_id, call_slot, False)
+                        self.muted_calls.add(call_id)
                         self.send_to_frontend({'type': 'call_mute_state', 'message': 'Call muted', 'muted': True})
                     else:
                         self.lib.conf_connect(call_slot, 0)
-                        self.lib.conf_connect(0, call_slot)
+                        self.set_microphone(call_id, call_slot, True)
+                        self.muted_calls.discard(call_id)
                         self.send_to_frontend({'type': 'call_mute_state', 'message': 'Call unmuted', 'muted': False})
                 else:
                     self.send_to_frontend({'type': 'error', 'message': 'Call media is not active'})
@@ -351,13 +686,15 @@ class SoftphoneBackend:
         try:
             call = self.get_call_by_id(call_id)
             if call:
-                call_info = call.info()
+                call_info = call.cached_info()
                 if on_hold and call_info.media_state == pj.MediaState.ACTIVE:
                     # Put the call on hold
                     call.hold()
+                    self.start_hold_music(call_id, call_info)
                     self.send_to_frontend({'type': 'call_hold_state', 'message': 'Call on hold', 'on_hold': True})
                 elif not on_hold and call_info.media_state in [pj.MediaState.LOCAL_HOLD, pj.MediaState.ACTIVE]:
                     # Resume the call
+                    self.stop_hold_music(call_info)
                     call.reinvite()
                     self.send_to_frontend({'type': 'call_hold_state', 'message': 'Call resumed', 'on_hold': False})
                 else:
@@ -370,78 +707,80 @@ class SoftphoneBackend:
     def switch_call(self, current_call_id):
         """Switch between active calls."""
         try:
-            if current_call_id not in self.calls:
+            call = self.get_call_by_id(current_call_id)
+            if not call:
                 self.send_to_frontend({'type': 'error', 'message': 'Invalid call ID'})
                 return
 
-            for call_id, call in self.calls.items():
-                if call.info().state not in [pj.CallState.DISCONNECTED, pj.CallState.NULL]:
-                    if call_id == current_call_id:
-                        # Resume the selected call
-                        if call.info().media_state in [pj.MediaState.LOCAL_HOLD, pj.MediaState.ACTIVE]:
-                            call.reinvite()
-                            self.send_to_frontend({'type': 'call_switch', 'message': f'Switched to call {call_id}', 'active_call': call_id})
-                    else:
-                        # Put other calls on hold
-                        if call.info().media_state == pj.MediaState.ACTIVE:
-                            call.hold()
+            # Put other calls on hold
+            self.hold_active_calls(except_id=current_call_id)
+
+            call_info = call.cached_info()
+            if call_info.state not in [pj.CallState.DISCONNECTED, pj.CallState.NULL]:
+                # Resume the selected call
+                if call_info.media_state in [pj.MediaState.LOCAL_HOLD, pj.MediaState.ACTIVE]:
+                    self.stop_hold_music(call_info)
+                    call.reinvite()
+                    self.send_to_frontend({'type': 'call_switch', 'message': f'Switched to call {current_call_id}', 'active_call': current_call_id})
         except Exception as e:
             self.send_to_frontend({'type': 'error', 'message': f"Failed to switch call: {str(e)}"})
 
     # Add a method to merge a new call into an existing conference
-    def merge_call_to_conference(self, call_id):
+    async def merge_call_to_conference(self, call_id, group_id):
         try:
-            if call_id not in self.calls:
+            if not self.get_call_by_id(call_id):
                 self.send_to_frontend({'type': 'error', 'message': 'Invalid call ID'})
                 return
+            group = self.conferences.get(group_id)
+            if not group:
+                self.send_to_frontend({'type': 'error', 'message': 'Unknown conference; pass its group_id'})
+                return
 
-            call_info = self.calls[call_id].info()
-            if call_info.media_state != pj.MediaState.ACTIVE:
-                self.calls[call_id].reinvite()
-                time.sleep(2)  # Wait for the call to become active
-                call_info = self.calls[call_id].info()
-
-            if call_info.media_state == pj.MediaState.ACTIVE and call_info.conf_slot != -1:
-                # Connect the new call to all existing conference slots
-                for existing_call_id in self.calls:
-                    existing_call_info = self.calls[existing_call_id].info()
-                    if existing_call_info.media_state == pj.MediaState.ACTIVE and existing_call_info.conf_slot != -1:
-                        self.lib.conf_connect(call_info.conf_slot, existing_call_info.conf_slot)
-                        self.lib.conf_connect(existing_call_info.conf_slot, call_info.conf_slot)
-                        print(f"🔗 Merged call {call_id} into conference with call {existing_call_id}")
-
-                self.send_to_frontend({
-                    'type': 'conference_state',
-                    'message': 'Call merged into conference successfully',
-                    'calls': [
-                        {
-                            'number': self.calls[call_id].info().remote_uri,
-                            'state': str(self.calls[call_id].info().state)
-                        }
-                        for call_id in self.calls
-                        if self.calls[call_id].info().media_state == pj.MediaState.ACTIVE
-                    ]
-                })
+            call_info = await self.activate_call(call_id)
+
+            if call_info:
+                # Connect the new call to the conference's members only
+                group, results = self.conferences.add(group.group_id, call_id, call_info.conf_slot)
+                self.report_conf_failures(results)
+                print(f"🔗 Merged call {call_id} into conference {group.group_id} with {len(group.members) - 1} call(s)")
+                self.send_conference_state(group, 'Call merged into conference successfully')
             else:
                 self.send_to_frontend({'type': 'error', 'message': 'Call media is not active or invalid'})
         except Exception as e:
             print(f"❌ Error merging call into conference: {e}")
             self.send_to_frontend({'type': 'error', 'message': str(e)})
 
+    def remove_from_conference(self, call_id):
+        """Take a call out of its conference without hanging it up."""
+        group, results = self.conferences.remove(call_id)
+        if not group:
+            self.send_to_frontend({'type': 'error', 'message': 'Call is not in a conference'})
+            return
+        self.report_conf_failures(results)
+        self.send_conference_state(group, f"Call {call_id} removed from conference")
+
     def end_conference(self, group_id):
         try:
-            # Iterate through all active calls and hang them up
-            for call_id, call in self.calls.items():
-                if call.info().media_state == pj.MediaState.ACTIVE:
+            group = self.conferences.get(group_id)
+            if not group:
+                self.send_to_frontend({'type': 'error', 'message': 'Unknown conference; pass its group_id'})
+                return
+            call_ids, results = self.conferences.end(group.group_id)
+            self.report_conf_failures(results)
+
+            # Hang up the calls of this conference only
+            for call_id in call_ids:
+                call = self.get_call_by_id(call_id)
+                if call and call.cached_info().state not in [pj.CallState.DISCONNECTED, pj.CallState.NULL]:
                     call.hangup()
 
             # Notify the frontend that the conference has ended
             self.send_to_frontend({
                 'type': 'conference_ended',
-                'group_id': group_id,
+                'group_id': group.group_id,
                 'message': 'Conference ended successfully'
             })
-            print(f"✅ Conference with group ID {group_id} ended.")
+            print(f"✅ Conference with group ID {group.group_id} ended.")
         except Exception as e:
             print(f"❌ Error ending conference: {e}")
             self.send_to_frontend({
@@ -449,37 +788,146 @@ class SoftphoneBackend:
                 'message': f"Failed to end conference: {str(e)}"
             })
 
+    @property
+    def calls(self):
+        """Snapshot of the live calls by call ID, from the pjsua call registry."""
+        return self.lib.calls.tagged() if self.lib else {}
+
     def get_call_by_id(self, call_id):
         """Retrieve a call object by its ID."""
-        return self.calls.get(call_id)
-
-    def shutdown(self):
+        return self.lib.calls.by_tag(call_id) if self.lib else None
+
+    def hold_active_calls(self, except_id=None):
+        """Put every call with active media on hold, from the registry's media state index."""
+        for call_id, call in self.lib.calls.tagged(media_state=pj.MediaState.ACTIVE).items():
+            if call_id == except_id:
+                continue
+            call.hold()
+            self.start_hold_music(call_id, call.cached_info())
+            print(f"Call {call_id} put on hold.")
+
+    def attach_loop(self, loop):
+        """Bind the backend to the asyncio loop that runs the commands."""
+        self.loop = loop
+
+    def report_conf_failures(self, results):
+        """Log the slot pairs a batch conference bridge operation failed on."""
+        for src_slot, dst_slot, err in results:
+            if err:
+                print(f"⚠️ Conference link {src_slot} -> {dst_slot} failed: {pj.Lib.strerror(err)}", file=sys.stderr)
+
+    async def activate_call(self, call_id, timeout=5.0):
+        """
+        Re-invite a call whose media is not active and wait for its media.
+
+        Returns the CallInfo once the media is active with a conference slot,
+        or None if the call goes away or the timeout expires first.
+        """
+        aio_call = self.lifecycle.get(call_id)
+        if not aio_call:
+            return None
         try:
-            if self.calls:
-                for call_id in self.calls:  # Use list() to avoid runtime modification issues
-                    if self.calls[call_id].info().state not in [pj.CallState.DISCONNECTED, pj.CallState.NULL]:
-                        self.calls[call_id].hangup()
-
-            if self.account:
-                self.account.delete()
+            if aio_call.info().media_state != pj.MediaState.ACTIVE:
+                return await aio_call.reinvite(timeout=timeout)
+            return await aio_call.media_active(timeout)
+        except (pj.Error, asyncio.TimeoutError) as e:
+            print(f"Call {call_id} media did not become active: {e}", file=sys.stderr)
+            return None
+
+    def shutdown(self, grace=1.0, timeout=SHUTDOWN_TIMEOUT):
+        """
+        Tear the backend down within timeout seconds: hang up every call
+        and unregister the account together, give them up to grace seconds
+        to complete, then destroy pjsua. Each phase is timed and reported.
+        Queued recordings get at most a third of the budget to finish
+        compressing; the rest are compressed on the next start.
+        """
+        deadline = time.monotonic() + timeout
+        try:
+            if self.levels:
+                self.levels.stop()
+            if self.quality:
+                self.quality.stop()
+            if self.recordings:
+                self.recordings.close(timeout=timeout / 3.0)
+            if self.media:
+                self.media.close()
             if self.lib:
-                self.lib.destroy()
+                accounts = self.registrations.accounts() if self.registrations else []
+                remaining = max(0.0, deadline - time.monotonic())
+                phases = self.lib.shutdown(accounts=accounts, grace=grace, timeout=remaining)
+                self.account = None
                 self.lib = None
-            print("PJSUA shutdown completed")
+                self.lifecycle.clear()
+                print(f"PJSUA shutdown completed: {phases}")
+                self.send_to_frontend({'type': 'shutdown', 'phases_ms': phases})
         except pj.Error as e:
             print(f"Error during shutdown: {e}", file=sys.stderr)
+        finally:
+            self.events.close()
+
+def read_commands(loop, queue):
+    """Feed stdin lines into the asyncio queue; None marks end of input."""
+    for line in sys.stdin:
+        loop.call_soon_threadsafe(queue.put_nowait, line)
+    loop.call_soon_threadsafe(queue.put_nowait, None)
+
+async def run_command_loop():
+    loop = asyncio.get_running_loop()
+    backend.attach_loop(loop)
+
+    # stdin is read on its own thread; every command then runs as a task on
+    # this loop, so a slow conference setup never holds up a hangup.
+    queue = asyncio.Queue()
+    try:
+        # Treat SIGTERM like end of input so shutdown still runs
+        loop.add_signal_handler(signal.SIGTERM, queue.put_nowait, None)
+    except NotImplementedError:
+        pass  # Not available on Windows
+    reader = threading.Thread(target=read_commands, args=(loop, queue), name="stdin-reader")
+    reader.daemon = True
+    reader.start()
+
+    registering = asyncio.create_task(backend.register_accounts())
+    monitoring = asyncio.create_task(backend.monitor_transports())
+    rotating = asyncio.create_task(backend.rotate_recordings())
+    reaping = asyncio.create_task(backend.reap_calls())
+    tasks = set()
+    while True:
+        line = await queue.get()
+        if line is None:
+            break
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            command = json.loads(line)
+        except ValueError as e:
+            print(f"Invalid command: {e}", file=sys.stderr)
+            continue
+        task = asyncio.create_task(handle_command(command))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    registering.cancel()
+    monitoring.cancel()
+    rotating.cancel()
+    reaping.cancel()
+    if tasks:
+        _, pending = await asyncio.wait(tasks, timeout=COMMAND_DRAIN_TIMEOUT)
+        for task in pending:
+            task.cancel()
+        if pending:
+            print(f"Cancelled {len(pending)} command(s) still running at shutdown", file=sys.stderr)
+            await asyncio.wait(pending, timeout=0.1)
 
 if __name__ == "__main__":
     backend = SoftphoneBackend()
 
     try:
-        while True:
-            line = sys.stdin.readline()
-            if not line:
-                break
-            command = json.loads(line.strip())
-            handle_command(command)
-
-    except (KeyboardInterrupt, EOFError):
+        asyncio.run(run_command_loop())
+    except KeyboardInterrupt:
+        pass
+    finally:
         backend.shutdown()
         print("Softphone backend stopped.")
@@ -0,0 +1,132 @@
+"""Test setup: run the pjsua wrapper against an in-memory stand-in for the
+_pjsua extension, so the Python side can be tested without pjsip."""
+import os
+import sys
+import types
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakePjsua(types.ModuleType):
+    """The subset of _pjsua the tests drive. Calls are kept as dicts of
+    the fields call_get_info() returns; anything not modelled here is a
+    no-op that returns 0 (PJ_SUCCESS)."""
+    def __init__(self):
+        super().__init__('_pjsua')
+        self.reset()
+
+    def reset(self):
+        self.calls = {}
+        self.call_user_data = {}
+        self.acc_user_data = {}
+        self.buddy_user_data = {}
+        self.accounts = {}
+        self.buddies = {}
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return lambda *args: 0
+
+    def add_call(self, call_id, remote_uri='sip:6001@example.com', **fields):
+        info = dict(role=0, acc_id=0, local_info='sip:me@example.com',
+                    local_contact='', remote_info=remote_uri,
+                    remote_contact='', call_id='cid-%d' % call_id,
+                    state=1, state_text='CALLING', last_status=0,
+                    last_status_text='', media_status=0, media_dir=0,
+                    conf_slot=-1, connect_duration=0, total_duration=0)
+        info.update(fields)
+        self.calls[call_id] = info
+
+    def call_get_info(self, call_id):
+        info = self.calls.get(call_id)
+        return SimpleNamespace(**info) if info else None
+
+    def call_set_user_data(self, call_id, data):
+        if data:
+            self.call_user_data[call_id] = data
+        else:
+            self.call_user_data.pop(call_id, None)
+        return 0
+
+    def call_get_user_data(self, call_id):
+        return self.call_user_data.get(call_id)
+
+    def acc_get_user_data(self, acc_id):
+        return self.acc_user_data.get(acc_id)
+
+    def acc_set_user_data(self, acc_id, data):
+        self.acc_user_data[acc_id] = data
+        return 0
+
+    def buddy_get_user_data(self, buddy_id):
+        return self.buddy_user_data.get(buddy_id)
+
+    def buddy_set_user_data(self, buddy_id, data):
+        if data:
+            self.buddy_user_data[buddy_id] = data
+        else:
+            self.buddy_user_data.pop(buddy_id, None)
+        return 0
+
+    def add_account(self, acc_id, uri='sip:me@example.com', **fields):
+        info = dict(is_default=False, acc_uri=uri, has_registration=False,
+                    expires=0, status=0, status_text='', online_status=0,
+                    online_status_text='')
+        info.update(fields)
+        self.accounts[acc_id] = info
+
+    def buddy_config_default(self):
+        return SimpleNamespace(uri='', subscribe=False)
+
+    def buddy_add(self, buddy_cfg):
+        buddy_id = max(self.buddies, default=-1) + 1
+        self.buddies[buddy_id] = buddy_cfg.uri
+        return 0, buddy_id
+
+    def buddy_del(self, buddy_id):
+        self.buddies.pop(buddy_id, None)
+        return 0
+
+    def buddy_get_info(self, buddy_id):
+        if buddy_id not in self.buddies:
+            return None
+        return SimpleNamespace(uri=self.buddies[buddy_id], contact='', status=0,
+                               status_text='', activity=0, monitor_pres=False,
+                               sub_state=0, sub_term_reason='')
+
+    def acc_set_registration(self, acc_id, renew):
+        # The registrar answers at once; has_registration stays set, as in
+        # pjsua, where it only means a registrar is configured
+        if acc_id in self.accounts:
+            self.accounts[acc_id]['expires'] = 300 if renew else 0
+        return 0
+
+    def acc_get_info(self, acc_id):
+        # None for an account pjsua does not know, as the extension does
+        info = self.accounts.get(acc_id)
+        return SimpleNamespace(**info) if info else None
+
+
+fake_pjsua = FakePjsua()
+sys.modules.setdefault('_pjsua', fake_pjsua)
+
+
+@pytest.fixture
+def pjsua_stub():
+    fake_pjsua.reset()
+    return fake_pjsua
+
+
+@pytest.fixture
+def lib(pjsua_stub):
+    import pjsua
+    pjsua._lib = None
+    instance = pjsua.Lib()
+    yield instance
+    if instance._dispatcher:
+        instance._dispatcher.stop()
+    pjsua._lib = None
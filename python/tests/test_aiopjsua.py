@@ -0,0 +1,67 @@
+import asyncio
+import gc
+
+import pytest
+
+import aiopjsua
+import pjsua as pj
+
+
+def test_events_after_the_loop_closes_still_reach_the_app_callback(lib, pjsua_stub):
+    states = []
+
+    class AppCallCallback(pj.CallCallback):
+        def on_state(self):
+            states.append(self.call.cached_info().state)
+
+    loop = asyncio.new_event_loop()
+    pjsua_stub.add_call(0, state=pj.CallState.CONFIRMED)
+    aio_call = aiopjsua.AioCall(pj.Call(lib, 0), AppCallCallback(), loop=loop)
+    loop.close()
+
+    # As when Lib.shutdown() hangs up after asyncio.run() has returned
+    pjsua_stub.calls[0]['state'] = pj.CallState.DISCONNECTED
+    lib._cb_on_call_state(0)
+    assert states == [pj.CallState.DISCONNECTED]
+    assert aio_call
+
+
+def test_failed_request_leaves_no_waiter_behind(lib, pjsua_stub, monkeypatch):
+    monkeypatch.setattr(pjsua_stub, 'call_set_hold', lambda *args: -1)
+    pjsua_stub.add_call(0, state=pj.CallState.CONFIRMED)
+    errors = []
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        loop.set_exception_handler(lambda loop, context: errors.append(context))
+        aio_call = aiopjsua.AioCall(pj.Call(lib, 0))
+        with pytest.raises(pj.Error):
+            await aio_call.hold()
+        assert aio_call._waiters == []
+        pjsua_stub.calls[0]['state'] = pj.CallState.DISCONNECTED
+        lib._cb_on_call_state(0)
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    gc.collect()
+    assert errors == []
+
+
+def test_reg_state_after_the_account_is_deleted(lib, pjsua_stub):
+    states = []
+
+    class AppAccountCallback(pj.AccountCallback):
+        def on_reg_state(self):
+            states.append('reg_state')
+
+    loop = asyncio.new_event_loop()
+    pjsua_stub.add_account(0)
+    acc = pj.Account(lib, 0)
+    aiopjsua.AioAccount(acc, AppAccountCallback(), loop=loop)
+    callback = acc._cb
+    # Lib.shutdown() deletes the account while its un-REGISTER answer is
+    # still being delivered
+    del pjsua_stub.accounts[0]
+    callback.on_reg_state()
+    loop.close()
+    assert states == ['reg_state']
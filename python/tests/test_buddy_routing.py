@@ -0,0 +1,26 @@
+import pjsua as pj
+
+
+def test_pager_routes_to_the_buddy_by_uri(lib, pjsua_stub):
+    pjsua_stub.add_account(0)
+    acc = pj.Account(lib, 0)
+    alice = acc.add_buddy('sip:alice@Example.com')
+    acc.add_buddy('sip:bob@example.com')
+
+    assert lib._lookup_buddy(-1, '"Alice" <sip:alice@example.COM;transport=tcp>;tag=1') is alice
+    assert lib._lookup_buddy(-1, 'sip:carol@example.com') is None
+    assert lib._lookup_buddy(-1, 'garbage') is None
+
+
+def test_deleting_one_of_two_buddies_with_the_same_uri_keeps_routing(lib, pjsua_stub):
+    pjsua_stub.add_account(0)
+    acc = pj.Account(lib, 0)
+    first = acc.add_buddy('sip:alice@example.com')
+    second = acc.add_buddy('sip:alice@example.com')
+
+    assert lib._lookup_buddy(-1, 'sip:alice@example.com') is first
+    first.delete()
+    assert lib._lookup_buddy(-1, 'sip:alice@example.com') is second
+    second.delete()
+    assert lib._lookup_buddy(-1, 'sip:alice@example.com') is None
+    assert not lib._buddy_index
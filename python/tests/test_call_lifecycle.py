@@ -0,0 +1,113 @@
+import gc
+import threading
+import tracemalloc
+import weakref
+
+import aiopjsua
+import pjsua as pj
+from call_lifecycle import CallLifecycle
+
+
+class AppCallCallback(pj.CallCallback):
+    # Releases the call on DISCONNECTED, as softphone.CallCallback does
+    def __init__(self, lifecycle, tag):
+        pj.CallCallback.__init__(self)
+        self.lifecycle = lifecycle
+        self.tag = tag
+
+    def on_state(self):
+        if self.call.cached_info().state == pj.CallState.DISCONNECTED:
+            self.lifecycle.release(self.tag)
+
+
+def test_soak_frees_every_call_without_the_cycle_collector(lib, pjsua_stub, calls=10000, batch=1000):
+    lifecycle = CallLifecycle(lib)
+    # The trace ring holds a record per callback until it wraps; keep it
+    # small so it is full before the first sample
+    pj._trace.configure(pj.TraceConfig(capacity=64))
+    # Allocated up front and reused per batch, so the weakrefs themselves
+    # don't show up as growth
+    refs = [None] * batch
+    alive = 0
+    samples = []
+    gc.collect()
+    gc.disable()
+    tracemalloc.start()
+    try:
+        for i in range(calls):
+            call_id = i % 64  # pjsua reuses call ids
+            tag = f"call-{i}"
+            pjsua_stub.add_call(call_id, state=pj.CallState.CONFIRMED)
+            call = pj.Call(lib, call_id)
+            lib.calls.tag(call, tag)
+            lifecycle.track(tag, aiopjsua.AioCall(call, AppCallCallback(lifecycle, tag)))
+            refs[i % batch] = weakref.ref(call)
+            del call
+            if i % 10 == 9:
+                # The call fails without a DISCONNECTED event: only sweep() sees it
+                lib.calls._remove(lib.calls.by_tag(tag), call_id)
+                pjsua_stub.call_set_user_data(call_id, None)
+                lifecycle.sweep(collect=False)
+            else:
+                pjsua_stub.calls[call_id]['state'] = pj.CallState.DISCONNECTED
+                lib._cb_on_call_state(call_id)
+            del pjsua_stub.calls[call_id]
+            if i % batch == batch - 1:
+                alive += sum(1 for ref in refs if ref() is not None)
+                refs[:] = [None] * batch
+                samples.append(tracemalloc.get_traced_memory()[0])
+        lifecycle.sweep()
+        leaked = lifecycle.leaked
+    finally:
+        tracemalloc.stop()
+        gc.enable()
+        pj._trace.configure(pj.TraceConfig())
+
+    assert not lifecycle.aio_calls
+    assert len(lib.calls) == 0 and not lib.calls.tagged()
+    assert alive == 0, f"{alive} ended calls still alive without the cycle collector"
+    assert leaked == 0
+    # The first batch warms up caches and free lists
+    growth = samples[-1] - samples[1]
+    assert growth < 16 * 1024, f"memory grew by {growth} bytes over {calls} calls: {samples}"
+
+
+class FakeCall:
+    pass
+
+
+def test_sweep_separates_cycles_from_leaks(lib):
+    lifecycle = CallLifecycle(lib)
+    cyclic = FakeCall()
+    cyclic.self = cyclic
+    held = FakeCall()
+    for call_id, call in (('cyclic', cyclic), ('held', held)):
+        lib.calls._by_tag[call_id] = call
+        lifecycle.release(call_id)
+    del cyclic
+    lifecycle.sweep()
+    assert (lifecycle.cycles, lifecycle.leaked) == (1, 1)
+    del held, call
+    lifecycle.sweep()
+    assert (lifecycle.cycles, lifecycle.leaked) == (1, 0)
+
+
+def test_call_held_by_a_queued_callback_is_not_leaked(lib):
+    lib._dispatcher = pj._CallbackDispatcher(pj.DispatcherConfig(1, 16))
+    gate = threading.Event()
+    lib._dispatcher.submit(0, None, gate.wait, (2.0,))
+    lifecycle = CallLifecycle(lib)
+    call = FakeCall()
+    lib._dispatcher.submit(0, None, lambda call: None, (call,))
+    lib.calls._by_tag['call'] = call
+    lifecycle.release('call')
+    del call
+
+    lifecycle.sweep()
+    assert lifecycle.leaked == 0 and len(lifecycle._released_calls) == 1
+    gate.set()
+    done = threading.Event()
+    lib._dispatcher.submit(0, None, done.set, ())
+    assert done.wait(2.0)
+    lifecycle.sweep()
+    assert lifecycle.leaked == 0 and not lifecycle._released_calls
@@ -0,0 +1,59 @@
+from call_quality import CallQualityCollector, estimate_mos, parse_dump
+
+
+DUMP = """
+  [CONFIRMED] To: <sip:6001@phone.example.com>;tag=abc
+    Call time: 00h:01m:10s, 1st res in 120 ms, conn in 340ms
+    #0 audio PCMU @8kHz, sendrecv, peer=10.0.0.5:4000
+       SRTP status: Not active Crypto-suite:
+       RX pt=0, last update:00h:00m:00.020s ago
+          total 3.5Kpkt 560.0KB (700.0KB +IP hdr) @avg=64.0Kbps/80.0Kbps
+          pkt loss=35 (1.0%), discrd=0 (0.0%), dup=0 (0.0%), reord=0 (0.0%)
+                (msec)    min     avg     max     last    dev
+          loss period:  20.000  20.000  40.000  20.000   5.000
+          jitter     :   0.125   3.500  12.000   4.250   1.900
+       TX pt=0, ptime=20, last update:00h:00m:00.010s ago
+          total 350pkt 56.0KB (70.0KB +IP hdr) @avg=64.0Kbps/80.0Kbps
+          pkt loss=0 (0.0%), dup=0 (0.0%), reord=0 (0.0%)
+                (msec)    min     avg     max     last    dev
+          loss period:   0.000   0.000   0.000   0.000   0.000
+          jitter     :   0.000   1.000   2.000   1.500   0.500
+      RTT msec       :  40.000  45.000  60.000  50.000   4.000
+"""
+
+
+def test_parse_dump():
+    stats = parse_dump(DUMP)
+    assert stats['codec'] == 'PCMU' and stats['clock_khz'] == 8
+    assert stats['rx']['packets'] == 3500.0 and stats['rx']['lost'] == 35
+    assert stats['rx']['packets_step'] == 100.0 and stats['tx']['packets_step'] == 1.0
+    assert stats['rx']['jitter_ms'] == 4.25 and stats['rx']['kbps'] == 64.0
+    assert stats['tx']['jitter_ms'] == 1.5 and stats['rtt_ms'] == 50.0
+    mos = estimate_mos(stats['rtt_ms'], stats['rx']['jitter_ms'], stats['rx']['loss_pct'])
+    assert 4.0 < mos < 4.5, mos
+
+
+def rx_stats(packets, step, lost, loss_pct):
+    return {'codec': 'PCMU', 'clock_khz': 8, 'rtt_ms': 40.0, 'tx': None,
+            'rx': {'packets': packets, 'packets_step': step, 'lost': lost,
+                   'loss_pct': loss_pct, 'jitter_ms': 2.0, 'kbps': 64.0}}
+
+
+def test_interval_loss_waits_for_the_rounded_total_to_move():
+    collector = CallQualityCollector(lib=None)
+    # 3.5Kpkt, then still 3.5Kpkt with one more packet lost: the packet
+    # delta rounds to 0, which must not read as 100% loss
+    first = collector._record('call', rx_stats(3500.0, 100.0, 35, 1.0), 0.0)
+    second = collector._record('call', rx_stats(3500.0, 100.0, 36, 1.0), 5.0)
+    assert first['loss_pct'] == second['loss_pct'] == 1.0
+    assert second['mos'] > 4.0
+    # A thousand packets later the interval is long enough to measure
+    third = collector._record('call', rx_stats(4500.0, 100.0, 45, 1.0), 10.0)
+    assert abs(third['loss_pct'] - 100.0 * 10 / 1010) < 0.01
+
+
+def test_exact_counts_close_an_interval_every_sample():
+    collector = CallQualityCollector(lib=None)
+    collector._record('call', rx_stats(500.0, 1.0, 0, 0.0), 0.0)
+    sample = collector._record('call', rx_stats(740.0, 1.0, 10, 1.3), 5.0)
+    assert abs(sample['loss_pct'] - 4.0) < 0.01
@@ -0,0 +1,24 @@
+import pjsua as pj
+from sip_uri import phone_number
+
+
+def test_by_number_agrees_with_phone_number(lib, pjsua_stub):
+    uris = ['Bob <sip:+15551234567;npdi@gw.example.com;user=phone>',
+            'tel:+1-555-123-4567;phone-context=example.com',
+            '"Agent 12" <sip:6012@phone.example.com>;tag=1928301774']
+    calls = []
+    for call_id, uri in enumerate(uris):
+        pjsua_stub.add_call(call_id, remote_uri=uri)
+        calls.append(pj.Call(lib, call_id))
+        lib._cb_on_call_state(call_id)
+
+    assert lib.calls.by_number(phone_number(uris[0])) == calls[:2]
+    assert lib.calls.by_number('6012') == calls[2:]
+    assert lib.calls.by_number('') == []
+
+
+def test_sip_uri_decode_uses_the_python_parser():
+    uri = pj.SIPUri('"Alice" <sips:alice@Example.COM:5061;transport=tls>')
+    assert (uri.scheme, uri.user, uri.host, uri.port, uri.transport) == \
+        ('sips', 'alice', 'example.com', 5061, 'tls')
+    assert uri.encode() == 'sips:alice@example.com:5061;transport=tls'
@@ -0,0 +1,37 @@
+import types
+
+
+def _codec(codec_id, priority=128):
+    return types.SimpleNamespace(codec_id=codec_id, priority=priority)
+
+
+def _param():
+    info = types.SimpleNamespace(clock_rate=8000, channel_cnt=1, avg_bps=64000,
+                                 frm_ptime=10, pt=0)
+    setting = types.SimpleNamespace(frm_per_pkt=2, vad=0, plc=1)
+    return types.SimpleNamespace(info=info, setting=setting)
+
+
+def test_codec_table_is_cached_until_priority_changes(lib, pjsua_stub,
+                                                      monkeypatch):
+    lib._codecs = None
+    enumerated = []
+
+    def enum_codecs():
+        enumerated.append(True)
+        return [_codec('PCMU/8000/1'), _codec('PCMA/8000/1')]
+
+    monkeypatch.setattr(pjsua_stub, 'enum_codecs', enum_codecs)
+    monkeypatch.setattr(pjsua_stub, 'codec_get_param', lambda name: _param())
+    monkeypatch.setattr(pjsua_stub, 'codec_set_priority',
+                        lambda name, priority: 0)
+
+    names = [ci.name for ci in lib.enum_codecs()]
+    assert names == ['PCMU/8000/1', 'PCMA/8000/1']
+    assert lib.get_codec_info('PCMA/8000/1').ptime == 20
+    assert lib.get_codec_info('G722/16000/1') is None
+    assert len(enumerated) == 1
+
+    lib.set_codec_priority('PCMA/8000/1', 255)
+    lib.enum_codecs()
+    assert len(enumerated) == 2
@@ -0,0 +1,65 @@
+import asyncio
+
+from command_dispatcher import REQUIRED, CommandDispatcher, LatencyHistogram
+
+
+def make_dispatcher():
+    calls = []
+    errors = []
+    dispatcher = CommandDispatcher(on_error=lambda name, error: errors.append((name, str(error))))
+    dispatcher.register('set_mute', lambda call_id, muted: calls.append((call_id, muted)),
+                        [('call_id', str, REQUIRED), ('muted', bool, False)])
+    dispatcher.register('subscribe_levels', lambda interval_ms: calls.append(interval_ms),
+                        [('interval_ms', int, 100)])
+    dispatcher.register('get_trace', lambda seconds: calls.append(seconds),
+                        [('seconds', (int, float), 10)])
+    return dispatcher, calls, errors
+
+
+def run(dispatcher, command):
+    asyncio.run(dispatcher.dispatch(command))
+
+
+def test_arguments_are_passed_in_schema_order_with_defaults():
+    dispatcher, calls, errors = make_dispatcher()
+    run(dispatcher, {'command': 'set_mute', 'call_id': 'a', 'muted': True})
+    run(dispatcher, {'command': 'set_mute', 'call_id': 'b'})
+    run(dispatcher, {'command': 'get_trace', 'seconds': 2.5})
+    assert calls == [('a', True), ('b', False), 2.5]
+    assert errors == []
+    assert dispatcher.get_metrics()['set_mute']['count'] == 2
+
+
+def test_unknown_command_is_counted_not_reported():
+    dispatcher, calls, errors = make_dispatcher()
+    run(dispatcher, {'command': 'reboot'})
+    run(dispatcher, 'not a command')
+    assert dispatcher.unknown_commands == 2
+    assert calls == [] and errors == []
+
+
+def test_missing_and_wrongly_typed_arguments_are_rejected():
+    dispatcher, calls, errors = make_dispatcher()
+    run(dispatcher, {'command': 'set_mute'})
+    run(dispatcher, {'command': 'set_mute', 'call_id': 7})
+    run(dispatcher, {'command': 'subscribe_levels', 'interval_ms': '50'})
+    # bool is a subclass of int, but true is not an interval
+    run(dispatcher, {'command': 'subscribe_levels', 'interval_ms': True})
+    run(dispatcher, {'command': 'get_trace', 'seconds': False})
+    assert calls == []
+    assert errors == [
+        ('set_mute', "'set_mute' requires 'call_id'"),
+        ('set_mute', "'set_mute': 'call_id' must be str"),
+        ('subscribe_levels', "'subscribe_levels': 'interval_ms' must be int"),
+        ('subscribe_levels', "'subscribe_levels': 'interval_ms' must be int"),
+        ('get_trace', "'get_trace': 'seconds' must be int or float"),
+    ]
+    assert dispatcher.get_metrics()['set_mute']['errors'] == 2
+
+
+def test_latency_percentiles():
+    histogram = LatencyHistogram()
+    for ms in range(1, 101):
+        histogram.record(float(ms))
+    assert 40.0 <= histogram.percentile(50) <= 60.0
+    assert histogram.percentile(100) == 100.0
@@ -0,0 +1,24 @@
+PJ_EINVAL = 70004
+
+
+def test_batch_reports_failures_without_stopping(lib, pjsua_stub, monkeypatch):
+    connected = []
+
+    def connect(src, dst):
+        if dst == 9:
+            return PJ_EINVAL
+        connected.append((src, dst))
+        return 0
+
+    monkeypatch.setattr(pjsua_stub, 'conf_connect', connect)
+    results = lib.conf_connect_many([(1, 2), (1, 9), (2, 1)])
+    assert results == [(1, 2, 0), (1, 9, PJ_EINVAL), (2, 1, 0)]
+    assert connected == [(1, 2), (2, 1)]
+
+
+def test_mesh_skips_duplicates_and_self_links(lib, pjsua_stub, monkeypatch):
+    monkeypatch.setattr(pjsua_stub, 'conf_connect', lambda src, dst: 0)
+    pairs = [(src, dst) for src, dst, _ in lib.conf_connect_mesh([1, 2, 2, 3])]
+    assert pairs == [(1, 2), (1, 3), (2, 1), (2, 3), (3, 1), (3, 2)]
+    pairs = [(src, dst) for src, dst, _ in lib.conf_attach_to_mesh(3, [1, 2, 3])]
+    assert pairs == [(3, 1), (1, 3), (3, 2), (2, 3)]
@@ -0,0 +1,67 @@
+import pytest
+
+from conference import ConferenceManager
+
+
+@pytest.fixture
+def links(pjsua_stub, monkeypatch):
+    links = set()
+
+    def connect(src, dst):
+        links.add((src, dst))
+        return 0
+
+    def disconnect(src, dst):
+        links.discard((src, dst))
+        return 0
+
+    monkeypatch.setattr(pjsua_stub, 'conf_connect', connect)
+    monkeypatch.setattr(pjsua_stub, 'conf_disconnect', disconnect)
+    return links
+
+
+def mesh(*slots):
+    return {(a, b) for a in slots for b in slots if a != b}
+
+
+def test_create_connects_the_members_to_each_other_only(lib, links):
+    conferences = ConferenceManager(lib)
+    first, results = conferences.create({'a': 1, 'b': 2})
+    second, _ = conferences.create({'c': 3, 'd': 4}, name='Sales')
+    assert all(err == 0 for _, _, err in results)
+    assert links == mesh(1, 2) | mesh(3, 4)
+    assert second.name == 'Sales' and conferences.group_of('c') is second
+    assert conferences.get() is None and conferences.get(first.group_id) is first
+
+
+def test_merge_adds_a_call_to_the_group_and_moves_it_out_of_its_old_one(lib, links):
+    conferences = ConferenceManager(lib)
+    first, _ = conferences.create({'a': 1, 'b': 2})
+    second, _ = conferences.create({'c': 3, 'd': 4, 'e': 5})
+    conferences.add(first.group_id, 'e', 5)
+    assert links == mesh(1, 2, 5) | mesh(3, 4)
+    assert first.members == {'a': 1, 'b': 2, 'e': 5}
+    assert conferences.group_of('e') is first
+    # Adding it again is a no-op
+    assert conferences.add(first.group_id, 'e', 5) == (first, [])
+
+
+def test_split_removes_members_and_drops_an_empty_group(lib, links):
+    conferences = ConferenceManager(lib)
+    group, _ = conferences.create({'a': 1, 'b': 2, 'c': 3})
+    assert conferences.remove('c') == (group, [(3, 1, 0), (1, 3, 0), (3, 2, 0), (2, 3, 0)])
+    assert links == mesh(1, 2)
+    # The call's port is gone: its links went with it
+    conferences.remove('b', disconnect=False)
+    conferences.remove('a')
+    assert conferences.groups == {} and conferences.remove('a') == (None, [])
+
+
+def test_end_tears_down_the_whole_group(lib, links):
+    conferences = ConferenceManager(lib)
+    group, _ = conferences.create({'a': 1, 'b': 2, 'c': 3})
+    members, _ = conferences.end(group.group_id)
+    assert sorted(members) == ['a', 'b', 'c'] and links == set()
+    assert conferences.group_of('a') is None
+    with pytest.raises(KeyError):
+        conferences.end(group.group_id)
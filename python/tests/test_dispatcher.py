@@ -0,0 +1,62 @@
+import threading
+from types import SimpleNamespace
+
+import pjsua as pj
+
+
+def start_dispatcher(lib, thread_cnt=1, queue_size=1):
+    lib._dispatcher = pj._CallbackDispatcher(pj.DispatcherConfig(thread_cnt, queue_size))
+    return lib._dispatcher
+
+
+def test_full_queue_does_not_block_the_locked_stack_thread(lib, pjsua_stub):
+    start_dispatcher(lib)
+    pjsua_stub.add_call(0, media_status=pj.MediaState.ACTIVE, conf_slot=1)
+    handled = []
+    done = threading.Event()
+
+    class Callback(pj.CallCallback):
+        def on_media_state(self):
+            # Handlers may take the library lock the stack thread holds
+            self.call.info()
+            handled.append(1)
+            if len(handled) == 5:
+                done.set()
+
+    call = pj.Call(lib, 0, Callback())
+    with lib._lock:
+        # As in _worker_poll(): events arrive with the lock held
+        for i in range(5):
+            lib._cb_on_call_media_state(0)
+    assert done.wait(2.0), "dispatcher deadlocked on the library lock"
+    assert lib.dispatcher_stats()['queue_full'] > 0
+    assert call
+
+
+def test_events_queued_before_on_incoming_call_reach_the_app_callback(lib, pjsua_stub):
+    dispatcher = start_dispatcher(lib, queue_size=16)
+    gate = threading.Event()
+    dispatcher.submit(0, None, gate.wait, (2.0,))
+
+    states = []
+
+    class AppCallCallback(pj.CallCallback):
+        def on_state(self):
+            states.append(self.call.cached_info().state)
+
+    class AppAccountCallback:
+        def on_incoming_call(self, call):
+            call.set_callback(AppCallCallback())
+
+    pjsua_stub.acc_user_data[0] = SimpleNamespace(_cb=AppAccountCallback())
+    pjsua_stub.add_call(0, state=pj.CallState.INCOMING)
+    lib._cb_on_incoming_call(0, 0, None)
+    # An early CANCEL: DISCONNECTED is queued before on_incoming_call runs
+    pjsua_stub.calls[0]['state'] = pj.CallState.DISCONNECTED
+    lib._cb_on_call_state(0)
+
+    finished = threading.Event()
+    dispatcher.submit(0, None, finished.set, ())
+    gate.set()
+    assert finished.wait(2.0)
+    assert states == [pj.CallState.DISCONNECTED]
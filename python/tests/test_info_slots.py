@@ -0,0 +1,49 @@
+import tracemalloc
+from types import SimpleNamespace
+
+import pjsua as pj
+
+
+class Plain:
+    """The same fields in a per-instance __dict__, as before __slots__"""
+
+
+def allocated(make, n=1000):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        objects = [make() for _ in range(n)]
+        per_object = (tracemalloc.get_traced_memory()[0] - before) / n
+    finally:
+        tracemalloc.stop()
+    assert len(objects) == n
+    return per_object
+
+
+def copy(obj, cls):
+    # Both copies share the field values, so only the objects are measured
+    new = cls.__new__(cls)
+    for name in type(obj).__slots__:
+        setattr(new, name, getattr(obj, name))
+    return new
+
+
+def test_info_objects_are_smaller_with_slots(lib, pjsua_stub):
+    pjsua_stub.add_call(0)
+    ci = pjsua_stub.call_get_info(0)
+    ai = SimpleNamespace(is_default=False, acc_uri='sip:me@example.com', has_registration=True,
+                         expires=300, status=200, status_text='OK', online_status=0,
+                         online_status_text='')
+    bi = SimpleNamespace(uri='sip:alice@example.com', contact='', status=0, status_text='',
+                         activity=0, monitor_pres=False, sub_state=0, sub_term_reason='')
+    makers = {
+        pj.CallInfo: lambda: pj.CallInfo(lib, ci),
+        pj.AccountInfo: lambda: pj.AccountInfo(ai),
+        pj.BuddyInfo: lambda: pj.BuddyInfo(bi),
+    }
+    for cls, make in makers.items():
+        sample = make()
+        assert not hasattr(sample, '__dict__'), cls
+        slotted = allocated(lambda: copy(sample, cls))
+        plain = allocated(lambda: copy(sample, Plain))
+        assert slotted < 0.8 * plain, (cls.__name__, slotted, plain)
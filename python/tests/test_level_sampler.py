@@ -0,0 +1,45 @@
+from level_sampler import LevelRing, LevelSampler, window_stats
+
+
+def test_ring_wraps_and_keeps_the_newest_samples_in_order():
+    ring = LevelRing(4)
+    assert ring.latest() == (0.0, 0.0)
+    for i in range(1, 7):
+        ring.record(i / 8, i / 16)
+    assert ring.count == 4 and ring.pos == 2
+    tx, rx = ring.window()
+    assert list(tx) == [3 / 8, 4 / 8, 5 / 8, 6 / 8]
+    assert list(rx) == [3 / 16, 4 / 16, 5 / 16, 6 / 16]
+    tx, _ = ring.window(3)
+    assert list(tx) == [4 / 8, 5 / 8, 6 / 8]
+    assert ring.latest() == (6 / 8, 6 / 16)
+
+
+def test_window_stats():
+    assert window_stats([], 0.02) == {'rms': 0.0, 'peak': 0.0, 'silence': 1.0}
+    assert window_stats([0.0, 0.5, 0.5, 0.0], 0.02) == {'rms': 0.3536, 'peak': 0.5, 'silence': 0.5}
+
+
+class FakeLib:
+    def __init__(self):
+        self.level = 0.0
+
+    def conf_get_signal_levels(self, slots):
+        self.level += 0.125
+        return [(slot, self.level, self.level / 2, 0) for slot in slots]
+
+
+def test_sampler_records_every_tracked_slot_and_publishes():
+    sampler = LevelSampler(FakeLib(), capacity=2)
+    published = []
+    sampler.subscribe(published.append, publish_every=2)
+    sampler.track(1)
+    sampler.track(2)
+    for _ in range(3):
+        sampler._sample()
+    assert published == [{1: (0.25, 0.125), 2: (0.25, 0.125)}]
+    stats = sampler.stats(1)
+    assert stats['samples'] == 2 and stats['tx']['peak'] == 0.375
+    sampler.untrack(2)
+    assert sampler.stats(2) is None
+    assert sampler.get_stats()['ticks'] == 3
@@ -0,0 +1,53 @@
+from media_pool import MediaPool
+
+
+class FakeLib:
+    def __init__(self):
+        self.players = 0
+        self.rewinds = []
+        self.links = set()
+
+    def create_player(self, filename, loop=False):
+        self.players += 1
+        return self.players
+
+    def player_get_slot(self, player_id):
+        return 100 + player_id
+
+    def player_set_pos(self, player_id, pos):
+        self.rewinds.append((player_id, pos))
+
+    def player_destroy(self, player_id):
+        pass
+
+    def conf_connect(self, src, dst):
+        self.links.add((src, dst))
+
+    def conf_disconnect(self, src, dst):
+        self.links.discard((src, dst))
+
+
+def test_idle_preloaded_prompt_is_rewound_for_each_new_listener():
+    lib = FakeLib()
+    pool = MediaPool(lib)
+    pool.register('greeting', 'greeting.wav', loop=False, preload=True)
+    assert lib.players == 1
+
+    slot = pool.attach('greeting', 1)
+    pool.attach('greeting', 2)   # joins mid-prompt
+    pool.detach('greeting', 1)
+    pool.detach('greeting', 2)
+    pool.attach('greeting', 3)
+    assert lib.rewinds == [(1, 0), (1, 0)]
+    assert lib.players == 1
+    assert lib.links == {(slot, 3)}
+
+
+def test_looping_player_is_not_rewound():
+    lib = FakeLib()
+    pool = MediaPool(lib)
+    pool.register('hold', 'hold.wav', loop=True, preload=True)
+    pool.attach('hold', 1)
+    pool.detach('hold', 1)
+    pool.attach('hold', 2)
+    assert lib.rewinds == []
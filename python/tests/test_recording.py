@@ -0,0 +1,107 @@
+import os
+import time
+
+import recording
+
+
+class FakeLib:
+    def __init__(self, size=1024):
+        self.size = size
+        self.recorders = 0
+        self.links = set()
+
+    def create_recorder(self, filename):
+        with open(filename, 'wb') as f:
+            f.write(os.urandom(self.size))
+        self.recorders += 1
+        return self.recorders
+
+    def recorder_get_slot(self, rec_id):
+        return 100 + rec_id
+
+    def conf_connect_many(self, pairs):
+        self.links.update(pairs)
+        return [(src, dst, 0) for src, dst in pairs]
+
+    def conf_connect(self, src, dst):
+        self.links.add((src, dst))
+
+    def conf_disconnect(self, src, dst):
+        self.links.discard((src, dst))
+
+    def recorder_destroy(self, rec_id):
+        pass
+
+
+def test_directory_is_created_on_first_recording(tmp_path, monkeypatch):
+    monkeypatch.setenv('SOFTPHONE_DATA_DIR', str(tmp_path))
+    manager = recording.RecordingManager(FakeLib())
+    assert not os.path.exists(manager.directory)
+    manager.start('call', 1)
+    manager.close()
+    assert os.listdir(manager.directory)
+
+
+def test_unusable_directory_disables_recording(tmp_path, monkeypatch):
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    monkeypatch.setenv('SOFTPHONE_DATA_DIR', str(blocker))
+    manager = recording.RecordingManager(FakeLib())
+    assert manager.start('call', 1) is None
+    assert manager.get_stats()['available'] is False
+    manager.close()
+
+
+def test_restarting_a_recording_does_not_reuse_part_numbers(tmp_path, monkeypatch):
+    monkeypatch.setenv('SOFTPHONE_DATA_DIR', str(tmp_path))
+    manager = recording.RecordingManager(FakeLib())
+    first = manager.start('call', 1)
+    manager.stop('call')
+    second = manager.start('call', 1)
+    manager.close()
+    assert (first.part, second.part) == (1, 2)
+    assert sorted(os.listdir(manager.directory)) == ['call-001.wav.gz', 'call-002.wav.gz', 'index.jsonl']
+
+
+def test_close_keeps_to_its_deadline_and_leaves_wavs_for_next_start(tmp_path, monkeypatch):
+    monkeypatch.setenv('SOFTPHONE_DATA_DIR', str(tmp_path))
+    lib = FakeLib(size=4 * 1024 * 1024)
+    manager = recording.RecordingManager(lib, workers=1)
+    for i in range(5):
+        manager.start(f'call{i}', 1)
+        manager.release(f'call{i}')
+    started = time.monotonic()
+    manager.close(timeout=0.05)
+    assert time.monotonic() - started < 1.0
+    assert any(name.endswith('.wav') for name in os.listdir(manager.directory))
+
+    manager = recording.RecordingManager(lib)
+    manager.start('next', 1)
+    manager.close()
+    assert not any(name.endswith('.wav') for name in os.listdir(manager.directory))
+
+
+def test_microphone_is_only_recorded_while_it_feeds_the_call(tmp_path, monkeypatch):
+    monkeypatch.setenv('SOFTPHONE_DATA_DIR', str(tmp_path))
+    lib = FakeLib()
+    manager = recording.RecordingManager(lib)
+    held = manager.start('held', 3, mic=False)
+    active = manager.start('active', 4)
+    assert lib.links == {(3, held.rec_slot), (4, active.rec_slot), (0, active.rec_slot)}
+
+    manager.set_microphone('active', False)   # muted
+    assert (0, active.rec_slot) not in lib.links
+    manager.set_microphone('held', True)      # resumed
+    assert (0, held.rec_slot) in lib.links
+    manager.close()
+
+
+def test_start_follows_a_call_to_its_new_slot(tmp_path, monkeypatch):
+    monkeypatch.setenv('SOFTPHONE_DATA_DIR', str(tmp_path))
+    lib = FakeLib()
+    manager = recording.RecordingManager(lib)
+    rec = manager.start('call', 3)
+    assert manager.start('call', 7) is rec
+    assert rec.call_slot == 7
+    assert lib.links == {(7, rec.rec_slot), (0, rec.rec_slot)}
+    manager.close()
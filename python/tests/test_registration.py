@@ -0,0 +1,27 @@
+import asyncio
+from types import SimpleNamespace
+
+from registration import LineState, RegistrationManager
+
+
+class FakeLib:
+    def __init__(self):
+        self.created = []
+
+    def create_account(self, acc_cfg, set_default=True, cb=None):
+        self.created.append((acc_cfg.id, set_default))
+        # The registrar answers straight away
+        cb.manager._post(cb.line, SimpleNamespace(reg_status=200, reg_reason='OK', reg_expires=300))
+        return SimpleNamespace(cfg=acc_cfg)
+
+
+def test_only_the_default_line_becomes_the_default_account():
+    lib = FakeLib()
+    manager = RegistrationManager(lib, concurrency=3, jitter=0.01, timeout=1.0)
+    for key in ('line1', 'primary', 'line2', 'line3'):
+        manager.add_line(key, SimpleNamespace(id=f'sip:{key}@example.com'), default=(key == 'primary'))
+
+    asyncio.run(manager.register_all())
+    assert sorted(lib.created) == [('sip:line1@example.com', False), ('sip:line2@example.com', False),
+                                   ('sip:line3@example.com', False), ('sip:primary@example.com', True)]
+    assert all(line.state == LineState.REGISTERED for line in manager.lines.values())
@@ -0,0 +1,29 @@
+import pjsua as pj
+
+
+def test_shutdown_treats_a_removed_account_as_unregistered(lib, pjsua_stub):
+    pjsua_stub.add_account(0, has_registration=True, expires=300)
+    acc = pj.Account(lib, 0)
+    # pjsua dropped the account (e.g. on a transport failure) before shutdown
+    del pjsua_stub.accounts[0]
+    phases = lib.shutdown(accounts=[acc], grace=0.5, timeout=1.0)
+    assert acc._id == -1
+    assert phases['grace'] < 250
+
+
+def test_shutdown_stops_waiting_once_the_unregistration_completes(lib, pjsua_stub):
+    pjsua_stub.add_account(0, has_registration=True, expires=300)
+    acc = pj.Account(lib, 0)
+    phases = lib.shutdown(accounts=[acc], grace=0.5, timeout=1.0)
+    assert acc._id == -1
+    assert phases['grace'] < 250
+
+
+def test_shutdown_waits_the_grace_period_for_a_pending_unregistration(lib, pjsua_stub, monkeypatch):
+    pjsua_stub.add_account(0, has_registration=True, expires=300)
+    acc = pj.Account(lib, 0)
+    # The registrar never answers the un-REGISTER
+    monkeypatch.setattr(pjsua_stub, 'acc_set_registration', lambda acc_id, renew: 0)
+    phases = lib.shutdown(accounts=[acc], grace=0.2, timeout=1.0)
+    assert acc._id == -1
+    assert phases['grace'] >= 200
@@ -0,0 +1,27 @@
+import pytest
+
+from sip_uri import parse_uri, phone_number
+
+
+@pytest.mark.parametrize('uri, expected', [
+    ('sip:6001@phone.example.com', ('sip', '6001', 'phone.example.com', 0, '6001')),
+    ('"Alice Smith" <sips:alice@Example.COM:5061;transport=TLS>;tag=abc',
+     ('sips', 'alice', 'example.com', 5061, 'alice')),
+    ('Bob <sip:+15551234567;npdi@gw.example.com;user=phone>',
+     ('sip', '+15551234567;npdi', 'gw.example.com', 0, '+15551234567')),
+    ('<sip:phone.example.com;transport=tcp>', ('sip', '', 'phone.example.com', 0, None)),
+    ('sip:alice@[2001:db8::1]:5070', ('sip', 'alice', '[2001:db8::1]', 5070, 'alice')),
+    ('tel:+1-555-123-4567;phone-context=example.com', ('tel', '+1-555-123-4567', '', 0, '+15551234567')),
+    ('garbage', ('', '', '', 0, None)),
+])
+def test_parse_uri(uri, expected):
+    parsed = parse_uri(uri)
+    assert (parsed.scheme, parsed.user, parsed.host, parsed.port, parsed.number) == expected
+    assert phone_number(uri) == expected[4]
+
+
+def test_display_name_params_and_aor():
+    parsed = parse_uri('"Alice Smith" <sips:alice@Example.COM:5061;transport=TLS>;tag=abc')
+    assert parsed.display == 'Alice Smith' and parsed.transport == 'TLS'
+    assert parsed.aor == 'sips:alice@example.com'
+    assert parse_uri('garbage').aor == ''
@@ -183,28 +183,14 @@ function initializePythonCommunication() {
     // Listen for messages from Python backend
     window.electronAPI.onFromPython((data) => {
 
-        const match = data.match(/{.*}/s);
-
-        if (match) {
-            try {
-                data = JSON.parse(match[0]);
-            } catch (error) {
-                return;
-            }
-        } else {
+        // Each message is exactly one JSON record from the event channel
+        try {
+            data = JSON.parse(data);
+        } catch (error) {
+            console.error('Malformed event from Python:', data);
             return;
         }
 
-
-        // Check if data and type are valid
-        // if (typeof data == 'string') {
-        //     try {
-        //         data = JSON.parse(data);
-        //     } catch (e) {
-        //         return;
-        //     }
-        // }
-
         const messageType = data.type;
         switch (messageType) {
             case 'registration_state':